@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'shortform_tracker.settings')
 
 application = get_asgi_application()
+
+if settings.TRACKER_ASYNC_VIEWS:
+    # WhiteNoise is out of MIDDLEWARE in this mode, see settings.TRACKER_ASYNC_VIEWS
+    application = ASGIStaticFilesHandler(application)
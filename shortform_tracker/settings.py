@@ -43,6 +43,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'tracker.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,7 +58,8 @@ ROOT_URLCONF = 'shortform_tracker.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates with render timing for tracker.middleware.PerformanceMiddleware
+        'BACKEND': 'tracker.perf.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / "templates"],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -83,6 +85,55 @@ DATABASES = {
     }
 }
 
+# Usage data storage
+# DatabaseUsageStore keeps entries in the TimeEntry table; CsvUsageStore keeps
+# the legacy usage_data.csv file. `manage.py migrate_usage_csv` copies the CSV
+# into the database and rebuilds the rollups (DailyUsage, PlatformTotal,
+# LeaderboardTotal) from it. tracker.columnar.ColumnarUsageStore keeps memory-mapped
+# binary partitions per share code under USAGE_COLUMNAR_PATH; fill it from
+# the CSV with `manage.py convert_usage_csv`. File stores written before
+# they recorded a schema version are refused on read until
+# `manage.py validate_usage` has normalised them.
+USAGE_STORE_BACKEND = 'tracker.usage_store.DatabaseUsageStore'
+USAGE_CSV_PATH = os.path.join(BASE_DIR, 'tracker', 'usage_data.csv')
+USAGE_COLUMNAR_PATH = os.path.join(BASE_DIR, 'tracker', 'usage_columnar')
+
+# Caches
+# Pet state and stats fragments live in the cache named by STATS_CACHE_ALIAS.
+# Local memory is per process; with several workers point it at a shared
+# backend (FileBasedCache, Redis) so a write in one invalidates all of them.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tracker',
+    }
+}
+STATS_CACHE_ALIAS = 'default'
+STATS_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Request timings kept per URL name for the staff-only /perf/ report
+PERF_SAMPLES = 1000
+
+# Async views
+# Under ASGI (shortform_tracker.asgi), TRACKER_ASYNC_VIEWS serves the stats,
+# leaderboard, tracked-user and friends pages from async views. Their
+# blocking work (aggregation, CSV reads, template rendering) runs on a pool
+# of TRACKER_ASYNC_THREADS threads per process. WhiteNoise's middleware is
+# sync-only and would move every request onto a thread and back, so it is
+# left out and asgi.py serves static files instead.
+TRACKER_ASYNC_VIEWS = False
+TRACKER_ASYNC_THREADS = 8
+
+if TRACKER_ASYNC_VIEWS:
+    MIDDLEWARE.remove('whitenoise.middleware.WhiteNoiseMiddleware')
+
+# Background tasks
+# Recomputation after usage writes (pet points) is queued as tracker.Job rows
+# and run by `manage.py run_tasks`. When eager, tasks run inside the request
+# that queued them, so development needs no worker. A separate worker
+# needs the shared cache described above to reach the web processes.
+TRACKER_TASKS_EAGER = DEBUG
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -0,0 +1,62 @@
+"""
+Per-request usage aggregates.
+
+The functions work on rows of (date, platform, minutes), normally one
+user's DailyUsage rows loaded once per request by tracker.snapshot. A user
+has at most one row per day and platform, so these are short loops in
+plain Python; the views need neither pandas nor the raw entries. Bulk
+analytics that really want a DataFrame use UsageStore.dataframe(), which
+imports pandas on demand.
+"""
+from collections import defaultdict
+
+
+def usage_rows(usage):
+    """Load a DailyUsage queryset as (date, platform, minutes) rows, in one query."""
+    return list(usage.values_list("date", "platform", "minutes"))
+
+
+def platform_totals(rows):
+    """[(platform, minutes)] ordered by platform name."""
+    totals = defaultdict(int)
+    for _, platform, minutes in rows:
+        totals[platform] += minutes
+    return sorted(totals.items())
+
+
+def most_used_platform(totals):
+    """Platform with the highest minutes in `platform_totals()` output, first by name on ties."""
+    if not totals:
+        return "N/A"
+    return max(totals, key=lambda group: group[1])[0]
+
+
+def day_totals(rows, since=None, days=None):
+    """{date: minutes} over all platforms in date order, optionally only after `since` or for `days`."""
+    totals = defaultdict(int)
+    for day, _, minutes in rows:
+        if since is not None and day <= since:
+            continue
+        if days is not None and day not in days:
+            continue
+        totals[day] += minutes
+    return dict(sorted(totals.items()))
+
+
+def daily_average(rows):
+    """Mean minutes per day that has any usage, 0 when there is none."""
+    totals = day_totals(rows)
+    if not totals:
+        return 0
+    return sum(totals.values()) / len(totals)
+
+
+def usage_summary(rows):
+    """Summary-card numbers: total_minutes, avg_daily, most_used and the per-platform totals."""
+    totals = platform_totals(rows)
+    return {
+        "total_minutes": int(sum(minutes for _, minutes in totals)),
+        "avg_daily": round(daily_average(rows), 2),
+        "most_used": most_used_platform(totals),
+        "platform_totals": totals,
+    }
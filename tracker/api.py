@@ -0,0 +1,90 @@
+"""
+JSON stats API for the charts on the stats page.
+
+Every endpoint answers conditional GETs. The ETag and Last-Modified come
+from the user's data version (tracker.stats_cache), which is bumped on
+every write, so checking them costs a cache lookup and no queries; an
+unchanged chart is a 304 with no body.
+"""
+from datetime import datetime, time, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.timezone import make_aware
+from django.views.decorators.http import condition, require_GET
+
+from .snapshot import get_usage_snapshot
+from .stats_cache import cached_fragment, data_version
+from .timeseries import BUCKETS, local_today, usage_series
+
+MAX_TREND_DAYS = 366
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params={"separators": (",", ":")})
+
+
+def api_login_required(view):
+    """Like login_required, but answers 401 instead of redirecting to the login page."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _json({"error": "Authentication required."}, status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def _etag(request, *args, **kwargs):
+    # The query string is part of the representation (trend ?days=), and so is the day for "last N days"
+    return f"{data_version(request.user.pk)}-{local_today()}-{request.GET.urlencode()}"
+
+
+def _last_modified(request, *args, **kwargs):
+    # Never earlier than today's midnight: the trend window moves then without any write
+    changed = datetime.fromtimestamp(data_version(request.user.pk) / 1e9, tz=timezone.utc)
+    midnight = datetime.combine(local_today(), time.min)
+    midnight = make_aware(midnight) if settings.USE_TZ else midnight.replace(tzinfo=timezone.utc)
+    return max(changed, midnight)
+
+
+def stats_endpoint(view):
+    return api_login_required(require_GET(condition(etag_func=_etag, last_modified_func=_last_modified)(view)))
+
+
+@stats_endpoint
+def summary(request):
+    """Summary-card numbers."""
+    def build():
+        summary = get_usage_snapshot(request).summary
+        return {key: summary[key] for key in ("total_minutes", "avg_daily", "most_used")}
+    return _json(cached_fragment("api_summary", request.user.pk, build))
+
+
+@stats_endpoint
+def platforms(request):
+    """Minutes per platform, as parallel label and value lists."""
+    def build():
+        totals = get_usage_snapshot(request).summary["platform_totals"]
+        return {"labels": [platform for platform, _ in totals], "values": [minutes for _, minutes in totals]}
+    return _json(cached_fragment("api_platforms", request.user.pk, build))
+
+
+@stats_endpoint
+def trend(request):
+    """
+    Minutes per ?bucket= (day, week or month; default day) over the last
+    ?days= days (default 7, at most MAX_TREND_DAYS), empty periods included.
+    """
+    try:
+        days = int(request.GET.get("days", 7))
+    except ValueError:
+        days = 0
+    bucket = request.GET.get("bucket", "day")
+    if not 1 <= days <= MAX_TREND_DAYS or bucket not in BUCKETS:
+        return _json({"error": f"days must be 1-{MAX_TREND_DAYS} and bucket one of {', '.join(BUCKETS)}."}, status=400)
+
+    def build():
+        series = usage_series(request.user.pk, days, bucket)
+        return {"labels": [str(start) for start, _ in series], "values": [minutes for _, minutes in series]}
+    return _json(cached_fragment(f"api_trend_{bucket}_{days}", request.user.pk, build))
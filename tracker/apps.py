@@ -6,3 +6,12 @@ class TrackerConfig(AppConfig):
 
     def ready(self):
         import tracker.signals
+        from django.db.backends.signals import connection_created
+        from tracker.perf import install_query_timer
+        from tracker.petLogic import resolve_static_urls
+        connection_created.connect(install_query_timer, dispatch_uid="tracker_query_timer")
+        try:
+            resolve_static_urls()
+        except ValueError:
+            # Manifest storage without collectstatic; return_pet_info resolves on first use instead
+            pass
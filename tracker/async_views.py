@@ -0,0 +1,110 @@
+"""
+Async versions of the read-heavy pages, routed when settings.TRACKER_ASYNC_VIEWS is on.
+
+Single-row lookups use Django's async ORM. The rest (usage aggregation,
+usage-store reads, which may be CSV files, the stats cache and template
+rendering) blocks, so blocking() runs it on a bounded pool of
+settings.TRACKER_ASYNC_THREADS threads shared by all requests, and the
+event loop keeps serving other readers meanwhile. Pages and contexts are
+the same as the sync views in tracker.views, built by the same functions.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.db import close_old_connections
+from django.http import JsonResponse
+from django.shortcuts import aget_object_or_404, render
+
+from . import views
+from .models import UserProfile
+from .share_codes import get_share_codes, normalize_code
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.TRACKER_ASYNC_THREADS, thread_name_prefix="tracker-async"
+            )
+        return _executor
+
+
+def _run_closing(func, *args):
+    # Pool threads outlive requests, so give back their connections the way request_finished would
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+async def blocking(func, *args):
+    """
+    Await func(*args) run on the pool. With TRACKER_ASYNC_THREADS = 0 it
+    runs on the request's own sync thread instead, as sync views do (the
+    tests use this, since their transaction is not visible to other threads).
+    """
+    if not settings.TRACKER_ASYNC_THREADS:
+        return await sync_to_async(func)(*args)
+    return await sync_to_async(_run_closing, thread_sensitive=False, executor=_pool())(func, *args)
+
+
+async def _user(request):
+    # Resolve the user once, so sync code on the pool reads it without another query
+    request.user = await request.auser()
+    return request.user
+
+
+async def _page(request, template_name, build, *args):
+    """Render `template_name` with the context from build(*args), both on the pool."""
+    return await blocking(lambda: render(request, template_name, build(*args)))
+
+
+@login_required(login_url='/accounts/login/')
+async def stats(request):
+    """Async tracker.views.stats."""
+    await _user(request)
+    return await _page(request, "tracker/stats.html", views.stats_page_context, request)
+
+
+@login_required(login_url='/accounts/login/')
+async def leaderboard(request):
+    """Async tracker.views.leaderboard."""
+    await _user(request)
+    window = views.leaderboard_window(request)
+    return await _page(request, "tracker/leaderboard.html", views.leaderboard_context, window, get_share_codes(request))
+
+
+async def track_user_detail(request, share_code):
+    """Async tracker.views.track_user_detail."""
+    await _user(request)
+    profile = await aget_object_or_404(UserProfile.objects.select_related("user"), share_code=normalize_code(share_code))
+    return await _page(request, "tracker/track_user_detail.html", views.track_user_detail_context, profile)
+
+
+async def track_user_history(request, share_code):
+    """Async tracker.views.track_user_history."""
+    profile = await aget_object_or_404(UserProfile.objects.select_related("user"), share_code=normalize_code(share_code))
+    try:
+        entries, next_cursor = await blocking(
+            views.history_page, profile.user, profile.share_code, request.GET.get("before")
+        )
+    except ValueError:
+        return JsonResponse({"error": "Invalid cursor."}, status=400)
+    return JsonResponse({"entries": entries, "next": next_cursor})
+
+
+@login_required(login_url='/accounts/login/')
+async def friends_list(request):
+    """Async tracker.views.friends_list."""
+    user = await _user(request)
+    # Profiles in the friends of `user`'s profile, without loading that profile first
+    friends = UserProfile.objects.filter(userprofile__user=user).select_related("user").order_by("user__username")
+    friends = [friend async for friend in friends]
+    return await _page(request, "tracker/friends_list.html", views.friends_context, friends)
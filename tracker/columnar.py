@@ -0,0 +1,285 @@
+"""
+Columnar usage backend.
+
+ColumnarUsageStore keeps usage as fixed-width binary records, one
+partition file per share code under settings.USAGE_COLUMNAR_PATH:
+
+    platforms.json      platform names; a record stores its index here
+    parts/<CODE>.bin    records of ROW, in write order
+    schema.json         the USAGE_SCHEMA_VERSION the records meet
+
+A record is a day number (int32 days since 1970-01-01), a platform code
+and the minutes: ROW.itemsize bytes instead of a CSV line, and nothing to
+parse or re-infer on read. Partitions are memory-mapped, so a share-code
+filter only touches that code's file and a date range is one vectorized
+mask over its day column. Appends hold the same kind of flock as the CSV
+backend; a write torn by a crash leaves a partial record at the end of a
+partition, which readers ignore.
+
+convert_csv() fills a store from usage_data.csv, setting aside every row
+that cannot be stored faithfully in a quarantine CSV with its line
+number and the reason (see usage_store.clean_row). Select the backend with
+USAGE_STORE_BACKEND = 'tracker.columnar.ColumnarUsageStore'.
+"""
+import csv
+import json
+import os
+
+import numpy as np
+from django.conf import settings
+
+from .perf import record_store_io
+from .signals import usage_recorded
+from .usage_store import (
+    CODE_PATTERN, MAX_MINUTES, USAGE_COLUMNS, USAGE_SCHEMA_VERSION, HistoryRow, UsageRecord, UsageStore,
+    ValidationResult, check_records, clean_row, file_lock, quarantine_writer, read_schema_version, replaced,
+    write_schema_version,
+)
+
+ROW = np.dtype([("day", "<i4"), ("platform", "<u2"), ("minutes", "<u4")])
+
+
+def day_numbers(dates):
+    """int32 day numbers for ISO date strings or dates; raises ValueError on a malformed one."""
+    return np.asarray(dates, dtype="datetime64[D]").astype(ROW["day"])
+
+
+def iso_dates(days):
+    """ISO date strings for an array of day numbers."""
+    return days.astype("datetime64[D]").astype(str)
+
+
+class ColumnarUsageStore(UsageStore):
+    """Keeps entries in memory-mapped binary partitions, one per share code."""
+
+    def __init__(self, path=None):
+        self.path = path or settings.USAGE_COLUMNAR_PATH
+        self.parts_path = os.path.join(self.path, "parts")
+        self.lock_path = os.path.join(self.path, ".lock")
+        self.schema_path = os.path.join(self.path, "schema.json")
+
+    def locked(self):
+        """Hold the writer lock for the whole store, creating it at the current schema version."""
+        if not os.path.isdir(self.parts_path):
+            os.makedirs(self.parts_path, exist_ok=True)
+            write_schema_version(self.schema_path)
+        return file_lock(self.lock_path)
+
+    # --- platform table ----------------------------------------------------
+
+    def platforms(self):
+        """Platform names; a record's platform code indexes this list."""
+        try:
+            with open(os.path.join(self.path, "platforms.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def _platform_codes(self, names):
+        # Codes for `names`, adding unseen ones to the table; call with the lock held
+        table = self.platforms()
+        index = {name: code for code, name in enumerate(table)}
+        new = [name for name in dict.fromkeys(names) if name not in index]
+        if new:
+            if len(table) + len(new) > np.iinfo(ROW["platform"]).max:
+                raise ValueError("Too many distinct platforms for the columnar store")
+            for name in new:
+                index[name] = len(table)
+                table.append(name)
+            with replaced(os.path.join(self.path, "platforms.json")) as f:
+                json.dump(table, f)
+        return [index[name] for name in names]
+
+    # --- writes ------------------------------------------------------------
+
+    def append(self, records):
+        """Append UsageRecords to their partitions, fsync them and return the records as stored."""
+        records = check_records(records)
+        codes = np.array([record.code for record in records])
+        days = day_numbers([record.date for record in records])
+
+        with self.locked():
+            batch = np.empty(len(records), dtype=ROW)
+            batch["day"] = days
+            batch["platform"] = self._platform_codes([record.platform for record in records])
+            batch["minutes"] = [record.minutes for record in records]
+            for code in dict.fromkeys(codes.tolist()):
+                part = batch[codes == code]
+                with open(self._partition(code), "ab") as f:
+                    f.write(part.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                record_store_io(part.nbytes)
+        return records
+
+    def add_entry(self, user, share_code, entry_date, platform, minutes):
+        if not isinstance(entry_date, str):
+            entry_date = entry_date.isoformat()
+        [record] = self.append([UsageRecord(share_code, entry_date, platform, minutes)])
+        usage_recorded.send(sender=self.__class__, user=user, records=[record])
+        return record
+
+    def add_entries(self, user, records):
+        records = self.append(records)
+        usage_recorded.send(sender=self.__class__, user=user, records=records)
+
+    # --- validation --------------------------------------------------------
+
+    def schema_version(self):
+        if not self.codes():
+            return USAGE_SCHEMA_VERSION
+        return read_schema_version(self.schema_path)
+
+    def validate(self, quarantine, dry_run=False):
+        # Appends already check records, so this catches partitions written by hand or by
+        # older code: unknown platform codes, minutes past MAX_MINUTES, torn tails
+        kept = quarantined = 0
+        first_day, last_day = day_numbers(["0001-01-01", "9999-12-31"])
+        with self.locked():
+            platforms = self.platforms()
+            for code in self.codes():
+                path = self._partition(code)
+                size = os.path.getsize(path)
+                rows = np.fromfile(path, dtype=ROW, count=size // ROW.itemsize)
+                reasons = np.full(len(rows), "", dtype=object)
+                reasons[rows["minutes"] > MAX_MINUTES] = "minutes out of range"
+                reasons[rows["platform"] >= len(platforms)] = "missing platform"
+                reasons[(rows["day"] < first_day) | (rows["day"] > last_day)] = "invalid date"
+                if not CODE_PATTERN.fullmatch(code):
+                    reasons[:] = "invalid share code"
+                bad = reasons != ""
+                for index in np.flatnonzero(bad).tolist():
+                    day, platform, minutes = rows[index].tolist()
+                    if reasons[index] != "invalid date":
+                        day = str(np.datetime64(day, "D"))
+                    if platform < len(platforms):
+                        platform = platforms[platform]
+                    quarantine(f"{code}.bin#{index}", reasons[index], [code, day, platform, minutes])
+                kept += int((~bad).sum())
+                quarantined += int(bad.sum())
+                if dry_run or not (bad.any() or size % ROW.itemsize):
+                    continue
+                if bad.all():
+                    os.unlink(path)
+                else:
+                    with replaced(path, "wb") as f:
+                        f.write(rows[~bad].tobytes())
+            if not dry_run:
+                write_schema_version(self.schema_path)
+        return ValidationResult(kept, 0, quarantined)
+
+    # --- reads -------------------------------------------------------------
+
+    def _partition(self, code):
+        return os.path.join(self.parts_path, f"{code}.bin")
+
+    def codes(self):
+        """Share codes that have a partition, sorted."""
+        try:
+            names = os.listdir(self.parts_path)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-4] for name in names if name.endswith(".bin"))
+
+    def read(self, code):
+        """The code's records as a read-only memory-mapped ROW array (empty if it has none)."""
+        path = self._partition(code)
+        try:
+            count = os.path.getsize(path) // ROW.itemsize
+        except OSError:
+            count = 0
+        if not count:
+            return np.empty(0, dtype=ROW)
+        rows = np.memmap(path, dtype=ROW, mode="r", shape=(count,))
+        record_store_io(rows.nbytes)
+        return rows
+
+    def select(self, share_code=None, start=None, end=None):
+        """Yield (code, records) per partition, records limited to [start, end] and ordered by day."""
+        self.check_schema()
+        if share_code is not None and not CODE_PATTERN.fullmatch(share_code):
+            return
+        for code in [share_code] if share_code is not None else self.codes():
+            rows = self.read(code)
+            if start is not None or end is not None:
+                mask = np.ones(len(rows), dtype=bool)
+                if start is not None:
+                    mask &= rows["day"] >= day_numbers(start)
+                if end is not None:
+                    mask &= rows["day"] <= day_numbers(end)
+                rows = rows[mask]
+            if len(rows):
+                yield code, rows[np.argsort(rows["day"], kind="stable")]
+
+    def entries(self, share_code=None, start=None, end=None):
+        platforms = self.platforms()
+        for code, rows in self.select(share_code, start, end):
+            days = iso_dates(rows["day"]).tolist()
+            for day, platform, minutes in zip(days, rows["platform"].tolist(), rows["minutes"].tolist()):
+                yield UsageRecord(code, day, platforms[platform], minutes)
+
+    def history(self, user, share_code, before=None, limit=50):
+        # A record's id is its position in the partition, so (day, id) orders like TimeEntry's (date, id)
+        self.check_schema()
+        rows = self.read(share_code) if CODE_PATTERN.fullmatch(share_code or "") else np.empty(0, dtype=ROW)
+        ids = np.arange(len(rows))
+        if before is not None:
+            before_day = day_numbers(before[0])
+            keep = (rows["day"] < before_day) | ((rows["day"] == before_day) & (ids < before[1]))
+            rows, ids = rows[keep], ids[keep]
+        order = np.lexsort((ids, rows["day"]))[::-1][:limit]
+        platforms = self.platforms()
+        rows, ids = rows[order], ids[order]
+        return [
+            HistoryRow(row_id, day, platforms[platform], minutes)
+            for row_id, day, platform, minutes in zip(
+                ids.tolist(), iso_dates(rows["day"]).tolist(), rows["platform"].tolist(), rows["minutes"].tolist()
+            )
+        ]
+
+    def dataframe(self, share_code=None):
+        import pandas as pd
+
+        platforms = np.array(self.platforms() or [""], dtype=object)
+        frames = [
+            pd.DataFrame({
+                "Code": code,
+                "Date": iso_dates(rows["day"]),
+                "Platform": platforms[rows["platform"]],
+                "Minutes": rows["minutes"].astype(np.int64),
+            })
+            for code, rows in self.select(share_code)
+        ]
+        if not frames:
+            return pd.DataFrame(columns=USAGE_COLUMNS)
+        return pd.concat(frames, ignore_index=True)[USAGE_COLUMNS]
+
+
+def convert_csv(csv_path, store, quarantine_path, batch_size=10000):
+    """
+    Append every storable row of `csv_path` to `store` and write the rest to
+    `quarantine_path` (line, reason and the original columns). Returns
+    (rows converted, rows quarantined).
+    """
+    converted = quarantined = 0
+    batch = []
+    with open(csv_path, newline="") as src, open(quarantine_path, "w", newline="") as bad:
+        quarantine = quarantine_writer(bad)
+        reader = csv.DictReader(src)
+        for row in reader:
+            if not any((value or "").strip() for value in row.values() if isinstance(value, str)):
+                continue
+            record, reason = clean_row(row)
+            if record is None:
+                quarantine(f"line {reader.line_num}", reason, [row.get(column) or "" for column in USAGE_COLUMNS])
+                quarantined += 1
+                continue
+            batch.append(record)
+            if len(batch) >= batch_size:
+                store.append(batch)
+                converted += len(batch)
+                batch = []
+    if batch:
+        store.append(batch)
+        converted += len(batch)
+    return converted, quarantined
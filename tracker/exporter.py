@@ -0,0 +1,148 @@
+"""
+Streaming usage export.
+
+Each encoder turns an iterator of UsageRecords into an iterator of byte
+chunks, so a view can hand it to StreamingHttpResponse and memory stays at
+one chunk however many rows the store holds. Stores read entries with a
+server-side cursor (database) or line by line (CSV), never all at once.
+
+Parquet needs pyarrow, which is optional: parquet_available() says whether
+it can be offered.
+"""
+import csv
+import io
+import json
+import zlib
+from itertools import islice
+
+from .usage_store import USAGE_COLUMNS
+
+# Rows per chunk sent to the client; also the Parquet row-group size
+CHUNK_ROWS = 5000
+
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def formats():
+    """Export formats usable in this install."""
+    return [fmt for fmt in CONTENT_TYPES if fmt != "parquet" or parquet_available()]
+
+
+def _chunks(records):
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, CHUNK_ROWS))
+        if not chunk:
+            return
+        yield chunk
+
+
+def csv_stream(records):
+    """USAGE_COLUMNS header, then one line per record."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(USAGE_COLUMNS)
+    for chunk in _chunks(records):
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def json_stream(records):
+    """A JSON array of {Code, Date, Platform, Minutes} objects, written a chunk at a time."""
+    yield b"["
+    first = True
+    for chunk in _chunks(records):
+        body = ",\n".join(json.dumps(dict(zip(USAGE_COLUMNS, record))) for record in chunk)
+        yield (body if first else ",\n" + body).encode()
+        first = False
+    yield b"]\n"
+
+
+class _ParquetSink:
+    # Write-only file object for pyarrow that hands bytes back to the generator instead of keeping them
+    def __init__(self):
+        self.pending = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.pending.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.pending)
+        self.pending.clear()
+        return data
+
+
+def parquet_stream(records):
+    """A Parquet file with one row group per CHUNK_ROWS records. Requires pyarrow."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("Code", pa.string()),
+        ("Date", pa.string()),
+        # int32 indices, dictionary_encode()'s own: platforms are not limited to Platform in every store
+        ("Platform", pa.dictionary(pa.int32(), pa.string())),
+        ("Minutes", pa.int64()),
+    ])
+    sink = _ParquetSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+    for chunk in _chunks(records):
+        codes, dates, platforms, minutes = zip(*chunk)
+        writer.write_table(pa.table({
+            "Code": pa.array(codes, pa.string()),
+            "Date": pa.array(dates, pa.string()),
+            "Platform": pa.array(platforms, pa.string()).dictionary_encode(),
+            "Minutes": pa.array(minutes, pa.int64()),
+        }, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {"csv": csv_stream, "json": json_stream, "parquet": parquet_stream}
+
+
+def gzip_stream(chunks, level=6):
+    """Gzip a stream of byte chunks on the fly."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(records, fmt="csv", gzip=False):
+    """Byte chunks of `records` encoded as `fmt`, gzipped if asked."""
+    chunks = ENCODERS[fmt](records)
+    return gzip_stream(chunks) if gzip else chunks
@@ -0,0 +1,187 @@
+"""
+Bulk usage import.
+
+Screen-time exports arrive as CSV or JSON Lines, one row per day and
+platform. import_usage() reads them a row at a time, so a file is never
+held in memory, and writes in batches: one bulk insert through the usage
+store and one usage_recorded signal (hence one rollup update) per batch.
+
+Pet points are then recomputed once per user through tracker.tasks.
+
+A row is skipped as a duplicate when its (user, date, platform) already
+has usage, either in DailyUsage or earlier in the same file, so importing
+the same export twice adds nothing the second time.
+"""
+import csv
+import json
+import math
+import time
+from collections import namedtuple
+from datetime import date
+
+from django.contrib.auth.models import User
+
+from .models import DailyUsage, Platform, UserProfile
+from . import tasks
+from .share_codes import normalize_code
+from .timeseries import local_today
+from .usage_store import UsageRecord, clean_minutes, get_usage_store
+
+FORMATS = ("csv", "jsonl")
+
+# Lower-cased column names accepted for each field; the first ones are the usage_data.csv headers
+FIELD_ALIASES = {
+    "code": ("code", "share_code"),
+    "date": ("date", "day"),
+    "platform": ("platform", "app", "app_name"),
+    "minutes": ("minutes", "duration_minutes", "usage_minutes"),
+    "seconds": ("seconds", "duration_seconds"),
+}
+
+_PLATFORMS = {value.lower(): value for value in Platform.values}
+
+
+class ImportResult(namedtuple("ImportResult", ["created", "duplicates", "invalid", "seconds"])):
+    """Counts from one import; `rate` is rows read per second."""
+
+    @property
+    def rate(self):
+        rows = self.created + self.duplicates + self.invalid
+        return rows / self.seconds if self.seconds else float(rows)
+
+
+def format_for(filename):
+    """Guess the format from a file name: .jsonl/.ndjson are JSON Lines, anything else CSV."""
+    return "jsonl" if filename.lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def read_rows(stream, fmt):
+    """Yield (line number, {field: value}) from a text stream, keys normalised through FIELD_ALIASES."""
+    if fmt == "jsonl":
+        raw_rows = ((n, _json_row(line)) for n, line in enumerate(stream, start=1) if line.strip())
+    elif fmt == "csv":
+        raw_rows = enumerate(csv.DictReader(stream), start=2)
+    else:
+        raise ValueError(f"Unknown import format {fmt!r}")
+
+    for line_no, raw in raw_rows:
+        if raw is None:
+            yield line_no, {}
+            continue
+        lowered = {str(key).strip().lower(): value for key, value in raw.items() if key is not None}
+        row = {}
+        for field, aliases in FIELD_ALIASES.items():
+            for alias in aliases:
+                if lowered.get(alias) not in (None, ""):
+                    row[field] = lowered[alias]
+                    break
+        yield line_no, row
+
+
+def _json_row(line):
+    try:
+        row = json.loads(line)
+    except ValueError:
+        return None
+    return row if isinstance(row, dict) else None
+
+
+def clean_row(row):
+    """
+    (share code or None, date, platform, minutes) for a read_rows() row, or
+    None if it is unusable. Minutes follow the usage store's rules
+    (usage_store.clean_minutes), so every row kept here can be stored.
+    """
+    try:
+        day = date.fromisoformat(str(row["date"]).strip()[:10])
+        if "minutes" in row:
+            minutes, reason = clean_minutes(row["minutes"])
+        else:
+            seconds = float(row["seconds"])
+            # Seconds are rounded to the nearest minute; inf and nan are left for clean_minutes to reject
+            minutes, reason = clean_minutes(round(seconds / 60) if math.isfinite(seconds) else seconds)
+    except (KeyError, TypeError, ValueError):
+        return None
+    platform = _PLATFORMS.get(str(row.get("platform", "")).strip().lower())
+    if reason or platform is None or day > local_today():
+        return None
+    code = normalize_code(row["code"]) if "code" in row else None
+    return code, day, platform, minutes
+
+
+def import_usage(stream, fmt="csv", user=None, batch_size=1000, store=None, log=None):
+    """
+    Import every usable row from `stream` and return an ImportResult.
+
+    With `user`, all rows belong to that user and any Code column is
+    ignored; otherwise each row's Code picks the user. `log(line_no, reason)`
+    is called for each skipped row.
+    """
+    store = store or get_usage_store()
+    started = time.perf_counter()
+    if user is not None:
+        codes = {None: (user.pk, user.userprofile.share_code)}
+    else:
+        codes = {code: (user_id, code) for code, user_id in UserProfile.objects.values_list("share_code", "user_id")}
+
+    seen = set()
+    batch = []
+    touched = set()
+    created = duplicates = invalid = 0
+
+    def flush():
+        nonlocal created, duplicates
+        written, skipped = _write_batch(store, batch, seen)
+        created += written
+        duplicates += skipped
+        touched.update(user_id for user_id, _, _, _, _ in batch)
+        batch.clear()
+
+    for line_no, row in read_rows(stream, fmt):
+        cleaned = clean_row(row)
+        owner = None
+        if cleaned is not None:
+            owner = codes.get(None if user is not None else cleaned[0])
+        if owner is None:
+            invalid += 1
+            if log:
+                log(line_no, "unknown user" if cleaned else "invalid row")
+            continue
+        user_id, share_code = owner
+        _, day, platform, minutes = cleaned
+        batch.append((user_id, share_code, day, platform, minutes))
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    for user_id in sorted(touched):
+        # Imported history can be retroactive, so replay it once per user at the end
+        tasks.enqueue("pet_points", user_id)
+    return ImportResult(created, duplicates, invalid, time.perf_counter() - started)
+
+
+def _write_batch(store, batch, seen):
+    # Drop rows whose (user, date, platform) is already known, then write the rest per user
+    if not batch:
+        return 0, 0
+    existing = set(
+        DailyUsage.objects.filter(
+            user_id__in={row[0] for row in batch},
+            date__in={row[2] for row in batch},
+        ).values_list("user_id", "date", "platform")
+    )
+
+    by_user = {}
+    skipped = 0
+    for user_id, share_code, day, platform, minutes in batch:
+        key = (user_id, day, platform)
+        if key in seen or key in existing:
+            skipped += 1
+            continue
+        seen.add(key)
+        by_user.setdefault(user_id, []).append(UsageRecord(share_code, day.isoformat(), platform, minutes))
+
+    users = User.objects.in_bulk(list(by_user))
+    for user_id, records in by_user.items():
+        store.add_entries(users[user_id], records)
+    return sum(len(records) for records in by_user.values()), skipped
@@ -0,0 +1,86 @@
+"""
+Leaderboard index.
+
+LeaderboardTotal keeps one row per (window, period, share code), bumped on
+every write, so the leaderboard page never scans raw usage. Windows:
+
+    day   - period_start is the entry date
+    week  - period_start is the Monday of the entry's week
+    all   - period_start is ALL_TIME, one row per share code
+
+Lower minutes rank higher. Top-N and a single code's rank both read the
+(window, period_start, minutes) index.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.db import transaction
+
+from .models import LeaderboardTotal
+from .rollups import add_totals, parse_record
+from .timeseries import local_today
+
+WINDOWS = ["day", "week", "all"]
+ALL_TIME = date(1970, 1, 1)
+
+
+def period_start(window, day):
+    """First day of the `window` period containing `day`."""
+    if window == "day":
+        return day
+    if window == "week":
+        return day - timedelta(days=day.weekday())
+    return ALL_TIME
+
+
+def _totals(records):
+    # {(window, period_start, code): minutes} for a batch of UsageRecords
+    totals = defaultdict(int)
+    for record in records:
+        day, _, minutes = parse_record(record)
+        for window in WINDOWS:
+            totals[(window, period_start(window, day), record.code)] += minutes
+    return totals
+
+
+def record_leaderboard(records):
+    """Add freshly written records to the leaderboard totals."""
+    add_totals(LeaderboardTotal, ("window", "period_start", "share_code"), _totals(records))
+
+
+def rebuild_leaderboard(store):
+    """Regenerate every leaderboard window from `store`. Returns the number of rows written."""
+    rows = [
+        LeaderboardTotal(window=window, period_start=start, share_code=code, minutes=minutes)
+        for (window, start, code), minutes in _totals(store.entries()).items()
+    ]
+    with transaction.atomic():
+        LeaderboardTotal.objects.all().delete()
+        LeaderboardTotal.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def _board(window, today=None):
+    return LeaderboardTotal.objects.filter(
+        window=window, period_start=period_start(window, today or local_today()),
+    )
+
+
+def top(window, limit=10, today=None):
+    """The `limit` lowest totals in the current `window`, as dicts with Rank, Code and Minutes."""
+    board = []
+    rows = _board(window, today).order_by("minutes", "share_code").values_list("share_code", "minutes")[:limit]
+    for position, (code, minutes) in enumerate(rows, start=1):
+        # Ties share a rank, matching rank_of()
+        rank = board[-1]["Rank"] if board and board[-1]["Minutes"] == minutes else position
+        board.append({"Rank": rank, "Code": code, "Minutes": minutes})
+    return board
+
+
+def rank_of(window, share_code, today=None):
+    """(rank, minutes) for `share_code` in the current `window`, or None if it has no usage there."""
+    board = _board(window, today)
+    minutes = board.filter(share_code=share_code).values_list("minutes", flat=True).first()
+    if minutes is None:
+        return None
+    return board.filter(minutes__lt=minutes).count() + 1, minutes
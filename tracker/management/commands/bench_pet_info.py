@@ -0,0 +1,46 @@
+import io
+import timeit
+from contextlib import redirect_stdout
+
+from django.core.management.base import BaseCommand
+
+from tracker import petLogic
+
+POINTS = list(range(0, 101, 7))
+
+
+def uncached_pet_info(pet, points):
+    # The per-call work of the old if/elif ladder: walk the stages, build the
+    # static URL through the storage backend and print it.
+    for lower, stage in zip([0] + petLogic._UPPERS[pet], petLogic.PETS[pet]):
+        if points <= stage.upper:
+            image = petLogic.safe_image(stage.image)
+            print("IMAGE SELECTED:", image)
+            return [image, stage.name, stage.progress(points, lower, stage.upper)]
+    return [None, None, None]
+
+
+class Command(BaseCommand):
+    help = "Microbenchmark petLogic.return_pet_info against per-call static() lookups."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--number", type=int, default=20000, help="Calls per measurement.")
+
+    def handle(self, *args, **options):
+        number = options["number"]
+        cases = [(pet, points) for pet in petLogic.PETS for points in POINTS]
+
+        def run(func):
+            for pet, points in cases:
+                func(pet, points)
+
+        rounds = max(1, number // len(cases))
+        with redirect_stdout(io.StringIO()):
+            before = min(timeit.repeat(lambda: run(uncached_pet_info), number=rounds, repeat=5))
+        after = min(timeit.repeat(lambda: run(petLogic.return_pet_info), number=rounds, repeat=5))
+
+        calls = rounds * len(cases)
+        before_us, after_us = before / calls * 1e6, after / calls * 1e6
+        self.stdout.write(f"before (static() + print per call): {before_us:7.2f} us/call")
+        self.stdout.write(f"after  (stage table + cached URLs): {after_us:7.2f} us/call")
+        self.stdout.write(self.style.SUCCESS(f"{before_us / after_us:.1f}x faster"))
@@ -0,0 +1,43 @@
+import time
+from datetime import date
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.petLogic import score_history
+from tracker.scoring import score_histories
+
+
+class Command(BaseCommand):
+    help = "Benchmark vectorized pet scoring against the scalar fold on synthetic usage."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100_000)
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--sample", type=int, default=1000, help="Users scored with the scalar fold for comparison.")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        users, days = options["users"], options["days"]
+        # Mostly 0-180 minutes a day, with about a fifth of the days idle
+        totals = rng.integers(0, 180, size=(users, days), dtype=np.int64)
+        totals[rng.random((users, days)) < 0.2] = 0
+        first_day = date(2025, 1, 1)
+
+        start = time.perf_counter()
+        vectorized = score_histories(totals, first_day)
+        vector_seconds = time.perf_counter() - start
+
+        sample = min(options["sample"], users)
+        start = time.perf_counter()
+        scalar = [score_history(row.tolist(), first_day) for row in totals[:sample]]
+        scalar_seconds = (time.perf_counter() - start) * users / sample
+
+        if vectorized[:sample].tolist() != scalar:
+            raise CommandError("Vectorized scores differ from the scalar fold.")
+
+        self.stdout.write(f"{users} users x {days} days")
+        self.stdout.write(f"  vectorized: {vector_seconds:8.2f} s")
+        self.stdout.write(f"  scalar:     {scalar_seconds:8.2f} s (extrapolated from {sample} users)")
+        self.stdout.write(self.style.SUCCESS(f"  speedup:    {scalar_seconds / vector_seconds:8.1f}x, results identical on the sample"))
@@ -0,0 +1,68 @@
+import json
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Cold start of one worker: set up Django and import the views module.
+# "eager" also imports pandas, which is what every worker paid when
+# tracker.views imported it at module load.
+CHILD = """
+import json, os, resource, sys, time
+start = time.perf_counter()
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "shortform_tracker.settings")
+import django
+django.setup()
+import tracker.views
+{extra}
+print(json.dumps({{
+    "seconds": time.perf_counter() - start,
+    "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "pandas_loaded": "pandas" in sys.modules,
+}}))
+"""
+
+VARIANTS = {
+    "lazy": "",
+    "eager": "import pandas",
+}
+
+
+class Command(BaseCommand):
+    help = "Measure worker cold-start time and peak RSS with and without pandas imported up front."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--json", dest="json_path", default=None, help="Also write results to this file.")
+
+    def handle(self, *args, **options):
+        results = {}
+        for name, extra in VARIANTS.items():
+            samples = [self._run(extra) for _ in range(options["runs"])]
+            results[name] = {
+                "median_seconds": statistics.median(s["seconds"] for s in samples),
+                "median_max_rss_kb": statistics.median(s["max_rss_kb"] for s in samples),
+                "pandas_loaded": samples[0]["pandas_loaded"],
+            }
+            self.stdout.write(
+                f"{name:>5}: {results[name]['median_seconds'] * 1000:8.1f} ms  "
+                f"{results[name]['median_max_rss_kb'] / 1024:7.1f} MiB  "
+                f"pandas loaded: {results[name]['pandas_loaded']}"
+            )
+
+        saved_ms = (results["eager"]["median_seconds"] - results["lazy"]["median_seconds"]) * 1000
+        saved_mib = (results["eager"]["median_max_rss_kb"] - results["lazy"]["median_max_rss_kb"]) / 1024
+        self.stdout.write(self.style.SUCCESS(f"Lazy import saves {saved_ms:.1f} ms and {saved_mib:.1f} MiB per worker."))
+
+        if options["json_path"]:
+            with open(options["json_path"], "w") as f:
+                json.dump(results, f, indent=2)
+
+    def _run(self, extra):
+        out = subprocess.run(
+            [sys.executable, "-c", CHILD.format(extra=extra)],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+        return json.loads(out.stdout.strip().splitlines()[-1])
@@ -0,0 +1,75 @@
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from tracker.aggregates import day_totals, usage_rows
+from tracker.models import DailyUsage, Platform
+from tracker.timeseries import BUCKETS, RANGES, local_today, usage_series
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark tracker.timeseries on a year of synthetic DailyUsage per user. "
+        "The data is written inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--platforms", type=int, default=4, help="Platforms used per user per day.")
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, options):
+        rng = np.random.default_rng(options["seed"])
+        today = local_today()
+        platforms = Platform.values[:options["platforms"]]
+        users = [User.objects.create_user(f"bench_timeseries_{i}") for i in range(options["users"])]
+
+        rows = []
+        for user in users:
+            minutes = rng.integers(0, 120, size=(options["days"], len(platforms)))
+            minutes[rng.random(minutes.shape) < 0.3] = 0
+            for offset in range(options["days"]):
+                day = today - timedelta(days=offset)
+                for platform, value in zip(platforms, minutes[offset]):
+                    if value:
+                        rows.append(DailyUsage(user=user, date=day, platform=platform, minutes=int(value)))
+        DailyUsage.objects.bulk_create(rows, batch_size=2000)
+        self.stdout.write(f"{len(users)} users, {len(rows)} DailyUsage rows over {options['days']} days")
+
+        def timed(func):
+            best = float("inf")
+            for _ in range(options["repeat"]):
+                start = time.perf_counter()
+                for user in users:
+                    func(user.pk)
+                best = min(best, time.perf_counter() - start)
+            return best / len(users) * 1000
+
+        for days in RANGES:
+            since = today - timedelta(days=days)
+            # The old trend: every row of the user, then a Python filter, with no empty days
+            before = timed(lambda user_id: day_totals(usage_rows(DailyUsage.objects.filter(user_id=user_id)), since=since))
+            line = f"  {days:>3} days: all rows + filter {before:6.2f} ms/user"
+            for bucket in BUCKETS:
+                after = timed(lambda user_id: usage_series(user_id, days, bucket, today=today))
+                line += f" | {bucket} {after:6.2f}"
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS("usage_series timings are ms/user, one grouped query each, gap-filled."))
@@ -0,0 +1,383 @@
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from tracker.columnar import ColumnarUsageStore, convert_csv
+from tracker.leaderboard import rebuild_leaderboard
+from tracker.models import Platform, TimeEntry, UserProfile
+from tracker.perf import percentile
+from tracker.rollups import rebuild_daily_usage, rebuild_platform_totals
+from tracker.timeseries import local_today
+from tracker.usage_store import USAGE_COLUMNS, CsvUsageStore, DatabaseUsageStore, write_schema_version
+
+BACKENDS = {
+    "db": "tracker.usage_store.DatabaseUsageStore",
+    "csv": "tracker.usage_store.CsvUsageStore",
+    "columnar": "tracker.columnar.ColumnarUsageStore",
+}
+# gunicorn and uvicorn are optional; a server driver that fails to start is reported as unavailable
+DRIVERS = ["client", "gunicorn", "uvicorn"]
+# Views that read or write the UsageStore, compared across backends. The others read the
+# DailyUsage/PlatformTotal/LeaderboardTotal rollups, so they run once, under the first backend.
+STORE_VIEWS = ["add_entry", "track_user_detail", "export_usage"]
+ROLLUP_VIEWS = ["stats", "leaderboard", "resources", "friends_list"]
+VIEWS = STORE_VIEWS + ROLLUP_VIEWS
+
+# Settings module for the server processes, written into the scratch directory
+SERVER_SETTINGS = """\
+from shortform_tracker.settings import *
+
+DEBUG = False
+DATABASES = {{"default": {{"ENGINE": "django.db.backends.sqlite3", "NAME": {db_path!r}, "OPTIONS": {{"timeout": 30, "transaction_mode": "IMMEDIATE"}}}}}}
+USAGE_STORE_BACKEND = {backend!r}
+USAGE_CSV_PATH = {csv_path!r}
+USAGE_COLUMNAR_PATH = {columnar_path!r}
+"""
+
+# Added for uvicorn: the async views, without the sync-only WhiteNoise middleware
+ASGI_SETTINGS = """\
+TRACKER_ASYNC_VIEWS = True
+MIDDLEWARE = [name for name in MIDDLEWARE if name != "whitenoise.middleware.WhiteNoiseMiddleware"]
+"""
+
+
+class ServerUnavailable(CommandError):
+    """A server driver did not start, usually because it is not installed."""
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test home (add_entry), track_user_detail and export_usage per usage backend, and the "
+        "rollup-backed stats, leaderboard, resources and friends_list once, on synthetic data, through the test client and, with --drivers, a local gunicorn "
+        "(sync views) and a local uvicorn (async views). Runs against a scratch database and writes throughput and latency "
+        "percentiles to a JSON file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--rows", type=int, default=100_000, help="Usage entries to seed.")
+        parser.add_argument("--friends", type=int, default=5, help="Friends per user.")
+        parser.add_argument("--requests", type=int, default=200, help="Requests per view.")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--backends", default="db,csv,columnar", help=f"Comma-separated, from: {', '.join(BACKENDS)}.")
+        parser.add_argument(
+            "--drivers", default="client",
+            help=f"Comma-separated, from: {', '.join(DRIVERS)}. gunicorn and uvicorn must be installed separately.",
+        )
+        parser.add_argument("--workers", type=int, default=4, help="gunicorn worker processes.")
+        parser.add_argument("--asgi-workers", type=int, default=1, help="uvicorn worker processes.")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", default="bench_views.json")
+        parser.add_argument("--baseline", default=None, help="Earlier --output file to compare against.")
+
+    def handle(self, *args, **options):
+        backends = options["backends"].split(",")
+        drivers = options["drivers"].split(",")
+        if set(backends) - set(BACKENDS) or set(drivers) - set(DRIVERS):
+            raise CommandError("Unknown backend or driver.")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "bench.sqlite3")
+            csv_path = os.path.join(tmp, "usage_data.csv")
+            # A file database, so server processes can open it too
+            connection.settings_dict["TEST"]["NAME"] = db_path
+            # Concurrent writers queue for SQLite's write lock instead of failing with "database is locked"
+            connection.settings_dict["OPTIONS"].update(timeout=30, transaction_mode="IMMEDIATE")
+            setup_test_environment()
+            old_config = setup_databases(verbosity=0, interactive=False)
+            try:
+                profiles = self.seed(options, csv_path)
+                plan = self.requests_for(profiles, options["requests"], options["seed"])
+                sessions = self.login_sessions(plan)
+                codes = [profile.share_code for profile in profiles]
+                results = {}
+                try:
+                    for index, backend in enumerate(backends):
+                        views = VIEWS if index == 0 else STORE_VIEWS
+                        backend_plan = {view: plan[view] for view in views}
+                        for driver in drivers:
+                            run = self.run_client if driver == "client" else self.run_server
+                            try:
+                                outcome = run(options, driver, backend_plan, sessions, codes, backend, tmp, db_path, csv_path)
+                            except ServerUnavailable as exc:
+                                self.stderr.write(self.style.WARNING(f"  {backend}/{driver}: {exc}"))
+                                outcome = {"unavailable": str(exc)}
+                            results.setdefault(backend, {})[driver] = outcome
+                finally:
+                    # Whatever was measured before a failure is still worth keeping
+                    self.write_report(options, results)
+            finally:
+                teardown_databases(old_config, verbosity=0)
+                teardown_test_environment()
+
+        self.print_report(results, options["baseline"])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+    def write_report(self, options, results):
+        report = {
+            "meta": {
+                "users": options["users"],
+                "rows": options["rows"],
+                "requests_per_view": options["requests"],
+                "concurrency": options["concurrency"],
+                "gunicorn_workers": options["workers"],
+                "uvicorn_workers": options["asgi_workers"],
+                "async_threads": settings.TRACKER_ASYNC_THREADS,
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "backend_independent": ROLLUP_VIEWS,
+            },
+            "results": results,
+        }
+        with open(options["output"], "w") as f:
+            json.dump(report, f, indent=2)
+
+    # --- data -------------------------------------------------------------
+
+    def seed(self, options, csv_path):
+        rng = np.random.default_rng(options["seed"])
+        users = User.objects.bulk_create(
+            [User(username=f"bench{i}", password="!") for i in range(options["users"])], batch_size=1000,
+        )
+        profiles = UserProfile.objects.bulk_create(
+            [UserProfile(user=user, share_code=uuid.uuid4().hex[:12].upper()) for user in users], batch_size=1000,
+        )
+        Friendship = UserProfile.friends.through
+        Friendship.objects.bulk_create([
+            Friendship(from_userprofile=profile, to_userprofile=profiles[j])
+            for i, profile in enumerate(profiles)
+            for j in {int(j) for j in rng.integers(0, len(profiles), options["friends"])} - {i}
+        ], batch_size=5000)
+
+        today = local_today()
+        platforms = Platform.values
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(USAGE_COLUMNS)
+            for start in range(0, options["rows"], 50_000):
+                size = min(50_000, options["rows"] - start)
+                who = rng.integers(0, len(profiles), size)
+                ago = rng.integers(0, 365, size)
+                what = rng.integers(0, len(platforms), size)
+                minutes = rng.integers(1, 120, size)
+                batch = [
+                    TimeEntry(
+                        user_id=profiles[u].user_id, share_code=profiles[u].share_code,
+                        date=today - timedelta(days=int(d)), platform=platforms[p], minutes=int(m),
+                    )
+                    for u, d, p, m in zip(who, ago, what, minutes)
+                ]
+                TimeEntry.objects.bulk_create(batch, batch_size=5000)
+                writer.writerows((e.share_code, e.date.isoformat(), e.platform, e.minutes) for e in batch)
+        # Rows are written in their stored form, so the file starts at the current schema version
+        write_schema_version(CsvUsageStore(csv_path).schema_path)
+        columnar_path = os.path.join(os.path.dirname(csv_path), "usage_columnar")
+        convert_csv(csv_path, ColumnarUsageStore(columnar_path), columnar_path + ".quarantine.csv")
+
+        store = DatabaseUsageStore()
+        rebuild_daily_usage(store)
+        rebuild_leaderboard(store)
+        rebuild_platform_totals()
+        self.stdout.write(f"Seeded {len(profiles)} users and {options['rows']} entries")
+        return profiles
+
+    def requests_for(self, profiles, count, seed):
+        # (view, profile) pairs: each request acts as a random user
+        rng = np.random.default_rng(seed)
+        return {view: [profiles[int(i)] for i in rng.integers(0, len(profiles), count)] for view in VIEWS}
+
+    def login_sessions(self, plan):
+        # {user_id: session key}, created up front so logging in is not part of the measurement.
+        # The keys are valid in the servers too: same database, same SECRET_KEY.
+        sessions = {}
+        for who in plan.values():
+            for profile in who:
+                if profile.user_id not in sessions:
+                    client = Client()
+                    client.force_login(profile.user)
+                    sessions[profile.user_id] = client.cookies["sessionid"].value
+        return sessions
+
+    def request_args(self, view, profile, friend_code):
+        if view == "add_entry":
+            return "post", reverse("home"), {"add_entry": "1", "platform": "TikTok", "minutes": "5"}
+        if view == "track_user_detail":
+            return "get", reverse("track_user_detail", args=[friend_code]), None
+        if view == "export_usage":
+            return "get", reverse("export_usage"), {"format": "csv"}
+        return "get", reverse(view), None
+
+    # --- drivers ----------------------------------------------------------
+
+    def measure(self, calls, concurrency):
+        # Run callables on a thread pool; each returns True on success
+        latencies = []
+        errors = 0
+        first_error = None
+        lock = threading.Lock()
+
+        def timed(call):
+            nonlocal errors, first_error
+            start = time.perf_counter()
+            try:
+                ok = call()
+            except Exception as exc:
+                ok = False
+                first_error = first_error or repr(exc)
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+                errors += not ok
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            list(pool.map(timed, calls))
+        wall = time.perf_counter() - started
+        latencies.sort()
+        return {
+            "requests": len(latencies),
+            "errors": errors,
+            "rps": round(len(latencies) / wall, 1),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "first_error": first_error,
+        }
+
+    def run_client(self, options, driver, plan, sessions, codes, backend, tmp, db_path, csv_path):
+        local = threading.local()
+
+        def call(view, profile):
+            def run():
+                if not hasattr(local, "client"):
+                    local.client = Client()
+                local.client.cookies["sessionid"] = sessions[profile.user_id]
+                method, path, data = self.request_args(view, profile, codes[profile.pk % len(codes)])
+                response = getattr(local.client, method)(path, data)
+                if response.streaming:
+                    b"".join(response.streaming_content)  # an export is only done once it has been generated
+                return response.status_code < 400
+            return run
+
+        cache.clear()
+        results = {}
+        with override_settings(
+            USAGE_STORE_BACKEND=BACKENDS[backend], USAGE_CSV_PATH=csv_path,
+            USAGE_COLUMNAR_PATH=os.path.join(tmp, "usage_columnar"),
+        ):
+            for view, who in plan.items():
+                results[view] = self.measure([call(view, profile) for profile in who], options["concurrency"])
+                self.stdout.write(f"  {backend}/client {view}: {results[view]}")
+        return results
+
+    def run_server(self, options, driver, plan, sessions, codes, backend, tmp, db_path, csv_path):
+        module = f"bench_views_settings_{backend}_{driver}"
+        with open(os.path.join(tmp, module + ".py"), "w") as f:
+            f.write(SERVER_SETTINGS.format(
+                db_path=db_path, backend=BACKENDS[backend], csv_path=csv_path,
+                columnar_path=os.path.join(tmp, "usage_columnar"),
+            ))
+            if driver == "uvicorn":
+                f.write(ASGI_SETTINGS)
+
+        # An unmasked CSRF secret is accepted when the cookie and header match
+        csrf = get_random_string(32)
+        base = f"http://127.0.0.1:{options['port']}"
+
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": module}
+        if driver == "gunicorn":
+            command = [
+                "gunicorn", "shortform_tracker.wsgi:application", "--bind", f"127.0.0.1:{options['port']}",
+                "--workers", str(options["workers"]), "--chdir", str(settings.BASE_DIR), "--pythonpath", tmp,
+            ]
+        else:
+            env["PYTHONPATH"] = os.pathsep.join(filter(None, [tmp, env.get("PYTHONPATH")]))
+            command = [
+                "uvicorn", "shortform_tracker.asgi:application", "--host", "127.0.0.1", "--port", str(options["port"]),
+                "--workers", str(options["asgi_workers"]), "--app-dir", str(settings.BASE_DIR),
+            ]
+        server = subprocess.Popen([sys.executable, "-m", *command, "--log-level", "warning"], env=env)
+        try:
+            self.wait_for(base, server, driver)
+
+            def call(view, profile):
+                def run():
+                    method, path, data = self.request_args(view, profile, codes[profile.pk % len(codes)])
+                    query = urllib.parse.urlencode(data or {})
+                    body = query.encode() if method == "post" else None
+                    if query and method == "get":
+                        path += "?" + query
+                    request = urllib.request.Request(base + path, data=body, method=method.upper(), headers={
+                        "Cookie": f"sessionid={sessions[profile.user_id]}; csrftoken={csrf}",
+                        "X-CSRFToken": csrf,
+                    })
+                    with urllib.request.urlopen(request, timeout=30) as response:
+                        response.read()
+                        return response.status < 400
+                return run
+
+            results = {}
+            for view, who in plan.items():
+                results[view] = self.measure([call(view, profile) for profile in who], options["concurrency"])
+                self.stdout.write(f"  {backend}/{driver} {view}: {results[view]}")
+            return results
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    def wait_for(self, base, server, driver):
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise ServerUnavailable(f"{driver} exited; is it installed?")
+            try:
+                urllib.request.urlopen(base + "/accounts/login/", timeout=1).read()
+                return
+            except (urllib.error.URLError, OSError):
+                time.sleep(0.2)
+        raise ServerUnavailable(f"{driver} did not start within 30 seconds.")
+
+    # --- output -----------------------------------------------------------
+
+    def print_report(self, results, baseline_path):
+        baseline = {}
+        if baseline_path:
+            with open(baseline_path) as f:
+                baseline = json.load(f)["results"]
+
+        self.stdout.write(f"{'backend/driver/view':40} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'err':>4}")
+        for backend, drivers in results.items():
+            for driver, views in drivers.items():
+                if "unavailable" in views:
+                    self.stdout.write(f"{backend}/{driver:35} unavailable: {views['unavailable']}")
+                    continue
+                for view, row in views.items():
+                    name = f"{backend}/{driver}/{view}" + (" *" if view in ROLLUP_VIEWS else "")
+                    line = f"{name:40} {row['rps']:8.1f} {row['p50_ms']:8.2f} {row['p95_ms']:8.2f} {row['p99_ms']:8.2f} {row['errors']:4}"
+                    old = baseline.get(backend, {}).get(driver, {}).get(view)
+                    if old and old["p50_ms"] and old["rps"]:
+                        line += f"   p50 {row['p50_ms'] / old['p50_ms'] - 1:+.0%}, rps {row['rps'] / old['rps'] - 1:+.0%} vs baseline"
+                    self.stdout.write(line)
+        self.stdout.write("* reads the rollups, not the usage store: run under the first backend only")
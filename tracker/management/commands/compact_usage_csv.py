@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from tracker.usage_store import CsvUsageStore
+
+
+class Command(BaseCommand):
+    help = "Rewrite usage_data.csv in canonical column order, dropping blank lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default=None, help="CSV file to compact (defaults to USAGE_CSV_PATH).")
+
+    def handle(self, *args, **options):
+        store = CsvUsageStore(options["path"])
+        kept = store.compact()
+        self.stdout.write(self.style.SUCCESS(f"Compacted {store.path}: {kept} rows."))
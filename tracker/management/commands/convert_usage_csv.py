@@ -0,0 +1,37 @@
+import os
+import shutil
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.columnar import ColumnarUsageStore, convert_csv
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert usage_data.csv into the columnar usage store, writing rows that cannot be "
+        "stored (merge markers, missing codes, bad dates or minutes) to a quarantine CSV."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default=None, help="CSV file to read (defaults to USAGE_CSV_PATH).")
+        parser.add_argument("--output", default=None, help="Store directory (defaults to USAGE_COLUMNAR_PATH).")
+        parser.add_argument("--quarantine", default=None, help="Quarantine CSV (defaults to quarantine.csv in the store).")
+        parser.add_argument("--force", action="store_true", help="Replace an existing store.")
+
+    def handle(self, *args, **options):
+        path = options["path"] or settings.USAGE_CSV_PATH
+        if not os.path.exists(path):
+            raise CommandError(f"No usage file at {path}")
+        store = ColumnarUsageStore(options["output"])
+        if store.codes() or store.platforms():
+            if not options["force"]:
+                raise CommandError(f"{store.path} already holds usage; pass --force to replace it.")
+            shutil.rmtree(store.path)
+        os.makedirs(store.path, exist_ok=True)
+
+        quarantine = options["quarantine"] or os.path.join(store.path, "quarantine.csv")
+        converted, quarantined = convert_csv(path, store, quarantine)
+        self.stdout.write(self.style.SUCCESS(
+            f"Converted {converted} rows into {store.path}; quarantined {quarantined} in {quarantine}."
+        ))
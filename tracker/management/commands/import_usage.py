@@ -0,0 +1,38 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.importer import FORMATS, format_for, import_usage
+
+
+class Command(BaseCommand):
+    help = "Bulk-import usage from a CSV or JSON Lines screen-time export."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import.")
+        parser.add_argument("--format", choices=FORMATS, default=None, help="File format (guessed from the extension by default).")
+        parser.add_argument("--user", default=None, help="Username owning every row; without it each row's Code column is used.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            try:
+                user = User.objects.get(username=options["user"])
+            except User.DoesNotExist:
+                raise CommandError(f"No user named {options['user']}")
+
+        fmt = options["format"] or format_for(options["path"])
+        try:
+            f = open(options["path"], newline="", encoding="utf-8-sig")
+        except FileNotFoundError:
+            raise CommandError(f"No file at {options['path']}")
+
+        with f:
+            result = import_usage(
+                f, fmt, user=user, batch_size=options["batch_size"],
+                log=lambda line_no, reason: self.stderr.write(f"line {line_no}: skipped, {reason}"),
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.created} entries, skipped {result.duplicates} duplicates and "
+            f"{result.invalid} invalid rows in {result.seconds:.2f}s ({result.rate:.0f} rows/s)."
+        ))
@@ -0,0 +1,87 @@
+import csv
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker import tasks
+from tracker.leaderboard import rebuild_leaderboard
+from tracker.models import Platform, TimeEntry, UserProfile
+from tracker.pet_state import invalidate_usage
+from tracker.rollups import rebuild_daily_usage, rebuild_platform_totals
+from tracker.usage_store import DatabaseUsageStore, clean_row
+
+
+class Command(BaseCommand):
+    help = "Copy the legacy usage_data.csv into the TimeEntry table and rebuild the rollups from it."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default=None, help="CSV file to read (defaults to USAGE_CSV_PATH).")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true", help="Parse and report without writing.")
+        parser.add_argument("--force", action="store_true", help="Copy even if TimeEntry already holds usage.")
+
+    def handle(self, *args, **options):
+        path = options["path"] or settings.USAGE_CSV_PATH
+        if not options["dry_run"] and not options["force"] and TimeEntry.objects.exists():
+            raise CommandError(
+                "TimeEntry already holds usage, so migrating again would copy every row twice; "
+                "pass --force to copy anyway."
+            )
+        try:
+            f = open(path, newline="")
+        except FileNotFoundError:
+            raise CommandError(f"No usage file at {path}")
+
+        # share_code -> user_id for every profile, so rows resolve without a query each
+        users_by_code = dict(UserProfile.objects.values_list("share_code", "user_id"))
+
+        batch = []
+        touched = set()
+        created = skipped = 0
+        with f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                # The same rules as DatabaseUsageStore writes
+                record, reason = clean_row(row, Platform.values)
+                user_id = users_by_code.get(record.code) if record else None
+                if record is not None and user_id is None:
+                    reason = "unknown share code"
+                if user_id is None:
+                    skipped += 1
+                    self.stderr.write(f"line {reader.line_num}: skipped ({reason}) {dict(row)}")
+                    continue
+
+                touched.add(user_id)
+                batch.append(TimeEntry(
+                    user_id=user_id,
+                    share_code=record.code,
+                    date=date.fromisoformat(record.date),
+                    platform=record.platform,
+                    minutes=record.minutes,
+                ))
+                if len(batch) >= options["batch_size"]:
+                    created += self._flush(batch, options["dry_run"])
+
+        created += self._flush(batch, options["dry_run"])
+        verb = "Would copy" if options["dry_run"] else "Copied"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {created} entries, skipped {skipped} rows."))
+        if options["dry_run"] or not created:
+            return
+
+        # Rows are bulk inserted without usage_recorded, so the rollups are rebuilt once at the end
+        store = DatabaseUsageStore()
+        rebuild_daily_usage(store)
+        rebuild_platform_totals()
+        rebuild_leaderboard(store)
+        for user_id in sorted(touched):
+            invalidate_usage(user_id)
+            tasks.enqueue("pet_points", user_id)
+        self.stdout.write("Rebuilt DailyUsage, platform totals and the leaderboard.")
+
+    def _flush(self, batch, dry_run):
+        count = len(batch)
+        if count and not dry_run:
+            TimeEntry.objects.bulk_create(batch)
+        batch.clear()
+        return count
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from tracker.rollups import rebuild_daily_usage
+from tracker.usage_store import get_usage_store
+
+
+class Command(BaseCommand):
+    help = "Regenerate the DailyUsage rollup from the raw usage entries."
+
+    def handle(self, *args, **options):
+        count = rebuild_daily_usage(get_usage_store())
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt DailyUsage: {count} rows."))
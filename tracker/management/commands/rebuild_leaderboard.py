@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from tracker.leaderboard import rebuild_leaderboard
+from tracker.usage_store import get_usage_store
+
+
+class Command(BaseCommand):
+    help = "Regenerate the leaderboard totals for every window from the raw usage entries."
+
+    def handle(self, *args, **options):
+        count = rebuild_leaderboard(get_usage_store())
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt leaderboard: {count} rows."))
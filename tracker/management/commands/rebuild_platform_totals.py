@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from tracker.rollups import rebuild_platform_totals
+
+
+class Command(BaseCommand):
+    help = "Regenerate the global per-platform totals from DailyUsage (run after rebuild_daily_usage)."
+
+    def handle(self, *args, **options):
+        count = rebuild_platform_totals()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt platform totals: {count} rows."))
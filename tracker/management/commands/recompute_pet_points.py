@@ -0,0 +1,46 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from tracker.models import PetState, UserProfile
+from tracker.pet_state import forget_pet_states
+from tracker.scoring import load_histories, score_histories
+from tracker.timeseries import local_today
+
+
+class Command(BaseCommand):
+    help = "Recompute every pet's points from the owner's full usage history (nightly job)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--as-of", type=date.fromisoformat, default=None, help="Score history up to this date (YYYY-MM-DD).")
+        parser.add_argument("--chunk-size", type=int, default=10000, help="Users scored per NumPy pass.")
+
+    def handle(self, *args, **options):
+        as_of = options["as_of"] or local_today()
+        profiles = list(UserProfile.objects.select_related("pet_state").order_by("user_id"))
+        changed = []
+
+        for start in range(0, len(profiles), options["chunk_size"]):
+            chunk = profiles[start:start + options["chunk_size"]]
+            first_day, totals = load_histories([p.user_id for p in chunk], as_of)
+            if first_day is None:
+                points = [0] * len(chunk)
+            else:
+                points = score_histories(totals, first_day).tolist()
+
+            new, updated = [], []
+            for profile, score in zip(chunk, points):
+                try:
+                    state = profile.pet_state
+                except PetState.DoesNotExist:
+                    new.append(PetState(profile=profile, points=score))
+                    continue
+                if state.points != score:
+                    state.points = score
+                    updated.append(state)
+            PetState.objects.bulk_create(new)
+            PetState.objects.bulk_update(updated, ["points"])
+            changed += [state.profile.user_id for state in new + updated]
+
+        forget_pet_states(changed)
+        self.stdout.write(self.style.SUCCESS(f"Updated points for {len(changed)} of {len(profiles)} pets."))
@@ -0,0 +1,47 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tracker.stats_cache import is_per_process
+from tracker.tasks import requeue_stale, run_pending
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (see tracker.tasks). Polls until stopped, or drains the queue with --once."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Exit when no job is pending.")
+        parser.add_argument("--batch-size", type=int, default=100, help="Jobs claimed per poll.")
+        parser.add_argument("--sleep", type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument(
+            "--stale-after", type=int, default=600,
+            help="Requeue jobs left running this many seconds, by a worker that died.",
+        )
+
+    def handle(self, *args, **options):
+        if is_per_process():
+            self.stderr.write(self.style.WARNING(
+                "The stats cache is a per-process LocMemCache, so web processes will keep serving the "
+                "pet state they cached before a job ran. Point CACHES/STATS_CACHE_ALIAS at a shared "
+                "backend, or set TRACKER_TASKS_EAGER."
+            ))
+        requeued = requeue_stale(timezone.now() - timedelta(seconds=options["stale_after"]))
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale jobs.")
+
+        total_ok = total_failed = 0
+        try:
+            while True:
+                succeeded, failed = run_pending(options["batch_size"])
+                total_ok += succeeded
+                total_failed += failed
+                if succeeded or failed:
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Ran {total_ok + total_failed} jobs, {total_failed} failed."))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.stats_cache import counters, is_per_process, reset_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Show the stats fragment cache hit/miss counters. They are kept in the stats cache, so this "
+        "needs a shared backend; with LocMemCache see the per-worker counters on /perf/ instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Zero the counters after printing them.")
+
+    def handle(self, *args, **options):
+        if is_per_process():
+            raise CommandError(
+                "The stats cache is a per-process LocMemCache, so this process cannot see the web "
+                "workers' counters. Use the /perf/ report, or point STATS_CACHE_ALIAS at a shared cache."
+            )
+        counts = counters()
+        lookups = counts["hits"] + counts["misses"]
+        ratio = counts["hits"] / lookups if lookups else 0
+        self.stdout.write(f"hits: {counts['hits']}  misses: {counts['misses']}  hit ratio: {ratio:.1%}")
+        if options["reset"]:
+            reset_counters()
+            self.stdout.write(self.style.SUCCESS("Counters reset."))
@@ -0,0 +1,55 @@
+import inspect
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from tracker import tasks
+from tracker.leaderboard import rebuild_leaderboard
+from tracker.models import UserProfile
+from tracker.pet_state import invalidate_usage
+from tracker.rollups import rebuild_daily_usage, rebuild_platform_totals
+from tracker.usage_store import USAGE_SCHEMA_VERSION, quarantine_writer
+
+
+class Command(BaseCommand):
+    help = (
+        "Bring the usage store up to the current schema version: normalise codes, dates and "
+        "minutes, and move rows that cannot be kept (blank codes, merge markers, negative "
+        "minutes) to a quarantine CSV. Rebuilds the rollups if anything changed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--backend", default=None, help="Store class (defaults to USAGE_STORE_BACKEND).")
+        parser.add_argument("--path", default=None, help="File or directory of a CSV or columnar store.")
+        parser.add_argument("--quarantine", default="usage_quarantine.csv", help="Where to write rejected rows.")
+        parser.add_argument("--dry-run", action="store_true", help="Report what would change without changing it.")
+
+    def handle(self, *args, **options):
+        backend = options["backend"] or settings.USAGE_STORE_BACKEND
+        store_class = import_string(backend)
+        if not options["path"]:
+            store = store_class()
+        elif "path" in inspect.signature(store_class).parameters:
+            store = store_class(options["path"])
+        else:
+            raise CommandError(f"{backend} is not stored in a file; --path only applies to file backends.")
+
+        with open(options["quarantine"], "w", newline="") as f:
+            result = store.validate(quarantine_writer(f), dry_run=options["dry_run"])
+        verb = "Would keep" if options["dry_run"] else "Kept"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {result.kept} rows, normalised {result.fixed} and quarantined {result.quarantined} "
+            f"in {options['quarantine']} (schema version {USAGE_SCHEMA_VERSION})."
+        ))
+
+        # The rollups summarise the configured store, including any rows just dropped or rewritten
+        if options["dry_run"] or backend != settings.USAGE_STORE_BACKEND or not (result.fixed or result.quarantined):
+            return
+        rebuild_daily_usage(store)
+        rebuild_platform_totals()
+        rebuild_leaderboard(store)
+        for user_id in UserProfile.objects.values_list("user_id", flat=True):
+            invalidate_usage(user_id)
+            tasks.enqueue("pet_points", user_id)
+        self.stdout.write("Rebuilt DailyUsage, platform totals and the leaderboard.")
@@ -0,0 +1,46 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .perf import REGISTRY, end_request, start_request
+
+
+class PerformanceMiddleware:
+    """
+    Times each request and adds a Server-Timing header with wall, database
+    and template time plus usage-store bytes. Samples are kept per URL name
+    in tracker.perf.REGISTRY. For streaming responses only the time to the
+    first byte is measured. Works under WSGI and ASGI; database time is
+    collected by tracker.perf.timed_query.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token = start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics, token = start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_request(token)
+        return self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        metrics.finish()
+        match = getattr(request, "resolver_match", None)
+        REGISTRY.add(match.view_name if match else "<unresolved>", metrics)
+        response["Server-Timing"] = metrics.server_timing()
+        return response
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:12
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0002_userprofile_friends_alter_userprofile_share_code'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timeentry',
+            name='platform',
+            field=models.CharField(default='Other', max_length=50),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='timeentry',
+            name='share_code',
+            field=models.CharField(db_index=True, default='', max_length=12),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='timeentry',
+            name='date',
+            field=models.DateField(default=datetime.date.today),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0004_dailyusage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('share_code', models.CharField(max_length=12)),
+                ('window', models.CharField(choices=[('day', 'Today'), ('week', 'This week'), ('all', 'All time')], max_length=4)),
+                ('period_start', models.DateField()),
+                ('minutes', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['window', 'period_start', 'minutes'], name='leaderboard_rank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('window', 'period_start', 'share_code'), name='unique_leaderboard_total')],
+            },
+        ),
+    ]
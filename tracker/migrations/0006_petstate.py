@@ -0,0 +1,25 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0005_leaderboardtotal'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PetState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pet_type', models.PositiveSmallIntegerField(default=1)),
+                ('points', models.PositiveSmallIntegerField(default=0)),
+                ('focus_platform', models.CharField(blank=True, default='', max_length=50)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('profile', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pet_state', to='tracker.userprofile')),
+            ],
+        ),
+    ]
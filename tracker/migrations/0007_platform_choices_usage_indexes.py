@@ -0,0 +1,53 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0006_petstate'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dailyusage',
+            name='platform',
+            field=models.CharField(choices=[('YouTube Shorts', 'Youtube Shorts'), ('TikTok', 'Tiktok'), ('Instagram Reels', 'Instagram Reels'), ('Facebook Reels', 'Facebook Reels'), ('Streaming Addiction', 'Streaming'), ('Video Games', 'Video Games'), ('Gambling', 'Gambling'), ('Food Addiction', 'Food'), ('Caffeine Addiction', 'Caffeine'), ('Nicotine Addiction', 'Nicotine'), ('Alcohol Addiction', 'Alcohol'), ('Dopamine Addiction', 'Dopamine'), ('Drug Addiction', 'Drug'), ('Other', 'Other')], max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='dailyusage',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='petstate',
+            name='focus_platform',
+            field=models.CharField(blank=True, choices=[('YouTube Shorts', 'Youtube Shorts'), ('TikTok', 'Tiktok'), ('Instagram Reels', 'Instagram Reels'), ('Facebook Reels', 'Facebook Reels'), ('Streaming Addiction', 'Streaming'), ('Video Games', 'Video Games'), ('Gambling', 'Gambling'), ('Food Addiction', 'Food'), ('Caffeine Addiction', 'Caffeine'), ('Nicotine Addiction', 'Nicotine'), ('Alcohol Addiction', 'Alcohol'), ('Dopamine Addiction', 'Dopamine'), ('Drug Addiction', 'Drug'), ('Other', 'Other')], default='', max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='timeentry',
+            name='platform',
+            field=models.CharField(choices=[('YouTube Shorts', 'Youtube Shorts'), ('TikTok', 'Tiktok'), ('Instagram Reels', 'Instagram Reels'), ('Facebook Reels', 'Facebook Reels'), ('Streaming Addiction', 'Streaming'), ('Video Games', 'Video Games'), ('Gambling', 'Gambling'), ('Food Addiction', 'Food'), ('Caffeine Addiction', 'Caffeine'), ('Nicotine Addiction', 'Nicotine'), ('Alcohol Addiction', 'Alcohol'), ('Dopamine Addiction', 'Dopamine'), ('Drug Addiction', 'Drug'), ('Other', 'Other')], max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='timeentry',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='dailyusage',
+            index=models.Index(fields=['user', 'platform', 'date'], name='daily_user_platform_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeentry',
+            index=models.Index(fields=['user', 'date'], name='entry_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timeentry',
+            index=models.Index(fields=['user', 'platform', 'date'], name='entry_user_platform_date_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0007_platform_choices_usage_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('platform', models.CharField(choices=[('YouTube Shorts', 'Youtube Shorts'), ('TikTok', 'Tiktok'), ('Instagram Reels', 'Instagram Reels'), ('Facebook Reels', 'Facebook Reels'), ('Streaming Addiction', 'Streaming'), ('Video Games', 'Video Games'), ('Gambling', 'Gambling'), ('Food Addiction', 'Food'), ('Caffeine Addiction', 'Caffeine'), ('Nicotine Addiction', 'Nicotine'), ('Alcohol Addiction', 'Alcohol'), ('Dopamine Addiction', 'Dopamine'), ('Drug Addiction', 'Drug'), ('Other', 'Other')], max_length=50, unique=True)),
+                ('minutes', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+    ]
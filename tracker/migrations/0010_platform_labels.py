@@ -0,0 +1,33 @@
+# Generated by Django 5.1.2 on 2026-10-18 16:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0009_job'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dailyusage',
+            name='platform',
+            field=models.CharField(choices=[('YouTube Shorts', 'YouTube Shorts'), ('TikTok', 'TikTok'), ('Instagram Reels', 'Instagram Reels'), ('Facebook Reels', 'Facebook Reels'), ('Streaming Addiction', 'Streaming Addiction'), ('Video Games', 'Video Games'), ('Gambling', 'Gambling'), ('Food Addiction', 'Food Addiction'), ('Caffeine Addiction', 'Caffeine Addiction'), ('Nicotine Addiction', 'Nicotine Addiction'), ('Alcohol Addiction', 'Alcohol Addiction'), ('Dopamine Addiction', 'Dopamine Addiction'), ('Drug Addiction', 'Drug Addiction'), ('Other', 'Other')], max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='petstate',
+            name='focus_platform',
+            field=models.CharField(blank=True, choices=[('YouTube Shorts', 'YouTube Shorts'), ('TikTok', 'TikTok'), ('Instagram Reels', 'Instagram Reels'), ('Facebook Reels', 'Facebook Reels'), ('Streaming Addiction', 'Streaming Addiction'), ('Video Games', 'Video Games'), ('Gambling', 'Gambling'), ('Food Addiction', 'Food Addiction'), ('Caffeine Addiction', 'Caffeine Addiction'), ('Nicotine Addiction', 'Nicotine Addiction'), ('Alcohol Addiction', 'Alcohol Addiction'), ('Dopamine Addiction', 'Dopamine Addiction'), ('Drug Addiction', 'Drug Addiction'), ('Other', 'Other')], default='', max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='platformtotal',
+            name='platform',
+            field=models.CharField(choices=[('YouTube Shorts', 'YouTube Shorts'), ('TikTok', 'TikTok'), ('Instagram Reels', 'Instagram Reels'), ('Facebook Reels', 'Facebook Reels'), ('Streaming Addiction', 'Streaming Addiction'), ('Video Games', 'Video Games'), ('Gambling', 'Gambling'), ('Food Addiction', 'Food Addiction'), ('Caffeine Addiction', 'Caffeine Addiction'), ('Nicotine Addiction', 'Nicotine Addiction'), ('Alcohol Addiction', 'Alcohol Addiction'), ('Dopamine Addiction', 'Dopamine Addiction'), ('Drug Addiction', 'Drug Addiction'), ('Other', 'Other')], max_length=50, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='timeentry',
+            name='platform',
+            field=models.CharField(choices=[('YouTube Shorts', 'YouTube Shorts'), ('TikTok', 'TikTok'), ('Instagram Reels', 'Instagram Reels'), ('Facebook Reels', 'Facebook Reels'), ('Streaming Addiction', 'Streaming Addiction'), ('Video Games', 'Video Games'), ('Gambling', 'Gambling'), ('Food Addiction', 'Food Addiction'), ('Caffeine Addiction', 'Caffeine Addiction'), ('Nicotine Addiction', 'Nicotine Addiction'), ('Alcohol Addiction', 'Alcohol Addiction'), ('Dopamine Addiction', 'Dopamine Addiction'), ('Drug Addiction', 'Drug Addiction'), ('Other', 'Other')], max_length=50),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from datetime import date
 import uuid
 from django.urls import reverse
 
@@ -18,8 +19,12 @@ class UserProfile(models.Model):
         return f"{self.user.username} Profile"
 
     def regenerate_share_code(self):
+        from .share_codes import forget_share_codes
+
+        old_code = self.share_code
         self.share_code = uuid.uuid4().hex[:12].upper()
         self.save()
+        forget_share_codes(self.user_id, [old_code, self.share_code])
         return self.share_code
 
     def share_page(self):
@@ -34,10 +39,133 @@ class UserProfile(models.Model):
 
     def is_complete(self):
         return bool(self.share_code and self.user.username)
+
+
+class Platform(models.TextChoices):
+    """Platforms offered by the home page forms."""
+    YOUTUBE_SHORTS = "YouTube Shorts", "YouTube Shorts"
+    TIKTOK = "TikTok", "TikTok"
+    INSTAGRAM_REELS = "Instagram Reels", "Instagram Reels"
+    FACEBOOK_REELS = "Facebook Reels", "Facebook Reels"
+    STREAMING = "Streaming Addiction", "Streaming Addiction"
+    VIDEO_GAMES = "Video Games", "Video Games"
+    GAMBLING = "Gambling", "Gambling"
+    FOOD = "Food Addiction", "Food Addiction"
+    CAFFEINE = "Caffeine Addiction", "Caffeine Addiction"
+    NICOTINE = "Nicotine Addiction", "Nicotine Addiction"
+    ALCOHOL = "Alcohol Addiction", "Alcohol Addiction"
+    DOPAMINE = "Dopamine Addiction", "Dopamine Addiction"
+    DRUG = "Drug Addiction", "Drug Addiction"
+    OTHER = "Other", "Other"
+
+
 class TimeEntry(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
-    date = models.DateField(auto_now_add=True)
+    """One usage entry, as added from the home page form."""
+    # entry_user_date_idx covers lookups by user, so no separate FK index
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+    share_code = models.CharField(max_length=12, db_index=True)
+    date = models.DateField(default=date.today)
+    platform = models.CharField(max_length=50, choices=Platform.choices)
     minutes = models.PositiveIntegerField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "date"], name="entry_user_date_idx"),
+            models.Index(fields=["user", "platform", "date"], name="entry_user_platform_date_idx"),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.minutes} min on {self.date}"
+
+
+class DailyUsage(models.Model):
+    """Minutes per user, day and platform, kept in step with TimeEntry by tracker.rollups."""
+    # unique_daily_usage covers lookups by user, so no separate FK index
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+    date = models.DateField()
+    platform = models.CharField(max_length=50, choices=Platform.choices)
+    minutes = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        # unique_daily_usage also serves (user, date) lookups
+        constraints = [
+            models.UniqueConstraint(fields=["user", "date", "platform"], name="unique_daily_usage"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "platform", "date"], name="daily_user_platform_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.minutes} min of {self.platform} on {self.date}"
+
+
+class LeaderboardTotal(models.Model):
+    """Minutes per share code within one leaderboard window (see tracker.leaderboard)."""
+    WINDOW_CHOICES = [("day", "Today"), ("week", "This week"), ("all", "All time")]
+
+    share_code = models.CharField(max_length=12)
+    window = models.CharField(max_length=4, choices=WINDOW_CHOICES)
+    period_start = models.DateField()
+    minutes = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["window", "period_start", "share_code"], name="unique_leaderboard_total"),
+        ]
+        indexes = [
+            models.Index(fields=["window", "period_start", "minutes"], name="leaderboard_rank_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.share_code} - {self.minutes} min ({self.window} from {self.period_start})"
+
+
+class PlatformTotal(models.Model):
+    """Minutes per platform over every user, for the resources page (see tracker.rollups)."""
+    platform = models.CharField(max_length=50, choices=Platform.choices, unique=True)
+    minutes = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.platform} - {self.minutes} min"
+
+
+class PetState(models.Model):
+    """A user's dopamine pet. Read and written through tracker.pet_state, which caches it."""
+    profile = models.OneToOneField(UserProfile, on_delete=models.CASCADE, related_name="pet_state")
+    pet_type = models.PositiveSmallIntegerField(default=1)
+    points = models.PositiveSmallIntegerField(default=0)
+    focus_platform = models.CharField(max_length=50, choices=Platform.choices, blank=True, default="")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.profile.user.username} pet {self.pet_type} ({self.points} points)"
+
+
+class Job(models.Model):
+    """Derived-state recomputation queued for one user (see tracker.tasks)."""
+    PENDING = "pending"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATE_CHOICES = [(PENDING, "Pending"), (RUNNING, "Running"), (FAILED, "Failed")]
+
+    name = models.CharField(max_length=50)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    state = models.CharField(max_length=7, choices=STATE_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # At most one pending job per task and user; later requests coalesce into it
+            models.UniqueConstraint(
+                fields=["name", "user"], condition=models.Q(state="pending"), name="unique_pending_job",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["state", "id"], name="job_queue_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} for {self.user_id} ({self.state})"
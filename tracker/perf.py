@@ -0,0 +1,170 @@
+"""
+Request performance metrics.
+
+tracker.middleware.PerformanceMiddleware opens a RequestMetrics for each
+request. While it runs, database queries (through timed_query, installed
+on every connection), template renders (through the TimedDjangoTemplates
+backend) and usage-store file I/O add to it. The metrics live in a context
+variable, so work an async view hands to a thread still counts. When the
+response is ready the totals go out in a Server-Timing header and into
+REGISTRY, a rolling window of samples per URL name, from which the
+staff-only perf endpoint reports p50/p95/p99.
+
+Samples live in process memory, so each worker reports only its own.
+"""
+import threading
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates
+
+_current = ContextVar("tracker_request_metrics", default=None)
+
+
+class RequestMetrics:
+    """Counters for one request; times are in milliseconds."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total_ms = 0.0
+        self.db_queries = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.store_bytes = 0
+        # Async views can run queries on several threads at once
+        self._lock = threading.Lock()
+
+    def finish(self):
+        self.total_ms = (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self):
+        """Value for the Server-Timing header."""
+        return ", ".join([
+            f"total;dur={self.total_ms:.1f}",
+            f'db;dur={self.db_ms:.1f};desc="{self.db_queries} queries"',
+            f"template;dur={self.template_ms:.1f}",
+            f'store;desc="{self.store_bytes} bytes"',
+        ])
+
+    def add_query(self, ms):
+        with self._lock:
+            self.db_queries += 1
+            self.db_ms += ms
+
+
+def start_request():
+    """Begin collecting for the current request; returns (metrics, token for end_request)."""
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def timed_query(execute, sql, params, many, context):
+    """Execute wrapper for every connection (see install_query_timer); a no-op outside a request."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query((time.perf_counter() - start) * 1000)
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """connection_created receiver that puts timed_query on the new connection."""
+    if timed_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, timed_query)
+
+
+def record_template(ms):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.template_ms += ms
+
+
+def record_store_io(nbytes):
+    """Count bytes a usage store read or wrote for the current request."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.store_bytes += nbytes
+
+
+class PerfRegistry:
+    """Rolling samples per URL name, PERF_SAMPLES deep."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=getattr(settings, "PERF_SAMPLES", 1000)))
+
+    def add(self, url_name, metrics):
+        with self._lock:
+            self._samples[url_name].append(
+                (metrics.total_ms, metrics.db_queries, metrics.db_ms, metrics.template_ms, metrics.store_bytes)
+            )
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def summary(self):
+        """{url name: count, p50/p95/p99 of total ms, and mean queries, db, template and store figures}."""
+        with self._lock:
+            samples = {name: list(rows) for name, rows in self._samples.items()}
+        report = {}
+        for name, rows in sorted(samples.items()):
+            totals = sorted(row[0] for row in rows)
+            count = len(rows)
+            report[name] = {
+                "count": count,
+                "p50_ms": round(percentile(totals, 50), 2),
+                "p95_ms": round(percentile(totals, 95), 2),
+                "p99_ms": round(percentile(totals, 99), 2),
+                "avg_queries": round(sum(row[1] for row in rows) / count, 2),
+                "avg_db_ms": round(sum(row[2] for row in rows) / count, 2),
+                "avg_template_ms": round(sum(row[3] for row in rows) / count, 2),
+                "avg_store_bytes": round(sum(row[4] for row in rows) / count),
+            }
+        return report
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list; 0 when empty."""
+    if not sorted_values:
+        return 0
+    rank = max(1, -(-pct * len(sorted_values) // 100))
+    return sorted_values[int(rank) - 1]
+
+
+REGISTRY = PerfRegistry()
+
+
+class TimedTemplate:
+    # Wraps a backend template so render() time lands in the request metrics
+    def __init__(self, template):
+        self._template = template
+
+    def __getattr__(self, name):
+        return getattr(self._template, name)
+
+    def render(self, context=None, request=None):
+        start = time.perf_counter()
+        try:
+            return self._template.render(context, request)
+        finally:
+            record_template((time.perf_counter() - start) * 1000)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing every top-level render. Includes count toward their parent."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
@@ -1,4 +1,7 @@
 import os
+from bisect import bisect_left
+from collections import namedtuple
+from datetime import timedelta
 from django.templatetags.static import static
 '''
 Goals with this "class"
@@ -52,89 +55,80 @@ def weekly_point_change(this_week, last_week, points):
             points += 10
     return points
 
+def score_history(daily_totals, first_day, points=0):
+    """
+    Fold daily_point_change and weekly_point_change over a usage history.
+
+    daily_totals holds the minutes for consecutive days starting at first_day.
+    Each day is compared with the day before it, and every Sunday closes a
+    Monday-Sunday week that is compared with the previous one. Days with no
+    usage before the first entry leave the points unchanged, so any history
+    can be padded at the front with zeros without changing the result.
+    """
+    this_week = last_week = 0
+    for i, minutes in enumerate(daily_totals):
+        if i > 0:
+            points = daily_point_change(minutes, daily_totals[i - 1], points)
+        this_week += minutes
+        if (first_day + timedelta(days=i)).weekday() == 6:
+            points = weekly_point_change(this_week, last_week, points)
+            last_week, this_week = this_week, 0
+    return points
+
 def safe_image(img_name):
     # Return a static URL to the image
     return static(f"tracker/{img_name}")
 
+def linear_progress(points, lower, upper):
+    # Percent of the way from the stage's lower bound to its upper bound
+    return round(((points - lower) / (upper - lower)) * 100, 2)
+
+def full_progress(points, lower, upper):
+    return 100
+
+# One evolution stage: covers points in (previous stage's upper, upper]; the
+# first stage also includes 0.
+PetStage = namedtuple("PetStage", ["upper", "image", "name", "progress"])
+
+PETS = {}         # pet id -> [PetStage], ordered by upper
+_UPPERS = {}      # pet id -> [stage.upper], for bisect
+_IMAGE_URLS = {}  # pet id -> [static URL per stage], filled by resolve_static_urls()
+
+def register_pet(pet, stages):
+    """Add (or replace) a pet; `stages` is a list of PetStage in any order."""
+    stages = sorted(stages, key=lambda stage: stage.upper)
+    PETS[pet] = stages
+    _UPPERS[pet] = [stage.upper for stage in stages]
+    _IMAGE_URLS.pop(pet, None)
+
+def resolve_static_urls():
+    """Look up every stage image's static URL once; called from TrackerConfig.ready()."""
+    for pet, stages in PETS.items():
+        _IMAGE_URLS[pet] = [safe_image(stage.image) for stage in stages]
+
+def _standard_stages(egg, baby, teen, adult, prefix):
+    return [
+        PetStage(10, f"{prefix}_pet_egg.png", egg, linear_progress),
+        PetStage(30, f"{prefix}_pet_baby.png", baby, linear_progress),
+        PetStage(60, f"{prefix}_pet_teen.png", teen, linear_progress),
+        PetStage(100, f"{prefix}_pet_adult.png", adult, full_progress),
+    ]
+
+register_pet(1, _standard_stages("Dragon Egg", "Baby Dragon 🐣", "Teen Dragon", "Adult Dragon", "dragon"))
+register_pet(2, _standard_stages("Phoenix Egg", "Phoenix Baby", "Phoenix Teen", "Phoenix Adult", "phoenix"))
+register_pet(3, _standard_stages("Slime Egg", "Slime Baby", "Slime Teen", "Slime Adult", "slime"))
+
 def return_pet_info(pet, points): #takes in pet and points, returns image path
     loader = [None, None, None] #image path, stage name, progress
-    if pet == 1: #dragon
-        if 0 <= points <= 10:
-            loader[0] = safe_image("dragon_pet_egg.png")
-            loader[1] = "Dragon Egg"
-            loader[2] = round((points / 10) * 100, 2)
-            return loader
-        elif 10 < points <= 30:
-            loader[0] = safe_image("dragon_pet_baby.png")
-            loader[1] = "Baby Dragon 🐣"
-            loader[2] = round(((points - 10) / 20) * 100, 2)
-            return loader
-        elif 30 < points <= 60:
-            loader[0] = safe_image("dragon_pet_teen.png")
-            print("set image")
-            loader[1] = "Teen Dragon"
-            loader[2] = round(((points - 30) / 30) * 100, 2)
-            return loader
-        elif 60 < points <= 100:
-            loader[0] = safe_image("dragon_pet_adult.png")
-            loader[1] = "Adult Dragon"
-            loader[2] = 100
-            return loader
-        else:
-            print("points not within range")
-    elif pet == 2:#phoenix
-        if 0 <= points <= 10:
-            loader[0] = safe_image("phoenix_pet_egg.png")
-            loader[1] = "Phoenix Egg"
-            loader[2] = round((points / 10) * 100, 2)
-            print("IMAGE SELECTED:", loader[0])
-            return loader
-        elif 10 < points <= 30:
-            loader[0] = safe_image("phoenix_pet_baby.png")
-            loader[1] = "Phoenix Baby"
-            loader[2] = round(((points - 10) / 20) * 100, 2)
-            print("IMAGE SELECTED:", loader[0])
-            return loader
-        elif 30 < points <= 60:
-            loader[0] = safe_image("phoenix_pet_teen.png")
-            loader[1] = "Phoenix Teen"
-            loader[2] = round(((points - 30) / 30) * 100, 2)
-            print("IMAGE SELECTED:", loader[0])
-            return loader
-        elif 60 < points <= 100:
-            loader[0] = safe_image("phoenix_pet_adult.png")
-            loader[1] = "Phoenix Adult"
-            loader[2] = 100
-            print("IMAGE SELECTED:", loader[0])
-            return loader
-        else:
-            print("points not within range")
-    elif pet == 3:#slime
-        if 0 <= points <= 10:
-            loader[0] = safe_image("slime_pet_egg.png")
-            loader[1] = "Slime Egg"
-            loader[2] = round((points / 10) * 100, 2)
-            print("IMAGE SELECTED:", loader[0])
-            return loader
-        elif 10 < points <= 30:
-            loader[0] = safe_image("slime_pet_baby.png")
-            loader[1] = "Slime Baby"
-            loader[2] = round(((points - 10) / 20) * 100, 2)
-            print("IMAGE SELECTED:", loader[0])
-            return loader
-        elif 30 < points <= 60:
-            loader[0] = safe_image("slime_pet_teen.png")
-            loader[1] = "Slime Teen"
-            loader[2] = round(((points - 30) / 30) * 100, 2)
-            print("IMAGE SELECTED:", loader[0])
-            return loader
-        elif 60 < points <= 100:
-            loader[0] = safe_image("slime_pet_adult.png")
-            loader[1] = "Slime Adult"
-            loader[2] = 100
-            print("IMAGE SELECTED:", loader[0])
-            return loader
-        else:
-            print("points not within range")
-
-    return loader
\ No newline at end of file
+    uppers = _UPPERS.get(pet)
+    if not uppers or not 0 <= points <= uppers[-1]:
+        return loader
+    index = bisect_left(uppers, points)
+    stage = PETS[pet][index]
+    if pet not in _IMAGE_URLS:
+        _IMAGE_URLS[pet] = [safe_image(s.image) for s in PETS[pet]]
+    lower = uppers[index - 1] if index else 0
+    loader[0] = _IMAGE_URLS[pet][index]
+    loader[1] = stage.name
+    loader[2] = stage.progress(points, lower, stage.upper)
+    return loader
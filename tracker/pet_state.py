@@ -0,0 +1,105 @@
+"""
+Server-side pet state.
+
+PetState rows are read through a write-through cache keyed by user id, so
+rendering the pet costs no queries once the cache is warm. Points are not
+accumulated per request: recompute_points() replays the user's whole
+DailyUsage history through petLogic.score_history, so the same history
+always yields the same points.
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+
+from .aggregates import daily_average, day_totals, usage_rows
+from .models import DailyUsage, PetState, UserProfile
+from .petLogic import score_history
+from .stats_cache import bump_data_version
+from .timeseries import local_today
+
+
+def _state_key(user_id):
+    return f"tracker:pet_state:{user_id}"
+
+
+def _focus_key(user_id):
+    return f"tracker:focus_avg:{user_id}"
+
+
+def get_pet_state(user):
+    """The user's PetState, from the cache when possible; created on first use."""
+    state = cache.get(_state_key(user.pk))
+    if state is None:
+        state = PetState.objects.filter(profile__user_id=user.pk).first()
+        if state is None:
+            state = PetState.objects.create(profile=UserProfile.objects.get(user_id=user.pk))
+        cache.set(_state_key(user.pk), state, None)
+    return state
+
+
+def save_pet_state(user, state, update_fields):
+    """
+    Save `update_fields` of `state` and write it through to the cache. Only
+    those fields are written, and points are reloaded before caching: a
+    cached state can be older than the points a task queue worker stored.
+    """
+    state.save(update_fields=update_fields)
+    if "points" not in update_fields:
+        state.refresh_from_db(fields=["points"])
+    cache.set(_state_key(user.pk), state, None)
+    bump_data_version(user.pk)
+
+
+def forget_pet_states(user_ids):
+    """Drop cached states after PetState rows were updated in bulk."""
+    cache.delete_many([_state_key(user_id) for user_id in user_ids])
+    for user_id in user_ids:
+        bump_data_version(user_id)
+
+
+def focus_average(user, focus_platform, load_rows, today=None):
+    """
+    Average daily minutes on `focus_platform` over the last 7 days, cached
+    until the next write. `load_rows` returns the user's DailyUsage rows and
+    is only called on a cache miss.
+    """
+    today = today or local_today()
+    cached = cache.get(_focus_key(user.pk))
+    if cached and cached[:2] == (today, focus_platform):
+        return cached[2]
+
+    week_ago = today - timedelta(days=7)
+    avg = daily_average([row for row in load_rows() if row[1] == focus_platform and row[0] > week_ago])
+    cache.set(_focus_key(user.pk), (today, focus_platform, avg), None)
+    return avg
+
+
+def invalidate_usage(user_id):
+    """Forget values derived from the user's usage; called after every write."""
+    cache.delete(_focus_key(user_id))
+    bump_data_version(user_id)
+
+
+def daily_history(user_id, as_of=None, rows=None):
+    """
+    (first_day, [minutes per day]) from the first entry through `as_of`, or
+    through the last entry if that is later. (None, []) without usage.
+    Pass the user's DailyUsage `rows` if they are already loaded.
+    """
+    if rows is None:
+        rows = usage_rows(DailyUsage.objects.filter(user_id=user_id))
+    totals = day_totals(rows)
+    if not totals:
+        return None, []
+    first_day = min(totals)
+    last_day = max(max(totals), as_of or local_today())
+    span = (last_day - first_day).days + 1
+    return first_day, [totals.get(first_day + timedelta(days=i), 0) for i in range(span)]
+
+
+def recompute_points(user_id, as_of=None, rows=None):
+    """Points earned by the user's usage history up to `as_of` (default today)."""
+    first_day, history = daily_history(user_id, as_of, rows)
+    if not history:
+        return 0
+    return score_history(history, first_day)
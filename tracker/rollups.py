@@ -0,0 +1,106 @@
+"""
+Derived usage tables.
+
+DailyUsage holds one row per (user, date, platform). It is bumped in place
+whenever a store records entries (see signals.usage_recorded) and can be
+regenerated from the raw entries with `manage.py rebuild_daily_usage`.
+
+PlatformTotal holds one row per platform, summed over every user, so the
+resources page reads a handful of rows instead of all usage. It is bumped
+alongside DailyUsage and regenerated with `manage.py rebuild_platform_totals`.
+"""
+from collections import defaultdict
+from datetime import date
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+
+from .models import DailyUsage, PlatformTotal
+
+# Cached resources page context; dropped whenever PlatformTotal changes
+RESOURCES_CACHE_KEY = "tracker:resources_context"
+
+
+def parse_record(record):
+    # (date, platform, minutes) for a UsageRecord; stores only hand out rows that meet the usage schema
+    return date.fromisoformat(record.date), record.platform, record.minutes
+
+
+def record_daily_usage(user, records):
+    """Add freshly written records to the user's DailyUsage rows."""
+    totals = defaultdict(int)
+    for record in records:
+        day, platform, minutes = parse_record(record)
+        totals[(day, platform)] += minutes
+
+    add_totals(DailyUsage, ("date", "platform"), totals, user=user)
+
+
+def record_platform_totals(records):
+    """Add freshly written records to the global per-platform totals."""
+    totals = defaultdict(int)
+    for record in records:
+        totals[(record.platform,)] += record.minutes
+    add_totals(PlatformTotal, ("platform",), totals)
+    cache.delete(RESOURCES_CACHE_KEY)
+
+
+def rebuild_platform_totals():
+    """Regenerate PlatformTotal from DailyUsage. Returns the number of rows written."""
+    rows = [
+        PlatformTotal(platform=platform, minutes=minutes)
+        for platform, minutes in DailyUsage.objects.values_list("platform").annotate(Sum("minutes")).order_by()
+    ]
+    with transaction.atomic():
+        PlatformTotal.objects.all().delete()
+        PlatformTotal.objects.bulk_create(rows)
+    cache.delete(RESOURCES_CACHE_KEY)
+    return len(rows)
+
+
+def add_totals(model, fields, totals, **scope):
+    """
+    Add {key: minutes} onto `model` rows, where each key holds the values of
+    `fields` and `scope` fixes the remaining unique columns. Existing rows
+    are found in one query and missing ones bulk-inserted, so a large batch
+    costs one statement per existing row rather than two per key.
+    """
+    if not totals:
+        return
+    with transaction.atomic():
+        candidates = model.objects.filter(
+            **scope, **{f"{field}__in": {key[i] for key in totals} for i, field in enumerate(fields)}
+        )
+        existing = {row[1:]: row[0] for row in candidates.values_list("pk", *fields)}
+        for key, minutes in totals.items():
+            if key in existing:
+                model.objects.filter(pk=existing[key]).update(minutes=F("minutes") + minutes)
+        missing = [
+            model(**scope, **dict(zip(fields, key)), minutes=minutes)
+            for key, minutes in totals.items() if key not in existing
+        ]
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(missing, batch_size=1000)
+        except IntegrityError:
+            # Another writer created some of the rows since we looked; fall back to one key at a time
+            for row in missing:
+                key = {field: getattr(row, field) for field in fields}
+                _, created = model.objects.get_or_create(**scope, **key, defaults={"minutes": row.minutes})
+                if not created:
+                    model.objects.filter(**scope, **key).update(minutes=F("minutes") + row.minutes)
+
+
+def rebuild_daily_usage(store):
+    """Regenerate DailyUsage from every entry in `store`. Returns the number of rows written."""
+    totals = store.daily_totals()
+
+    rows = [
+        DailyUsage(user_id=user_id, date=day, platform=platform, minutes=minutes)
+        for (user_id, day, platform), minutes in totals.items()
+    ]
+    with transaction.atomic():
+        DailyUsage.objects.all().delete()
+        DailyUsage.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
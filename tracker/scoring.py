@@ -0,0 +1,84 @@
+"""
+Vectorized pet scoring.
+
+score_histories() is petLogic.score_history for many users at once: one row
+of daily totals per user, all rows on the same calendar starting at
+first_day. It walks the days once and applies daily_point_change and
+weekly_point_change to every user with NumPy, giving exactly the points the
+scalar fold gives for each row.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.db.models import Sum
+
+from .models import DailyUsage
+
+MIN_POINTS = 0
+MAX_POINTS = 100
+
+
+def _daily_step(points, today, yesterday):
+    # daily_point_change; no usage yesterday leaves points alone
+    worse = (today > yesterday) & (yesterday != 0)
+    better = (today < yesterday) & (yesterday != 0)
+    points = np.where(worse, np.maximum(points - 1, MIN_POINTS), points)
+    return np.where(better, np.minimum(points + 1, MAX_POINTS), points)
+
+
+def _weekly_step(points, this_week, last_week):
+    # weekly_point_change; no usage last week leaves points alone
+    worse = (this_week > last_week) & (last_week != 0)
+    better = (this_week < last_week) & (last_week != 0)
+    points = np.where(worse, np.maximum(points - 10, MIN_POINTS), points)
+    return np.where(better, np.minimum(points + 10, MAX_POINTS), points)
+
+
+def score_histories(totals, first_day, points=0, trajectory=False):
+    """
+    Score a (users, days) array of daily minutes.
+
+    Returns the final points per user, or with trajectory=True a
+    (users, days) int16 array of the points after each day.
+    """
+    # Column-major, so each day is one contiguous slice
+    totals = np.asfortranarray(totals, dtype=np.int64)
+    n_users, n_days = totals.shape
+    points = np.broadcast_to(np.asarray(points, dtype=np.int64), (n_users,)).copy()
+    this_week = np.zeros(n_users, dtype=np.int64)
+    last_week = np.zeros(n_users, dtype=np.int64)
+    path = np.empty((n_users, n_days), dtype=np.int16) if trajectory else None
+
+    for i in range(n_days):
+        if i > 0:
+            points = _daily_step(points, totals[:, i], totals[:, i - 1])
+        this_week += totals[:, i]
+        if (first_day + timedelta(days=i)).weekday() == 6:
+            points = _weekly_step(points, this_week, last_week)
+            last_week, this_week = this_week, np.zeros(n_users, dtype=np.int64)
+        if trajectory:
+            path[:, i] = points
+
+    return path if trajectory else points
+
+
+def load_histories(user_ids, as_of):
+    """
+    (first_day, totals) for `user_ids` from DailyUsage, with totals a
+    (len(user_ids), days) array running through `as_of` or the latest entry.
+    Returns (None, None) when none of the users has usage.
+    """
+    row_of = {user_id: row for row, user_id in enumerate(user_ids)}
+    rows = list(
+        DailyUsage.objects.filter(user_id__in=user_ids)
+        .values_list("user_id", "date")
+        .annotate(Sum("minutes"))
+    )
+    if not rows:
+        return None, None
+    first_day = min(day for _, day, _ in rows)
+    last_day = max(max(day for _, day, _ in rows), as_of)
+    totals = np.zeros((len(user_ids), (last_day - first_day).days + 1), dtype=np.int64)
+    for user_id, day, minutes in rows:
+        totals[row_of[user_id], (day - first_day).days] = minutes
+    return first_day, totals
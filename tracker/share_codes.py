@@ -0,0 +1,95 @@
+"""
+Share code <-> user resolution.
+
+Share codes are stored upper-case. normalize_code() is applied once where
+a code comes in (URLs, forms, imports, usage-store writes, CSV compaction),
+so everything downstream compares exact strings and stored rows are never
+normalised again on read.
+
+resolve_codes() maps many codes to their owners in at most one query, and
+code_for_user() gives a user's own code. Both read through the cache, one
+entry per code and per user. UserProfile.regenerate_share_code() and
+username changes drop the affected entries through forget_share_codes().
+get_share_codes(request) wraps both for one request.
+"""
+from collections import namedtuple
+from functools import cached_property
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import UserProfile
+
+CodeOwner = namedtuple("CodeOwner", ["user_id", "username"])
+
+
+def normalize_code(code):
+    """The stored form of a share code as typed or read from a file."""
+    return str(code or "").strip().upper()
+
+
+def _code_key(code):
+    return f"tracker:share_code:{code}"
+
+
+def _user_key(user_id):
+    return f"tracker:user_code:{user_id}"
+
+
+def resolve_codes(codes):
+    """{code: CodeOwner} for the known ones among `codes`; unknown codes are left out."""
+    codes = set(codes)
+    if not codes:
+        return {}
+    cached = cache.get_many([_code_key(code) for code in codes])
+    owners = {code: cached[_code_key(code)] for code in codes if _code_key(code) in cached}
+    missing = codes - owners.keys()
+    if missing:
+        found = {
+            code: CodeOwner(user_id, username)
+            for code, user_id, username in UserProfile.objects.filter(share_code__in=missing)
+            .values_list("share_code", "user_id", "user__username")
+        }
+        cache.set_many({_code_key(code): owner for code, owner in found.items()}, settings.STATS_CACHE_TIMEOUT)
+        owners.update(found)
+    return owners
+
+
+def code_for_user(user_id):
+    """The user's share code, or None if they have no profile."""
+    code = cache.get(_user_key(user_id))
+    if code is None:
+        code = UserProfile.objects.filter(user_id=user_id).values_list("share_code", flat=True).first()
+        if code is not None:
+            cache.set(_user_key(user_id), code, settings.STATS_CACHE_TIMEOUT)
+    return code
+
+
+def forget_share_codes(user_id, codes):
+    """Drop the cached entries for a user and the codes they had or have."""
+    cache.delete_many([_user_key(user_id)] + [_code_key(code) for code in codes])
+
+
+class ShareCodeResolver:
+    """Share code lookups for one request's user, remembered for the rest of the request."""
+
+    def __init__(self, user):
+        self.user = user
+        self._owners = {}
+
+    @cached_property
+    def own_code(self):
+        return code_for_user(self.user.pk)
+
+    def resolve(self, codes):
+        """resolve_codes() for `codes`, querying only for ones this request has not seen."""
+        self._owners.update(resolve_codes(set(codes) - self._owners.keys()))
+        return {code: self._owners[code] for code in codes if code in self._owners}
+
+
+def get_share_codes(request):
+    """The resolver for `request.user`, created on first use within the request."""
+    resolver = getattr(request, "_share_codes", None)
+    if resolver is None:
+        resolver = request._share_codes = ShareCodeResolver(request.user)
+    return resolver
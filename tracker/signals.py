@@ -1,10 +1,17 @@
 # tracker/signals.py
 from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.dispatch import Signal, receiver
 from django.contrib.auth.models import User
 from .models import UserProfile
+from .rollups import record_daily_usage, record_platform_totals
+from .leaderboard import record_leaderboard
+from .pet_state import invalidate_usage
+from .share_codes import forget_share_codes
 import secrets
 
+# Sent by every usage store after a write, with the writing `user` (never None) and the new `records`.
+usage_recorded = Signal()
+
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
@@ -14,5 +21,18 @@ def create_user_profile(sender, instance, created, **kwargs):
         )
 
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
+def save_user_profile(sender, instance, update_fields=None, **kwargs):
     instance.userprofile.save()
+    # Cached code owners carry the username; logins only save last_login
+    if update_fields is None or "username" in update_fields:
+        forget_share_codes(instance.pk, [instance.userprofile.share_code])
+
+@receiver(usage_recorded)
+def update_daily_usage(sender, user, records, **kwargs):
+    record_daily_usage(user, records)
+    record_platform_totals(records)
+    invalidate_usage(user.pk)
+
+@receiver(usage_recorded)
+def update_leaderboard(sender, records, **kwargs):
+    record_leaderboard(records)
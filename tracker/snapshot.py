@@ -0,0 +1,96 @@
+"""
+Per-request usage snapshot.
+
+get_usage_snapshot(request) returns one UsageSnapshot per request. Each
+piece (profile, pet state, DailyUsage rows) is loaded on first access and
+then shared, so get_pet_stats(), stats() and home() never fetch the same
+thing twice within a request.
+"""
+from collections import defaultdict
+from functools import cached_property
+
+from django.db.models import Count, Sum
+
+from .aggregates import most_used_platform, usage_rows, usage_summary
+from .models import DailyUsage
+from .pet_state import focus_average, get_pet_state
+
+
+class UsageSnapshot:
+    """Lazily loaded usage of one user."""
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def profile(self):
+        return self.user.userprofile
+
+    @cached_property
+    def pet_state(self):
+        return get_pet_state(self.user)
+
+    @cached_property
+    def rows(self):
+        """The user's DailyUsage rows as (date, platform, minutes)."""
+        return usage_rows(DailyUsage.objects.filter(user_id=self.user.pk))
+
+    @cached_property
+    def summary(self):
+        return usage_summary(self.rows)
+
+    def focus_average(self):
+        """Average daily minutes on the pet's focus platform over the last 7 days, 0 without one."""
+        focus_platform = self.pet_state.focus_platform
+        if not focus_platform:
+            return 0
+        return focus_average(self.user, focus_platform, lambda: self.rows)
+
+    def usage_changed(self):
+        """Forget loaded usage, and the pet state derived from it, after a write in this request."""
+        for name in ("rows", "summary", "pet_state"):
+            self.__dict__.pop(name, None)
+
+
+def get_usage_snapshot(request):
+    """The snapshot for `request.user`, created on first use within the request."""
+    snapshot = getattr(request, "_usage_snapshot", None)
+    if snapshot is None:
+        snapshot = request._usage_snapshot = UsageSnapshot(request.user)
+    return snapshot
+
+
+def usage_summaries(user_ids):
+    """
+    {user_id: usage_summary()-style dict} for many users at once, from one
+    query grouped by (user, platform) and one counting each user's days.
+    """
+    platform_rows = (
+        DailyUsage.objects.filter(user_id__in=user_ids)
+        .values_list("user_id", "platform")
+        .annotate(Sum("minutes"))
+        .order_by("user_id", "platform")
+    )
+    day_counts = dict(
+        DailyUsage.objects.filter(user_id__in=user_ids)
+        .values_list("user_id")
+        .annotate(Count("date", distinct=True))
+        .order_by()
+    )
+
+    totals_by_user = defaultdict(list)
+    for user_id, platform, minutes in platform_rows:
+        totals_by_user[user_id].append((platform, minutes))
+
+    summaries = {}
+    for user_id in user_ids:
+        totals = totals_by_user.get(user_id, [])
+        total_minutes = int(sum(minutes for _, minutes in totals))
+        days = day_counts.get(user_id, 0)
+        summaries[user_id] = {
+            "total_minutes": total_minutes,
+            "avg_daily": round(total_minutes / days, 2) if days else 0,
+            "most_used": most_used_platform(totals),
+            "platform_totals": totals,
+        }
+    return summaries
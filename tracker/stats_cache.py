@@ -0,0 +1,97 @@
+"""
+Cached stats fragments.
+
+Derived page data (summary cards, chart series) is cached per user under a
+data version. Every write that can change it - a usage entry, a pet or
+focus change - bumps the user's version, so a cached fragment is never
+served stale; old versions are simply left to expire.
+
+Versions start from time.time_ns() rather than 1, so a process whose cache
+was just emptied never reuses a version that a shared cache (file, Redis)
+still holds fragments for. The cache is the one named by
+settings.STATS_CACHE_ALIAS. Hits and misses are counted in the same cache;
+the /perf/ report shows them, and `manage.py stats_cache` prints them when
+that cache is shared between processes.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+from .timeseries import local_today
+
+COUNTERS = ("hits", "misses")
+
+
+def _cache():
+    return caches[settings.STATS_CACHE_ALIAS]
+
+
+def is_per_process():
+    """
+    True if the stats cache, or the default cache pet states live in, is a
+    LocMemCache: another process never sees what this one writes or drops.
+    """
+    return any(isinstance(caches[alias], LocMemCache) for alias in {"default", settings.STATS_CACHE_ALIAS})
+
+
+def _version_key(user_id):
+    return f"tracker:data_version:{user_id}"
+
+
+def _counter_key(kind):
+    return f"tracker:stats_cache:{kind}"
+
+
+def data_version(user_id):
+    """The user's current data version, created on first use."""
+    cache = _cache()
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(_version_key(user_id), version, None):
+            version = cache.get(_version_key(user_id), version)
+    return version
+
+
+def bump_data_version(user_id):
+    """Make every cached fragment of the user stale; called on each write."""
+    _cache().set(_version_key(user_id), time.time_ns(), None)
+
+
+def cached_fragment(name, user_id, build, today=None):
+    """
+    The `name` fragment for the user at their current data version, built
+    with `build()` on a miss. Fragments also vary by day, since "last 7
+    days" moves at midnight without any write.
+    """
+    cache = _cache()
+    key = f"tracker:fragment:{name}:{user_id}:{data_version(user_id)}:{today or local_today()}"
+    value = cache.get(key)
+    if value is not None:
+        _count("hits")
+        return value
+    _count("misses")
+    value = build()
+    cache.set(key, value, settings.STATS_CACHE_TIMEOUT)
+    return value
+
+
+def _count(kind):
+    cache = _cache()
+    try:
+        cache.incr(_counter_key(kind))
+    except ValueError:
+        if not cache.add(_counter_key(kind), 1, None):
+            cache.incr(_counter_key(kind))
+
+
+def counters():
+    """{"hits": n, "misses": n} since the last reset."""
+    values = _cache().get_many([_counter_key(kind) for kind in COUNTERS])
+    return {kind: values.get(_counter_key(kind), 0) for kind in COUNTERS}
+
+
+def reset_counters():
+    _cache().delete_many([_counter_key(kind) for kind in COUNTERS])
@@ -0,0 +1,127 @@
+"""
+Background recomputation after usage writes.
+
+A usage write keeps only what must be exact in the request: the entry
+itself and the rollups that are bumped by its minutes (see
+signals.usage_recorded). State that can be rebuilt from those, such as
+the pet's points, is recomputed by a task instead. enqueue() stores a Job
+row and `manage.py run_tasks` runs it, so the POST returns right after the
+durable write.
+
+Tasks recompute from scratch, so running one twice is harmless, and jobs
+coalesce: while a user's job for a task is still pending, enqueueing it
+again adds nothing, so a burst of entries or an import costs one
+recompute per user. A job enqueued while the same task is running for the
+user waits behind it.
+
+With settings.TRACKER_TASKS_EAGER (on under DEBUG) enqueue() runs the
+task at once instead, in the calling process. Otherwise the worker drops
+cached state for the web processes to reload, which only reaches them
+through a shared cache; `run_tasks` warns when the cache is per-process.
+"""
+import traceback
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job, PetState, UserProfile
+from .pet_state import forget_pet_states, recompute_points
+
+# A failing job is retried this many times in all before it is left as FAILED
+MAX_ATTEMPTS = 3
+
+TASKS = {}
+
+
+def task(name):
+    """Register func(user_id) as the task `name`."""
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+@task("pet_points")
+def refresh_pet_points(user_id):
+    """Replay the user's usage history into their pet's points."""
+    # Only the points column: this process's cached PetState may be older than a
+    # focus or pet change made by a web process, so it is never saved back
+    points = recompute_points(user_id)
+    if not PetState.objects.filter(profile__user_id=user_id).update(points=points):
+        profile = UserProfile.objects.filter(user_id=user_id).first()
+        if profile is None:
+            return
+        PetState.objects.get_or_create(profile=profile, defaults={"points": points})
+    forget_pet_states([user_id])
+
+
+def enqueue(name, user_id):
+    """Queue task `name` for the user unless a job for it is already pending."""
+    if name not in TASKS:
+        raise ValueError(f"Unknown task {name!r}")
+    if settings.TRACKER_TASKS_EAGER:
+        TASKS[name](user_id)
+        return
+    # unique_pending_job turns a second pending job into a no-op
+    Job.objects.bulk_create([Job(name=name, user_id=user_id)], ignore_conflicts=True)
+
+
+def claim(limit=100):
+    """Mark up to `limit` pending jobs, oldest first, as running and return them."""
+    claimed = []
+    for job in Job.objects.filter(state=Job.PENDING).order_by("id")[:limit]:
+        # Another worker may have taken it since the select
+        started = timezone.now()
+        if Job.objects.filter(pk=job.pk, state=Job.PENDING).update(
+            state=Job.RUNNING, attempts=F("attempts") + 1, started_at=started,
+        ):
+            job.state, job.attempts, job.started_at = Job.RUNNING, job.attempts + 1, started
+            claimed.append(job)
+    return claimed
+
+
+def run_job(job):
+    """Run a claimed job. Returns True if it succeeded; on success the job is deleted."""
+    try:
+        TASKS[job.name](job.user_id)
+    except Exception:
+        job.error = traceback.format_exc()
+        if job.attempts < MAX_ATTEMPTS:
+            _requeue(job)
+        else:
+            job.state = Job.FAILED
+            job.save(update_fields=["state", "error"])
+        return False
+    job.delete()
+    return True
+
+
+def run_pending(limit=100):
+    """Claim and run one batch of jobs. Returns (succeeded, failed)."""
+    succeeded = failed = 0
+    for job in claim(limit):
+        if run_job(job):
+            succeeded += 1
+        else:
+            failed += 1
+    return succeeded, failed
+
+
+def requeue_stale(older_than):
+    """Put back jobs left running since before `older_than` by a worker that died. Returns how many."""
+    stale = list(Job.objects.filter(state=Job.RUNNING, started_at__lt=older_than))
+    for job in stale:
+        _requeue(job)
+    return len(stale)
+
+
+def _requeue(job):
+    job.state = Job.PENDING
+    try:
+        with transaction.atomic():
+            job.save(update_fields=["state", "error"])
+    except IntegrityError:
+        # A newer pending job for the same task and user already covers it
+        job.delete()
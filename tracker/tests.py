@@ -1,3 +1,1223 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Q, Sum
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, reverse
+
+from datetime import date, datetime, timezone as dt_timezone
+
+from . import async_views, exporter, importer, leaderboard, perf, pet_state, stats_cache, tasks
+from .columnar import ROW, ColumnarUsageStore, convert_csv
+from .models import DailyUsage, Job, LeaderboardTotal, PetState, Platform, PlatformTotal, TimeEntry
+from . import petLogic
+from .petLogic import daily_point_change, return_pet_info, score_history, weekly_point_change
+from .pet_state import get_pet_state, recompute_points
+from .rollups import rebuild_daily_usage
+from .scoring import score_histories
+from .share_codes import code_for_user, resolve_codes
+from .timeseries import local_today, usage_series
+from .urls import tracker_patterns
+from .usage_store import (
+    CsvUsageStore, DatabaseUsageStore, UsageRecord, UsageSchemaError, history_cursor, parse_history_cursor,
+)
+
+
+def _append_worker(args):
+    path, worker, count = args
+    store = CsvUsageStore(path)
+    for i in range(count):
+        store.append([UsageRecord(f"W{worker:02d}", "2025-11-05", "TikTok", i)])
+
+
+class TrackerTestCase(TestCase):
+    """Clears the cache too: cached state keyed by user id would outlive the rolled-back rows."""
+
+    def setUp(self):
+        cache.clear()
+
+
+class UsageStoreTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("alice", password="pw")
+        self.code = self.user.userprofile.share_code
+
+    def test_database_store_round_trip(self):
+        store = DatabaseUsageStore()
+        store.add_entry(self.user, self.code, "2025-11-05", "TikTok", 20)
+        store.add_entry(self.user, self.code, "2025-11-04", "YouTube Shorts", 5)
+
+        self.assertEqual(list(store.entries(self.code)), [
+            UsageRecord(self.code, "2025-11-04", "YouTube Shorts", 5),
+            UsageRecord(self.code, "2025-11-05", "TikTok", 20),
+        ])
+        self.assertEqual(list(store.entries("NOSUCHCODE")), [])
+
+    def test_home_add_entry_writes_through_store(self):
+        self.client.login(username="alice", password="pw")
+        self.client.post(reverse("home"), {
+            "add_entry": "1", "platform": "TikTok", "minutes": "12", "date": "2025-11-05",
+        })
+
+        entry = TimeEntry.objects.get()
+        self.assertEqual((entry.user, entry.share_code, entry.platform, entry.minutes),
+                         (self.user, self.code, "TikTok", 12))
+        self.assertEqual(entry.date.isoformat(), "2025-11-05")
+
+    def test_columnar_store_through_views(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.client.login(username="alice", password="pw")
+        with override_settings(USAGE_STORE_BACKEND="tracker.columnar.ColumnarUsageStore", USAGE_COLUMNAR_PATH=tmp.name):
+            self.client.post(reverse("home"), {
+                "add_entry": "1", "platform": "TikTok", "minutes": "12", "date": "2025-11-05",
+            })
+            response = self.client.get(reverse("track_user_detail", args=[self.code]))
+        self.assertEqual(DailyUsage.objects.get().minutes, 12)
+        self.assertEqual(response.context["entries"], [{"date": "2025-11-05", "platform": "TikTok", "minutes": 12}])
+
+    def test_platform_labels_match_values(self):
+        self.assertEqual(Platform.labels, Platform.values)
+
+
+class DailyUsageTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("alice", password="pw")
+        self.code = self.user.userprofile.share_code
+        self.store = DatabaseUsageStore()
+
+    def rollup(self):
+        return sorted(DailyUsage.objects.values_list("date", "platform", "minutes"))
+
+    def test_writes_update_rollup_incrementally(self):
+        self.store.add_entry(self.user, self.code, "2025-11-05", "TikTok", 20)
+        self.store.add_entry(self.user, self.code, "2025-11-05", "TikTok", 15)
+        self.store.add_entry(self.user, self.code, "2025-11-06", "TikTok", 5)
+
+        rows = self.rollup()
+        self.assertEqual([(d.isoformat(), p, m) for d, p, m in rows], [
+            ("2025-11-05", "TikTok", 35),
+            ("2025-11-06", "TikTok", 5),
+        ])
+
+    def test_rebuild_matches_incremental_rollup(self):
+        self.store.add_entry(self.user, self.code, "2025-11-05", "TikTok", 20)
+        self.store.add_entry(self.user, self.code, "2025-11-05", "Other", 7)
+        incremental = self.rollup()
+        DailyUsage.objects.all().delete()
+
+        self.assertEqual(rebuild_daily_usage(self.store), 2)
+        self.assertEqual(self.rollup(), incremental)
+
+    def test_rebuild_keeps_entries_made_under_an_old_share_code(self):
+        self.store.add_entry(self.user, self.code, "2025-11-05", "TikTok", 10)
+        self.user.userprofile.regenerate_share_code()
+        rebuild_daily_usage(self.store)
+        self.assertEqual([m for _, _, m in self.rollup()], [10])
+
+    def test_stats_page_reads_rollup(self):
+        self.store.add_entry(self.user, self.code, "2025-11-05", "TikTok", 20)
+        self.store.add_entry(self.user, self.code, "2025-11-06", "Other", 10)
+        self.store.add_entry(self.user, self.code, "2025-11-06", "TikTok", 30)
+        self.client.login(username="alice", password="pw")
+        context = self.client.get(reverse("stats")).context
+
+        self.assertEqual(context["total_minutes"], 60)
+        self.assertEqual(context["avg_daily"], 30)
+        self.assertEqual(context["most_used"], "TikTok")
+        platforms = self.client.get(reverse("api_stats_platforms")).json()
+        self.assertEqual(platforms, {"labels": ["Other", "TikTok"], "values": [10, 50]})
+
+
+class PlatformTotalTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.store = DatabaseUsageStore()
+        self.alice = User.objects.create_user("alice", password="pw")
+        self.bob = User.objects.create_user("bob", password="pw")
+        self.store.add_entry(self.alice, self.alice.userprofile.share_code, "2025-11-05", "TikTok", 20)
+        self.store.add_entry(self.bob, self.bob.userprofile.share_code, "2025-11-05", "TikTok", 5)
+        self.store.add_entry(self.bob, self.bob.userprofile.share_code, "2025-11-06", "Other", 40)
+        self.client.login(username="alice", password="pw")
+
+    def totals(self):
+        return dict(PlatformTotal.objects.values_list("platform", "minutes"))
+
+    def test_updated_on_write_and_rebuildable(self):
+        self.assertEqual(self.totals(), {"TikTok": 25, "Other": 40})
+        PlatformTotal.objects.all().delete()
+        out = io.StringIO()
+        call_command("rebuild_platform_totals", stdout=out)
+        self.assertIn("2 rows", out.getvalue())
+        self.assertEqual(self.totals(), {"TikTok": 25, "Other": 40})
+
+    def test_resources_is_cached_until_a_write(self):
+        self.assertEqual(self.client.get(reverse("resources")).context["most_used"], "Other")
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse("resources"))
+        # session, user, navbar's userprofile: the totals come from the cache
+        self.assertEqual(len(ctx.captured_queries), 3)
+
+        self.store.add_entry(self.alice, self.alice.userprofile.share_code, "2025-11-06", "TikTok", 30)
+        self.assertEqual(self.client.get(reverse("resources")).context["most_used"], "TikTok")
+
+
+class LeaderboardTests(TrackerTestCase):
+    today = date(2025, 11, 6)  # a Thursday
+
+    def setUp(self):
+        super().setUp()
+        store = DatabaseUsageStore()
+        self.codes = {}
+        for name, entries in {
+            "alice": [("2025-11-06", 30), ("2025-11-03", 5)],
+            "bob": [("2025-11-06", 10), ("2025-11-01", 100)],
+            "carol": [("2025-11-05", 25)],
+        }.items():
+            user = User.objects.create_user(name, password="pw")
+            self.codes[name] = user.userprofile.share_code
+            for day, minutes in entries:
+                store.add_entry(user, self.codes[name], day, "TikTok", minutes)
+        self.store = store
+
+    def board(self, window):
+        return [(row["Rank"], row["Code"], row["Minutes"]) for row in leaderboard.top(window, today=self.today)]
+
+    def test_windows(self):
+        c = self.codes
+        self.assertEqual(self.board("day"), [(1, c["bob"], 10), (2, c["alice"], 30)])
+        self.assertEqual(self.board("week"), [(1, c["bob"], 10), (2, c["carol"], 25), (3, c["alice"], 35)])
+        self.assertEqual(self.board("all"), [(1, c["carol"], 25), (2, c["alice"], 35), (3, c["bob"], 110)])
+
+    def test_rank_of(self):
+        self.assertEqual(leaderboard.rank_of("all", self.codes["bob"], today=self.today), (3, 110))
+        self.assertIsNone(leaderboard.rank_of("day", self.codes["carol"], today=self.today))
+
+    def test_rebuild_matches_incremental_totals(self):
+        def snapshot():
+            return sorted(LeaderboardTotal.objects.values_list("window", "period_start", "share_code", "minutes"))
+        incremental = snapshot()
+        leaderboard.rebuild_leaderboard(self.store)
+        self.assertEqual(snapshot(), incremental)
+
+
+class ShareCodeTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.users = [User.objects.create_user(name, password="pw") for name in ("alice", "bob", "carol")]
+        self.codes = [user.userprofile.share_code for user in self.users]
+
+    def test_resolves_many_codes_in_one_query_then_from_cache(self):
+        with self.assertNumQueries(1):
+            owners = resolve_codes(self.codes + ["NOSUCHCODE00"])
+        self.assertEqual({code: owner.username for code, owner in owners.items()}, dict(zip(self.codes, ["alice", "bob", "carol"])))
+        self.assertEqual(code_for_user(self.users[0].pk), self.codes[0])
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_codes(self.codes), owners)
+            self.assertEqual(code_for_user(self.users[0].pk), self.codes[0])
+
+    def test_regenerate_share_code_invalidates(self):
+        resolve_codes(self.codes)
+        code_for_user(self.users[0].pk)
+        new_code = self.users[0].userprofile.regenerate_share_code()
+        self.assertEqual(resolve_codes([self.codes[0], new_code]).keys(), {new_code})
+        self.assertEqual(code_for_user(self.users[0].pk), new_code)
+
+    def test_rename_invalidates_but_login_does_not(self):
+        resolve_codes(self.codes)
+        self.client.login(username="alice", password="pw")
+        with self.assertNumQueries(0):
+            resolve_codes(self.codes[:1])
+        self.users[0].username = "alicia"
+        self.users[0].save()
+        self.assertEqual(resolve_codes(self.codes[:1])[self.codes[0]].username, "alicia")
+
+    def test_codes_are_normalised_on_write(self):
+        DatabaseUsageStore().add_entry(self.users[0], f" {self.codes[0].lower()} ", "2025-11-05", "TikTok", 5)
+        self.assertEqual(list(TimeEntry.objects.values_list("share_code", flat=True)), [self.codes[0]])
+        self.assertEqual(
+            self.client.get(reverse("track_user_detail", args=[self.codes[0].lower()])).context["total_minutes"], 5
+        )
+
+    def test_leaderboard_shows_usernames(self):
+        store = DatabaseUsageStore()
+        for user, code, minutes in zip(self.users, self.codes, (30, 10, 20)):
+            store.add_entry(user, code, local_today(), "TikTok", minutes)
+        self.client.login(username="alice", password="pw")
+        self.client.get(reverse("leaderboard"))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("leaderboard"))
+        self.assertEqual([row["Username"] for row in response.context["leaderboard"]], ["bob", "carol", "alice"])
+        self.assertEqual(response.context["my_rank"], 3)
+        # The navbar's profile is the only one loaded; codes and names come from the cache
+        self.assertEqual(len([q for q in ctx.captured_queries if '"tracker_userprofile"' in q["sql"]]), 1)
+
+
+class PetStateTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("alice", password="pw")
+        self.code = self.user.userprofile.share_code
+        self.client.login(username="alice", password="pw")
+
+    def test_unknown_pet_type_is_rejected(self):
+        for pet_type in ["-1", "999", "cat"]:
+            with self.subTest(pet_type):
+                response = self.client.post(reverse("home"), {"set_pet": "1", "pet_type": pet_type})
+                self.assertEqual(response.context["message"], "Unknown pet type.")
+        self.assertEqual(get_pet_state(self.user).pet_type, PetState._meta.get_field("pet_type").default)
+
+    def test_score_history_ignores_leading_idle_days(self):
+        history = [30, 20, 25, 10, 0, 5, 40, 35, 30, 20, 10, 5, 5, 60, 1]
+        first_day = date(2025, 11, 4)
+        padded = [0] * 9 + history
+        self.assertEqual(score_history(history, first_day, 5), score_history(padded, date(2025, 10, 26), 5))
+
+    def test_score_history_folds_scalar_rules(self):
+        # Mon 2025-11-03 .. Sun 2025-11-16: two full weeks, the second one lighter
+        history = [50, 40, 30, 30, 20, 10, 5] + [5, 4, 3, 2, 1, 1, 1]
+        points = 0
+        for i in range(1, len(history)):
+            points = daily_point_change(history[i], history[i - 1], points)
+            if i == 6:
+                points = weekly_point_change(sum(history[:7]), 0, points)
+        points = weekly_point_change(sum(history[7:]), sum(history[:7]), points)
+        self.assertEqual(score_history(history, date(2025, 11, 3)), points)
+
+    def test_add_entry_replays_points_into_pet_state(self):
+        for day, minutes in [("2025-11-03", 30), ("2025-11-04", 20), ("2025-11-05", 10)]:
+            self.client.post(reverse("home"), {"add_entry": "1", "platform": "TikTok", "minutes": minutes, "date": day})
+
+        state = PetState.objects.get(profile__user=self.user)
+        self.assertEqual(state.points, recompute_points(self.user.pk))
+        self.assertEqual(recompute_points(self.user.pk, as_of=date(2025, 11, 5)), 2)
+
+    def test_pet_stats_use_no_queries_when_cached(self):
+        self.client.post(reverse("home"), {"set_focus": "1", "focus_platform": "TikTok"})
+        self.client.post(reverse("home"), {"add_entry": "1", "platform": "TikTok", "minutes": "12"})
+        self.client.get(reverse("home"))
+
+        from .views import get_pet_stats
+        request = type("Request", (), {"user": self.user})()
+        with self.assertNumQueries(0):
+            pet_stats = get_pet_stats(request)
+        self.assertEqual((pet_stats["focus_platform"], pet_stats["daily_avg"]), ("TikTok", 12))
+        self.assertEqual(get_pet_state(self.user).focus_platform, "TikTok")
+
+
+@override_settings(TRACKER_TASKS_EAGER=False)
+class TaskQueueTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("alice", password="pw")
+        self.client.login(username="alice", password="pw")
+
+    def add_entry(self, minutes, day="2025-11-05"):
+        self.client.post(reverse("home"), {"add_entry": "1", "platform": "TikTok", "minutes": minutes, "date": day})
+
+    def points(self):
+        return PetState.objects.get(profile__user=self.user).points
+
+    def test_add_entry_queues_points_and_worker_applies_them(self):
+        self.add_entry("30", "2025-11-03")
+        self.add_entry("10", "2025-11-04")
+        self.assertEqual(DailyUsage.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(self.points(), 0)
+        self.assertEqual(list(Job.objects.values_list("name", "state")), [("pet_points", Job.PENDING)])
+
+        call_command("run_tasks", once=True, stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertEqual(self.points(), recompute_points(self.user.pk))
+        self.assertGreater(self.points(), 0)
+        self.assertFalse(Job.objects.exists())
+
+    def test_job_only_writes_points(self):
+        self.add_entry("30", "2025-11-03")
+        get_pet_state(self.user)  # the worker's cached copy, from before the change below
+        PetState.objects.filter(profile__user=self.user).update(focus_platform="Gambling", pet_type=3)
+        call_command("run_tasks", once=True, stdout=io.StringIO(), stderr=io.StringIO())
+
+        state = get_pet_state(self.user)
+        self.assertEqual((state.focus_platform, state.pet_type), ("Gambling", 3))
+        self.assertEqual(state.points, recompute_points(self.user.pk))
+
+    def test_web_save_keeps_points_from_the_worker(self):
+        self.add_entry("30", "2025-11-03")
+        stale = get_pet_state(self.user)
+        call_command("run_tasks", once=True, stdout=io.StringIO(), stderr=io.StringIO())
+        # Another web process still caches the state it read before the job ran
+        cache.set(pet_state._state_key(self.user.pk), stale, None)
+        self.client.post(reverse("home"), {"set_focus": "1", "focus_platform": "Other"})
+
+        self.assertGreater(self.points(), 0)
+        self.assertEqual(self.points(), recompute_points(self.user.pk))
+        self.assertEqual(get_pet_state(self.user).points, self.points())
+
+    def test_worker_warns_about_per_process_cache(self):
+        err = io.StringIO()
+        call_command("run_tasks", once=True, stdout=io.StringIO(), stderr=err)
+        self.assertIn("LocMemCache", err.getvalue())
+
+    def test_job_queued_while_running_waits_behind_it(self):
+        tasks.enqueue("pet_points", self.user.pk)
+        [running] = tasks.claim()
+        tasks.enqueue("pet_points", self.user.pk)
+        tasks.enqueue("pet_points", self.user.pk)
+        self.assertEqual(sorted(Job.objects.values_list("state", flat=True)), [Job.PENDING, Job.RUNNING])
+        self.assertTrue(tasks.run_job(running))
+        self.assertEqual(tasks.run_pending(), (1, 0))
+
+    def test_failing_job_is_retried_then_kept(self):
+        tasks.enqueue("pet_points", self.user.pk)
+        with mock.patch.dict(tasks.TASKS, {"pet_points": mock.Mock(side_effect=RuntimeError("boom"))}):
+            call_command("run_tasks", once=True, stdout=io.StringIO(), stderr=io.StringIO())
+        job = Job.objects.get()
+        self.assertEqual((job.state, job.attempts), (Job.FAILED, tasks.MAX_ATTEMPTS))
+        self.assertIn("RuntimeError: boom", job.error)
+
+    def test_stale_running_job_is_requeued(self):
+        tasks.enqueue("pet_points", self.user.pk)
+        tasks.claim()
+        Job.objects.update(started_at=datetime(2025, 1, 1, tzinfo=dt_timezone.utc))
+        call_command("run_tasks", once=True, stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertFalse(Job.objects.exists())
+
+    def test_import_queues_one_job_per_user(self):
+        rows = "date,platform,minutes\n" + "".join(f"2025-11-0{day},TikTok,5\n" for day in range(1, 8))
+        importer.import_usage(io.StringIO(rows), user=self.user, batch_size=2)
+        self.assertEqual(Job.objects.count(), 1)
+
+
+class BatchScoringTests(TrackerTestCase):
+    def test_bench_fails_on_a_mismatch(self):
+        wrong = lambda totals, first_day: score_histories(totals, first_day) + 1
+        with mock.patch("tracker.management.commands.bench_scoring.score_histories", wrong), \
+                self.assertRaises(CommandError):
+            call_command("bench_scoring", users=20, days=30, sample=5, stdout=io.StringIO())
+
+    def test_matches_scalar_fold(self):
+        rng = np.random.default_rng(7)
+        totals = rng.integers(0, 60, size=(200, 120))
+        totals[rng.random(totals.shape) < 0.3] = 0
+        first_day = date(2025, 3, 5)
+        starts = rng.integers(0, 101, size=200)
+
+        expected = [score_history(row.tolist(), first_day, int(p)) for row, p in zip(totals, starts)]
+        self.assertEqual(score_histories(totals, first_day, starts).tolist(), expected)
+
+        path = score_histories(totals, first_day, starts, trajectory=True)
+        self.assertEqual(path[:, -1].tolist(), expected)
+        self.assertTrue(((path >= 0) & (path <= 100)).all())
+
+    def test_nightly_command_matches_per_user_recompute(self):
+        store = DatabaseUsageStore()
+        users = [User.objects.create_user(name, password="pw") for name in ("alice", "bob", "carol")]
+        for user, entries in zip(users, [[("2025-11-03", 30), ("2025-11-04", 20)], [("2025-10-01", 5), ("2025-11-10", 50)], []]):
+            for day, minutes in entries:
+                store.add_entry(user, user.userprofile.share_code, day, "TikTok", minutes)
+
+        call_command("recompute_pet_points", as_of=date(2025, 11, 20), stdout=io.StringIO())
+        for user in users:
+            self.assertEqual(PetState.objects.get(profile__user=user).points,
+                             recompute_points(user.pk, as_of=date(2025, 11, 20)))
+
+
+class PetStageTests(SimpleTestCase):
+    def test_stage_boundaries(self):
+        self.assertEqual(return_pet_info(1, 0), ["/static/tracker/dragon_pet_egg.png", "Dragon Egg", 0.0])
+        self.assertEqual(return_pet_info(1, 10)[1:], ["Dragon Egg", 100.0])
+        self.assertEqual(return_pet_info(2, 11)[1:], ["Phoenix Baby", 5.0])
+        self.assertEqual(return_pet_info(3, 45)[1:], ["Slime Teen", 50.0])
+        self.assertEqual(return_pet_info(3, 61)[1:], ["Slime Adult", 100])
+        self.assertEqual(return_pet_info(1, 101), [None, None, None])
+        self.assertEqual(return_pet_info(9, 5), [None, None, None])
+
+    def test_register_pet_without_new_branches(self):
+        self.addCleanup(lambda: (petLogic.PETS.pop(4), petLogic._UPPERS.pop(4), petLogic._IMAGE_URLS.pop(4, None)))
+        petLogic.register_pet(4, [
+            petLogic.PetStage(100, "owl_adult.png", "Owl", petLogic.full_progress),
+            petLogic.PetStage(50, "owl_egg.png", "Owl Egg", petLogic.linear_progress),
+        ])
+        self.assertEqual(return_pet_info(4, 25), ["/static/tracker/owl_egg.png", "Owl Egg", 50.0])
+        self.assertEqual(return_pet_info(4, 75)[1:], ["Owl", 100])
+
+
+class RequestQueryCountTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("alice", password="pw")
+        self.client.login(username="alice", password="pw")
+        self.client.post(reverse("home"), {"set_focus": "1", "focus_platform": "TikTok"})
+        self.client.post(reverse("home"), {"add_entry": "1", "platform": "TikTok", "minutes": "12"})
+
+    def queries(self, method, url, data=None):
+        with CaptureQueriesContext(connection) as ctx:
+            getattr(self.client, method)(url, data)
+        return [q["sql"] for q in ctx.captured_queries]
+
+    def test_views_load_each_piece_once(self):
+        # session, user, navbar's userprofile
+        self.assertEqual(len(self.queries("get", reverse("home"))), 3)
+        # session, user, DailyUsage rows, navbar's userprofile
+        self.assertEqual(len(self.queries("get", reverse("stats"))), 4)
+
+        # The points recompute is queued, so only the request's own loads count here
+        with override_settings(TRACKER_TASKS_EAGER=False):
+            post = self.queries("post", reverse("home"), {"add_entry": "1", "platform": "TikTok", "minutes": "5"})
+        row_loads = [sql for sql in post if sql.startswith('SELECT "tracker_dailyusage"."date"')]
+        profile_loads = [sql for sql in post if sql.startswith('SELECT "tracker_userprofile"')]
+        self.assertEqual((len(row_loads), len(profile_loads)), (1, 1))
+
+    def test_views_do_not_read_the_csv(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, "usage_data.csv")
+        with override_settings(USAGE_STORE_BACKEND="tracker.usage_store.CsvUsageStore", USAGE_CSV_PATH=path), \
+                mock.patch.object(CsvUsageStore, "entries") as entries, \
+                mock.patch.object(CsvUsageStore, "dataframe") as dataframe:
+            self.client.post(reverse("home"), {"add_entry": "1", "platform": "TikTok", "minutes": "5"})
+            self.client.get(reverse("home"))
+            self.client.get(reverse("stats"))
+        self.assertEqual((entries.call_count, dataframe.call_count), (0, 0))
+
+
+class StatsCacheTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("alice", password="pw")
+        self.client.login(username="alice", password="pw")
+        self.client.post(reverse("home"), {"add_entry": "1", "platform": "TikTok", "minutes": "12"})
+
+    def stats(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("stats"))
+        return response.context, len(ctx.captured_queries)
+
+    def test_repeat_view_is_a_hit(self):
+        _, cold = self.stats()
+        context, warm = self.stats()
+        # session, user, navbar's userprofile: no usage queries at all
+        self.assertEqual((cold, warm), (4, 3))
+        self.assertEqual(context["total_minutes"], 12)
+        self.assertEqual(stats_cache.counters(), {"hits": 1, "misses": 1})
+
+    def test_writes_bump_the_version(self):
+        self.stats()
+        self.client.post(reverse("home"), {"add_entry": "1", "platform": "Other", "minutes": "3"})
+        self.assertEqual(self.stats()[0]["total_minutes"], 15)
+        self.client.post(reverse("home"), {"set_focus": "1", "focus_platform": "Other"})
+        self.assertEqual(self.stats()[0]["focus_platform"], "Other")
+        self.client.post(reverse("home"), {"set_pet": "1", "pet_type": "2"})
+        self.stats()
+        self.assertEqual(stats_cache.counters(), {"hits": 0, "misses": 4})
+
+    def test_command_reports_counters(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": tmp},
+        }):
+            self.stats()
+            self.stats()
+            out = io.StringIO()
+            call_command("stats_cache", reset=True, stdout=out)
+            self.assertIn("hits: 1  misses: 1  hit ratio: 50.0%", out.getvalue())
+            self.assertEqual(stats_cache.counters(), {"hits": 0, "misses": 0})
+
+    def test_command_refuses_a_per_process_cache(self):
+        with self.assertRaises(CommandError):
+            call_command("stats_cache", stdout=io.StringIO())
+
+
+class TimeSeriesTests(TrackerTestCase):
+    today = date(2025, 11, 6)  # a Thursday
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("alice", password="pw")
+        store = DatabaseUsageStore()
+        code = self.user.userprofile.share_code
+        for day, platform, minutes in [("2025-10-01", "TikTok", 5), ("2025-10-31", "TikTok", 10),
+                                       ("2025-11-03", "Other", 7), ("2025-11-03", "TikTok", 3), ("2025-11-06", "TikTok", 1)]:
+            store.add_entry(self.user, code, day, platform, minutes)
+
+    def test_daily_series_is_gap_filled(self):
+        with CaptureQueriesContext(connection) as ctx:
+            series = usage_series(self.user.pk, days=7, today=self.today)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual([day.day for day, _ in series], [31, 1, 2, 3, 4, 5, 6])
+        self.assertEqual([minutes for _, minutes in series], [10, 0, 0, 10, 0, 0, 1])
+
+    def test_weekly_and_monthly_buckets(self):
+        weekly = usage_series(self.user.pk, days=14, bucket="week", today=self.today)
+        self.assertEqual(weekly, [(date(2025, 10, 20), 0), (date(2025, 10, 27), 10), (date(2025, 11, 3), 11)])
+        monthly = usage_series(self.user.pk, days=60, bucket="month", today=self.today)
+        self.assertEqual(monthly, [(date(2025, 9, 1), 0), (date(2025, 10, 1), 15), (date(2025, 11, 1), 11)])
+        self.assertEqual(usage_series(self.user.pk, days=7, today=self.today, platform="Other")[3], (date(2025, 11, 3), 7))
+
+    def test_today_follows_time_zone(self):
+        late_utc = datetime(2025, 11, 6, 20, 0, tzinfo=dt_timezone.utc)
+        with mock.patch("django.utils.timezone.now", return_value=late_utc):
+            with override_settings(TIME_ZONE="Asia/Tokyo"):
+                self.assertEqual(local_today(), date(2025, 11, 7))
+            with override_settings(TIME_ZONE="America/Chicago"):
+                self.assertEqual(local_today(), date(2025, 11, 6))
+
+
+class StatsApiTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("alice", password="pw")
+        self.client.login(username="alice", password="pw")
+        self.today = date.today().isoformat()
+        self.client.post(reverse("home"), {"add_entry": "1", "platform": "TikTok", "minutes": "12", "date": self.today})
+
+    def test_endpoints(self):
+        self.assertEqual(
+            self.client.get(reverse("api_stats_summary")).json(),
+            {"total_minutes": 12, "avg_daily": 12, "most_used": "TikTok"},
+        )
+        trend = self.client.get(reverse("api_stats_trend"), {"days": 30}).json()
+        self.assertEqual((len(trend["labels"]), trend["labels"][-1], sum(trend["values"])), (30, self.today, 12))
+        monthly = self.client.get(reverse("api_stats_trend"), {"days": 365, "bucket": "month"}).json()
+        self.assertIn(len(monthly["values"]), (12, 13))
+        self.assertEqual(self.client.get(reverse("api_stats_trend"), {"bucket": "year"}).status_code, 400)
+        trend = self.client.get(reverse("api_stats_trend"), {"days": 1})
+        self.assertNotIn(b" ", trend.content)
+        self.assertEqual(self.client.get(reverse("api_stats_trend"), {"days": 0}).status_code, 400)
+
+    def test_unchanged_data_is_a_304_without_queries(self):
+        first = self.client.get(reverse("api_stats_platforms"))
+        with CaptureQueriesContext(connection) as ctx:
+            again = self.client.get(reverse("api_stats_platforms"), HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, 304)
+        # session and user only
+        self.assertEqual(len(ctx.captured_queries), 2)
+
+        since = self.client.get(reverse("api_stats_platforms"), HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual(since.status_code, 304)
+
+    def test_write_changes_the_etag(self):
+        first = self.client.get(reverse("api_stats_summary"))
+        self.client.post(reverse("home"), {"add_entry": "1", "platform": "Other", "minutes": "3"})
+        again = self.client.get(reverse("api_stats_summary"), HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual((again.status_code, again.json()["total_minutes"]), (200, 15))
+
+    def test_anonymous_gets_401(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse("api_stats_summary")).status_code, 401)
+
+
+class PerformanceMiddlewareTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        perf.REGISTRY.clear()
+        self.user = User.objects.create_user("alice", password="pw")
+        self.client.login(username="alice", password="pw")
+
+    def test_server_timing_header(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("stats"))
+        timing = response["Server-Timing"]
+        queries = len(ctx.captured_queries)
+        self.assertRegex(timing, rf'^total;dur=[\d.]+, db;dur=[\d.]+;desc="{queries} queries", template;dur=[\d.]+, store;desc="0 bytes"$')
+        self.assertGreater(float(timing.split("template;dur=")[1].split(",")[0]), 0)
+
+    def test_csv_store_bytes(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, "usage_data.csv")
+        with override_settings(USAGE_STORE_BACKEND="tracker.usage_store.CsvUsageStore", USAGE_CSV_PATH=path):
+            response = self.client.post(reverse("home"), {"add_entry": "1", "platform": "TikTok", "minutes": "5"})
+        line = f"{self.user.userprofile.share_code},{date.today()},TikTok,5\n"
+        self.assertIn(f'store;desc="{len(line)} bytes"', response["Server-Timing"])
+
+    def test_report_is_staff_only(self):
+        self.client.get(reverse("home"))  # creates the pet state
+        perf.REGISTRY.clear()
+        for _ in range(3):
+            self.client.get(reverse("home"))
+        self.assertEqual(self.client.get(reverse("perf_report")).status_code, 302)
+
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        report = self.client.get(reverse("perf_report")).json()
+        home = report["views"]["home"]
+        self.assertEqual((home["count"], home["avg_queries"]), (3, 3))
+        self.assertLessEqual(home["p50_ms"], home["p95_ms"])
+        self.assertLessEqual(home["p95_ms"], home["p99_ms"])
+        self.assertIn("hits", report["stats_cache"])
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual([perf.percentile(values, p) for p in (50, 95, 99)], [50, 95, 99])
+        self.assertEqual(perf.percentile([7], 99), 7)
+        self.assertEqual(perf.percentile([], 50), 0)
+
+
+class FriendsDashboardTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("alice", password="pw")
+        self.client.login(username="alice", password="pw")
+        self.store = DatabaseUsageStore()
+
+    def add_friends(self, count):
+        for i in range(count):
+            friend = User.objects.create_user(f"friend{User.objects.count()}", password="pw")
+            self.store.add_entry(friend, friend.userprofile.share_code, "2025-11-05", "TikTok", 30 + i)
+            self.store.add_entry(friend, friend.userprofile.share_code, "2025-11-06", "Other", 10)
+            self.user.userprofile.friends.add(friend.userprofile)
+
+    def dashboard_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("friends_list"))
+        return response, len(ctx.captured_queries)
+
+    def test_summaries(self):
+        self.add_friends(2)
+        response, _ = self.dashboard_queries()
+        first = response.context["friends"][0]
+        self.assertEqual(
+            (first["total_minutes"], first["daily_avg"], first["most_used"], first["pet_mood"]),
+            (40, 20, "TikTok", "Happy"),
+        )
+
+    def test_query_count_does_not_grow_with_friends(self):
+        self.add_friends(2)
+        _, few = self.dashboard_queries()
+        self.add_friends(6)
+        response, many = self.dashboard_queries()
+        self.assertEqual(len(response.context["friends"]), 8)
+        self.assertEqual(few, many)
+
+
+class AsyncUrlconf:
+    urlpatterns = [
+        path("accounts/", include("accounts.urls")),
+        path("", include(tracker_patterns(async_views))),
+    ]
+
+
+@override_settings(ROOT_URLCONF=AsyncUrlconf, TRACKER_ASYNC_THREADS=0)
+class AsyncViewsTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        store = DatabaseUsageStore()
+        self.user = User.objects.create_user("alice", password="pw")
+        friend = User.objects.create_user("bob", password="pw")
+        self.code = friend.userprofile.share_code
+        for day, minutes in [("2025-11-05", 30), ("2025-11-06", 10)]:
+            store.add_entry(self.user, self.user.userprofile.share_code, day, "TikTok", minutes)
+            store.add_entry(friend, self.code, day, "Other", minutes * 2)
+        self.user.userprofile.friends.add(friend.userprofile)
+        self.client.force_login(self.user)
+        self.async_client.force_login(self.user)
+
+    def get(self, name, *args, **params):
+        return async_to_sync(self.async_client.get)(reverse(name, args=args), params)
+
+    def test_pages_match_sync_views(self):
+        pages = [("stats", ()), ("leaderboard", ()), ("friends_list", ()), ("track_user_detail", (self.code,))]
+        keys = {
+            "stats": ["total_minutes", "most_used", "avg_daily", "points", "trend_ranges"],
+            "leaderboard": ["leaderboard", "window", "my_rank", "my_minutes"],
+            "friends_list": ["friends"],
+            "track_user_detail": ["entries", "total_minutes", "daily_avg", "most_used", "next_cursor"],
+        }
+        for name, args in pages:
+            with self.subTest(name):
+                response = self.get(name, *args)
+                self.assertEqual(response.status_code, 200)
+                with override_settings(ROOT_URLCONF="shortform_tracker.urls"):
+                    expected = self.client.get(reverse(name, args=args))
+                self.assertEqual(
+                    {key: response.context[key] for key in keys[name]},
+                    {key: expected.context[key] for key in keys[name]},
+                )
+
+    def test_history_pages(self):
+        response = self.get("track_user_history", self.code)
+        self.assertEqual([entry["minutes"] for entry in response.json()["entries"]], [20, 60])
+        self.assertEqual(self.get("track_user_history", self.code, before="yesterday").status_code, 400)
+        self.assertEqual(self.get("track_user_history", "NOPE").status_code, 404)
+
+    def test_login_required(self):
+        self.async_client.logout()
+        response = self.get("stats")
+        self.assertEqual((response.status_code, response["Location"]), (302, "/accounts/login/?next=/stats/"))
+
+    def test_server_timing_counts_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.get("friends_list")
+        self.assertIn(f'desc="{len(ctx.captured_queries)} queries"', response["Server-Timing"])
+
+    def test_blocking_runs_on_the_pool(self):
+        with override_settings(TRACKER_ASYNC_THREADS=2):
+            name = async_to_sync(async_views.blocking)(lambda: threading.current_thread().name)
+        self.assertTrue(name.startswith("tracker-async"))
+
+
+class HistoryPaginationTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("alice", password="pw")
+        self.code = self.user.userprofile.share_code
+        entries = [
+            TimeEntry(user=self.user, share_code=self.code, date=date(2025, 1, 1 + i % 28), platform="TikTok", minutes=i)
+            for i in range(120)
+        ]
+        TimeEntry.objects.bulk_create(entries)
+        self.expected = list(TimeEntry.objects.filter(user=self.user).order_by("-date", "-id").values_list("minutes", flat=True))
+
+    def test_pages_cover_history_once_in_order(self):
+        response = self.client.get(reverse("track_user_detail", args=[self.code]))
+        seen = [entry["minutes"] for entry in response.context["entries"]]
+        cursor = response.context["next_cursor"]
+        while cursor:
+            page = self.client.get(reverse("track_user_history", args=[self.code]), {"before": cursor}).json()
+            seen += [entry["minutes"] for entry in page["entries"]]
+            cursor = page["next"]
+        self.assertEqual(seen, self.expected)
+
+    def test_last_page_has_no_cursor(self):
+        TimeEntry.objects.filter(minutes__gte=50).delete()
+        response = self.client.get(reverse("track_user_detail", args=[self.code]))
+        self.assertEqual(len(response.context["entries"]), 50)
+        self.assertIsNone(response.context["next_cursor"])
+
+    def test_bad_cursor(self):
+        response = self.client.get(reverse("track_user_history", args=[self.code]), {"before": "yesterday"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_csv_store_matches_database_order(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = CsvUsageStore(os.path.join(tmp, "usage_data.csv"))
+            store.append([UsageRecord(self.code, f"2025-01-{1 + i % 3:02d}", "TikTok", i) for i in range(7)])
+            first = store.history(self.user, self.code, limit=4)
+            rest = store.history(self.user, self.code, before=parse_history_cursor(history_cursor(first[-1])))
+        self.assertEqual([row.minutes for row in first + rest], [5, 2, 4, 1, 6, 3, 0])
+
+
+class ImportUsageTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("alice", password="pw")
+        self.client.login(username="alice", password="pw")
+        self.code = self.user.userprofile.share_code
+
+    def upload(self, name, text):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        upload = SimpleUploadedFile(name, text.encode())
+        return self.client.post(reverse("import_usage"), {"file": upload}).context["result"]
+
+    def test_csv_upload_updates_rollups(self):
+        text = "date,app,minutes\n2025-11-03,tiktok,30\n2025-11-04,Instagram Reels,20\n2025-11-04,Nope,5\nbad,TikTok,1\n"
+        result = self.upload("export.csv", text)
+        self.assertEqual((result.created, result.duplicates, result.invalid), (2, 0, 2))
+        self.assertEqual(
+            sorted(DailyUsage.objects.filter(user=self.user).values_list("platform", "minutes")),
+            [("Instagram Reels", 20), ("TikTok", 30)],
+        )
+        self.assertEqual(leaderboard.rank_of("all", self.code), (1, 50))
+
+    def test_reimport_is_deduplicated(self):
+        text = '{"date": "2025-11-03", "platform": "TikTok", "seconds": 600}\n{"date": "2025-11-03", "platform": "TikTok", "minutes": 4}\n'
+        first = self.upload("export.jsonl", text)
+        second = self.upload("export.jsonl", text)
+        self.assertEqual((first.created, first.duplicates), (1, 1))
+        self.assertEqual((second.created, second.duplicates), (0, 2))
+        self.assertEqual(TimeEntry.objects.get(user=self.user).minutes, 10)
+
+    def test_rows_the_store_would_refuse_are_invalid(self):
+        minutes = ["inf", "1e400", "99999999999", "-0.5", "12.7", "nan"]
+        text = "".join(f'{{"date": "2025-11-03", "platform": "TikTok", "minutes": "{m}"}}\n' for m in minutes)
+        text += '{"date": "2025-11-04", "platform": "TikTok", "seconds": "inf"}\n'
+        text += '{"date": "2025-11-05", "platform": "TikTok", "seconds": 90}\n'
+        result = self.upload("export.jsonl", text)
+        self.assertEqual((result.created, result.invalid), (1, 7))
+        self.assertEqual(TimeEntry.objects.get(user=self.user).minutes, 2)
+
+    def test_command_batches_by_share_code(self):
+        other = User.objects.create_user("bob", password="pw")
+        rows = [f"{code},2025-10-{day:02d},TikTok,{day}" for day in range(1, 31) for code in (self.code, other.userprofile.share_code)]
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as f:
+            f.write("Code,Date,Platform,Minutes\n" + "\n".join(rows) + "\n")
+        self.addCleanup(os.unlink, f.name)
+
+        out = io.StringIO()
+        with CaptureQueriesContext(connection) as ctx:
+            call_command("import_usage", f.name, batch_size=1000, stdout=out)
+        self.assertIn("Imported 60 entries", out.getvalue())
+        self.assertEqual(DailyUsage.objects.filter(user=other).count(), 30)
+        # One batch: the query count depends on users and batches, not on the 60 rows
+        self.assertLess(len(ctx.captured_queries), 60)
+
+
+class MigrateUsageCsvTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("alice", password="pw")
+        self.code = self.user.userprofile.share_code
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "usage_data.csv")
+        with open(self.path, "w") as f:
+            f.write(f"Code,Date,Platform,Minutes\n{self.code.lower()},2025-11-04,TikTok,10\n{self.code},2025-11-05,Other,5\n")
+
+    def migrate(self, *args):
+        out = io.StringIO()
+        call_command("migrate_usage_csv", "--path", self.path, *args, stdout=out, stderr=io.StringIO())
+        return out.getvalue()
+
+    def test_copies_entries_and_rebuilds_rollups(self):
+        self.assertIn("Copied 2 entries", self.migrate())
+        self.assertEqual(DailyUsage.objects.filter(user=self.user).aggregate(total=Sum("minutes"))["total"], 15)
+        self.assertEqual(PlatformTotal.objects.get(platform="TikTok").minutes, 10)
+        self.assertEqual(leaderboard.rank_of("all", self.code), (1, 15))
+
+    def test_second_run_is_refused(self):
+        self.migrate()
+        with self.assertRaises(CommandError):
+            self.migrate()
+        self.assertEqual(TimeEntry.objects.count(), 2)
+
+    def test_rows_follow_the_store_rules(self):
+        with open(self.path, "a") as f:
+            f.write(f"{self.code},2025-11-06,TikTok,2.5\n{self.code},2025-11-06,Netflix,5\n{self.code},2025-11-06,TikTok,-1\n")
+        self.assertIn("Copied 2 entries, skipped 3 rows", self.migrate())
+
+
+class ExportUsageTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("alice", password="pw")
+        self.other = User.objects.create_user("bob", password="pw")
+        self.client.login(username="alice", password="pw")
+        self.code = self.user.userprofile.share_code
+        store = DatabaseUsageStore()
+        store.add_entry(self.user, self.code, "2025-11-03", "TikTok", 30)
+        store.add_entry(self.user, self.code, "2025-11-04", "Other", 5)
+        store.add_entry(self.other, self.other.userprofile.share_code, "2025-11-04", "TikTok", 99)
+
+    def download(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content)
+
+    def test_csv_holds_only_own_rows(self):
+        _, body = self.download(reverse("export_usage"))
+        self.assertEqual(body.decode().splitlines(), [
+            "Code,Date,Platform,Minutes", f"{self.code},2025-11-03,TikTok,30", f"{self.code},2025-11-04,Other,5",
+        ])
+
+    def test_own_export_keeps_entries_under_an_old_share_code(self):
+        self.user.userprofile.regenerate_share_code()
+        _, body = self.download(reverse("export_usage"), format="json")
+        self.assertEqual([row["Minutes"] for row in json.loads(body)], [30, 5])
+
+    def test_gzipped_json(self):
+        response, body = self.download(reverse("export_usage"), format="json", gzip="1")
+        self.assertIn(".json.gz", response["Content-Disposition"])
+        rows = json.loads(gzip.decompress(body))
+        self.assertEqual([row["Minutes"] for row in rows], [30, 5])
+
+    def test_rows_span_several_chunks(self):
+        with mock.patch("tracker.exporter.CHUNK_ROWS", 1):
+            _, body = self.download(reverse("export_usage"), format="json")
+        self.assertEqual(len(json.loads(body)), 2)
+
+    @unittest.skipUnless(exporter.parquet_available(), "pyarrow is not installed")
+    def test_parquet(self):
+        import pyarrow.parquet as pq
+
+        with mock.patch("tracker.exporter.CHUNK_ROWS", 1):
+            _, body = self.download(reverse("export_usage"), format="parquet")
+        table = pq.read_table(io.BytesIO(body))
+        self.assertEqual(table.column("Minutes").to_pylist(), [30, 5])
+        self.assertEqual(pq.ParquetFile(io.BytesIO(body)).num_row_groups, 2)
+
+    @unittest.skipUnless(exporter.parquet_available(), "pyarrow is not installed")
+    def test_parquet_with_many_platforms(self):
+        import pyarrow.parquet as pq
+
+        records = [UsageRecord("AAA", "2025-11-03", f"Platform {i}", i) for i in range(300)]
+        table = pq.read_table(io.BytesIO(b"".join(exporter.parquet_stream(records))))
+        self.assertEqual(len(set(table.column("Platform").to_pylist())), 300)
+
+    def test_parquet_needs_pyarrow(self):
+        with mock.patch("tracker.exporter.parquet_available", return_value=False):
+            response = self.client.get(reverse("export_usage"), {"format": "parquet"})
+            self.assertNotIn("parquet", exporter.formats())
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(b"pyarrow", response.content)
+
+    def test_unknown_format(self):
+        self.assertEqual(self.client.get(reverse("export_usage"), {"format": "xlsx"}).status_code, 400)
+
+    def test_site_export_is_staff_only(self):
+        self.assertEqual(self.client.get(reverse("export_all_usage")).status_code, 302)
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        _, body = self.download(reverse("export_all_usage"))
+        self.assertEqual(len(body.decode().splitlines()), 4)
+
+
+class QueryPlanTests(TrackerTestCase):
+    """EXPLAIN QUERY PLAN on SQLite: the hot queries search an index instead of scanning."""
+
+    # SQLite builds unique_daily_usage inline with the table, under its own name
+    unique_daily_usage = "sqlite_autoindex_tracker_dailyusage_1"
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("alice", password="pw")
+
+    def assertUsesIndex(self, queryset, *indexes):
+        plan = queryset.explain()
+        self.assertTrue(any(f"USING INDEX {index}" in plan for index in indexes), plan)
+        self.assertNotIn("SCAN", plan)
+
+    def test_stats_and_trend(self):
+        usage = DailyUsage.objects.filter(user=self.user)
+        self.assertUsesIndex(usage.values_list("date", "platform", "minutes"), self.unique_daily_usage, "daily_user_platform_date_idx")
+        self.assertUsesIndex(usage.filter(date__gt=date(2025, 11, 1)), self.unique_daily_usage)
+        self.assertUsesIndex(usage.filter(platform="TikTok", date__gt=date(2025, 11, 1)), "daily_user_platform_date_idx")
+        trend = usage.filter(date__range=(date(2025, 1, 1), date(2025, 12, 31))).values_list("date").annotate(Sum("minutes")).order_by()
+        self.assertUsesIndex(trend, self.unique_daily_usage)
+
+    def test_raw_entries(self):
+        entries = TimeEntry.objects.filter(user=self.user)
+        self.assertUsesIndex(entries.filter(date__gte=date(2025, 11, 1)), "entry_user_date_idx")
+        self.assertUsesIndex(entries.filter(platform="TikTok", date__gte=date(2025, 11, 1)), "entry_user_platform_date_idx")
+
+    def test_history_page(self):
+        entries = TimeEntry.objects.filter(user=self.user).order_by("-date", "-id")
+        self.assertUsesIndex(entries[:51], "entry_user_date_idx")
+        after = Q(date__lt=date(2025, 11, 1)) | Q(date=date(2025, 11, 1), id__lt=100)
+        self.assertUsesIndex(entries.filter(after)[:51], "entry_user_date_idx")
+
+    def test_leaderboard(self):
+        board = LeaderboardTotal.objects.filter(window="all", period_start=leaderboard.ALL_TIME)
+        self.assertUsesIndex(board.order_by("minutes", "share_code")[:25], "leaderboard_rank_idx")
+        self.assertUsesIndex(board.filter(minutes__lt=100), "leaderboard_rank_idx")
+
+
+class CsvUsageStoreTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "usage_data.csv")
+
+    def read_rows(self):
+        with open(self.path, newline="") as f:
+            return list(csv.DictReader(f))
+
+    def test_append_keeps_existing_column_order(self):
+        with open(self.path, "w") as f:
+            f.write("Date,Platform,Minutes,Code\n2025-11-04,YouTube,10.0,")  # no trailing newline
+        CsvUsageStore(self.path).append([UsageRecord("ABC", "2025-11-05", "TikTok", 20)])
+
+        self.assertEqual(self.read_rows(), [
+            {"Date": "2025-11-04", "Platform": "YouTube", "Minutes": "10.0", "Code": ""},
+            {"Date": "2025-11-05", "Platform": "TikTok", "Minutes": "20", "Code": "ABC"},
+        ])
+
+    def test_parallel_appends_are_not_lost(self):
+        workers, per_worker = 8, 50
+        ctx = multiprocessing.get_context("fork")
+        with ctx.Pool(workers) as pool:
+            pool.map(_append_worker, [(self.path, w, per_worker) for w in range(workers)])
+
+        rows = self.read_rows()
+        self.assertEqual(len(rows), workers * per_worker)
+        for w in range(workers):
+            minutes = [int(r["Minutes"]) for r in rows if r["Code"] == f"W{w:02d}"]
+            self.assertEqual(minutes, list(range(per_worker)))
+
+    def test_compact_rewrites_canonical_columns(self):
+        with open(self.path, "w") as f:
+            f.write("Date,Platform,Minutes,Code\n2025-11-04,YouTube,10.0, abc\n,,,\n")
+        kept = CsvUsageStore(self.path).compact()
+
+        self.assertEqual(kept, 1)
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "Code,Date,Platform,Minutes\nABC,2025-11-04,YouTube,10.0\n")
+
+
+class ColumnarUsageStoreTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.store = ColumnarUsageStore(os.path.join(tmp.name, "store"))
+        self.store.append([
+            UsageRecord("AAA", "2025-11-06", "TikTok", 10),
+            UsageRecord("BBB", "2025-11-01", "Other", 5),
+            UsageRecord("AAA", "2025-11-02", "YouTube Shorts", 20),
+            UsageRecord("AAA", "2025-11-04", "TikTok", 30),
+        ])
+
+    def test_partitions_and_date_range(self):
+        self.assertEqual(self.store.codes(), ["AAA", "BBB"])
+        self.assertEqual(os.path.getsize(self.store._partition("AAA")), 3 * ROW.itemsize)
+        self.assertEqual(self.store.platforms(), ["TikTok", "Other", "YouTube Shorts"])
+        self.assertEqual(
+            list(self.store.entries("AAA", start=date(2025, 11, 3))),
+            [UsageRecord("AAA", "2025-11-04", "TikTok", 30), UsageRecord("AAA", "2025-11-06", "TikTok", 10)],
+        )
+        self.assertEqual([r.code for r in self.store.entries(end=date(2025, 11, 2))], ["AAA", "BBB"])
+        self.assertEqual(list(self.store.entries("../AAA")), [])
+
+    def test_history_pages_newest_first(self):
+        self.store.append([UsageRecord("AAA", "2025-11-04", "Other", 1)])
+        first = self.store.history(None, "AAA", limit=2)
+        rest = self.store.history(None, "AAA", before=parse_history_cursor(history_cursor(first[-1])))
+        self.assertEqual([row.minutes for row in first + rest], [10, 1, 30, 20])
+
+    def test_dataframe(self):
+        df = self.store.dataframe("AAA")
+        self.assertEqual(list(df.columns), ["Code", "Date", "Platform", "Minutes"])
+        self.assertEqual(df["Minutes"].sum(), 60)
+
+    def test_torn_tail_is_ignored(self):
+        with open(self.store._partition("BBB"), "ab") as f:
+            f.write(b"\x01\x02\x03")
+        self.assertEqual(len(list(self.store.entries("BBB"))), 1)
+
+    def test_rejects_bad_records(self):
+        for record in [UsageRecord("a/b", "2025-11-01", "TikTok", 1), UsageRecord("AAA", "2025-11-01", "TikTok", -1),
+                       UsageRecord("AAA", "yesterday", "TikTok", 1)]:
+            with self.subTest(record), self.assertRaises(ValueError):
+                self.store.append([record])
+        self.assertEqual(len(self.store.read("AAA")), 3)
+
+    def test_convert_quarantines_malformed_rows(self):
+        path = os.path.join(self.tmp, "usage_data.csv")
+        with open(path, "w") as f:
+            f.write(
+                "Date,Platform,Minutes,Code\n"
+                "2025-11-20,YouTube Shorts,12.0,08644f65\n"
+                "<<<<<<< HEAD,,,\n"
+                "2025-11-05,TikTok,20.0,\n"
+                "2025-13-05,TikTok,20.0,ABC\n"
+                "2025-11-05,Other,1e+18,ABC\n"
+                "2025-11-05,Other,2.5,ABC\n"
+                ",,,\n"
+                "2025-11-21,Instagram Reels,22,EF27E94FBC3B\n"
+            )
+        store = ColumnarUsageStore(os.path.join(self.tmp, "converted"))
+        quarantine = os.path.join(self.tmp, "quarantine.csv")
+        self.assertEqual(convert_csv(path, store, quarantine), (2, 5))
+        self.assertEqual(store.codes(), ["08644F65", "EF27E94FBC3B"])
+        with open(quarantine, newline="") as f:
+            self.assertEqual(
+                [(row["Source"], row["Reason"]) for row in csv.DictReader(f)],
+                [("line 3", "merge conflict marker"), ("line 4", "missing share code"), ("line 5", "invalid date"),
+                 ("line 6", "minutes out of range"), ("line 7", "invalid minutes")],
+            )
+
+
+class ValidateUsageTests(TrackerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("alice", password="pw")
+        self.code = self.user.userprofile.share_code
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.quarantine = os.path.join(tmp.name, "quarantine.csv")
+
+    def validate(self, *args):
+        call_command("validate_usage", "--quarantine", self.quarantine, *args, stdout=io.StringIO())
+        with open(self.quarantine, newline="") as f:
+            return [(row["Source"], row["Reason"]) for row in csv.DictReader(f)]
+
+    def test_legacy_csv_is_refused_until_validated(self):
+        path = os.path.join(self.tmp, "usage_data.csv")
+        with open(path, "w") as f:
+            f.write(
+                "Date,Platform,Minutes,Code\n"
+                f"2025-11-04,TikTok,10.0, {self.code.lower()}\n"
+                "<<<<<<< HEAD,,,\n"
+                "2025-11-05,TikTok,20,\n"
+                f"2025-11-05,TikTok,-3,{self.code}\n"
+                "\n"
+                f"2025-11-06,Other,7,{self.code}\n"
+            )
+        store = CsvUsageStore(path)
+        with self.assertRaises(UsageSchemaError):
+            list(store.entries())
+
+        args = ("--backend", "tracker.usage_store.CsvUsageStore", "--path", path)
+        self.assertEqual(self.validate(*args, "--dry-run"), [
+            ("line 3", "merge conflict marker"), ("line 4", "missing share code"), ("line 5", "negative minutes"),
+        ])
+        with self.assertRaises(UsageSchemaError):
+            list(store.entries())
+        self.validate(*args)
+
+        with open(path) as f:
+            self.assertEqual(f.read(), f"Code,Date,Platform,Minutes\n{self.code},2025-11-04,TikTok,10\n{self.code},2025-11-06,Other,7\n")
+        self.assertEqual([record.minutes for record in store.entries()], [10, 7])
+        self.assertEqual(store.dataframe(self.code)["Minutes"].tolist(), [10, 7])
+
+    def test_database_rows_are_normalised_and_rollups_rebuilt(self):
+        for code, platform, minutes in [(self.code.lower(), "TikTok", 10), ("", "TikTok", 20), (self.code, " Other ", 3)]:
+            TimeEntry.objects.create(user=self.user, share_code=code, date=date(2025, 11, 4), platform=platform, minutes=minutes)
+        rebuild_daily_usage(DatabaseUsageStore())
+
+        bad = TimeEntry.objects.get(share_code="").pk
+        self.assertEqual(self.validate(), [(f"entry {bad}", "missing share code")])
+        self.assertEqual(
+            sorted(TimeEntry.objects.values_list("share_code", "platform", "minutes")),
+            [(self.code, "Other", 3), (self.code, "TikTok", 10)],
+        )
+        self.assertEqual(DailyUsage.objects.aggregate(total=Sum("minutes"))["total"], 13)
+        self.assertEqual(self.validate(), [])
+
+    def test_columnar_partitions_are_repaired(self):
+        store = ColumnarUsageStore(os.path.join(self.tmp, "store"))
+        store.append([UsageRecord("AAA", "2025-11-04", "TikTok", 10), UsageRecord("AAA", "2025-11-05", "Other", 5)])
+        rows = np.zeros(1, dtype=ROW)
+        rows["platform"], rows["minutes"] = 9, 1
+        with open(store._partition("AAA"), "ab") as f:
+            f.write(rows.tobytes() + b"\x01")
+        os.unlink(store.schema_path)
+        with self.assertRaises(UsageSchemaError):
+            list(store.entries())
+
+        self.assertEqual(
+            self.validate("--backend", "tracker.columnar.ColumnarUsageStore", "--path", store.path),
+            [("AAA.bin#2", "missing platform")],
+        )
+        self.assertEqual(os.path.getsize(store._partition("AAA")), 2 * ROW.itemsize)
+        self.assertEqual([record.minutes for record in store.entries()], [10, 5])
+
+    def test_path_is_refused_for_the_database_store(self):
+        with self.assertRaises(CommandError):
+            self.validate("--path", os.path.join(self.tmp, "usage_data.csv"))
+
+    def test_writes_are_checked(self):
+        self.client.login(username="alice", password="pw")
+        for minutes in ["-5", "2.5", "lots"]:
+            with self.subTest(minutes):
+                response = self.client.post(reverse("home"), {"add_entry": "1", "platform": "TikTok", "minutes": minutes})
+                self.assertEqual(response.context["message"], "Invalid entry.")
+        self.assertFalse(TimeEntry.objects.exists())
+        for code, platform in [("", "TikTok"), (self.code, "Netflix")]:
+            with self.assertRaises(ValueError):
+                DatabaseUsageStore().add_entry(self.user, code, "2025-11-04", platform, 5)
@@ -0,0 +1,58 @@
+"""
+Usage time series for charts.
+
+usage_series() returns one point per day, week or month over any range,
+with zeros for periods without usage, from a single grouped query on the
+DailyUsage rollup. Ranges end on local_today(), the current date in
+settings.TIME_ZONE, not the server's wall clock.
+"""
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import DailyUsage
+
+BUCKETS = ["day", "week", "month"]
+
+# Ranges offered on the stats page, in days
+RANGES = [7, 30, 90, 365]
+
+
+def local_today():
+    """Today in settings.TIME_ZONE."""
+    if settings.USE_TZ:
+        return timezone.localdate()
+    # Without USE_TZ, Django runs the process in TIME_ZONE, so the naive clock already is local
+    return date.today()
+
+
+def bucket_start(day, bucket):
+    """First day of the `bucket` period containing `day`; weeks start on Monday."""
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def usage_series(user_id, days=30, bucket="day", today=None, platform=None):
+    """
+    [(period start, minutes)] for the `days` days ending `today`, oldest
+    first, one entry per `bucket` including empty ones. The first and last
+    week or month only count the days inside the range.
+    """
+    today = today or local_today()
+    start = today - timedelta(days=days - 1)
+    usage = DailyUsage.objects.filter(user_id=user_id, date__range=(start, today))
+    if platform:
+        usage = usage.filter(platform=platform)
+    per_day = dict(usage.values_list("date").annotate(Sum("minutes")).order_by())
+
+    series = {}
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        key = bucket_start(day, bucket)
+        series[key] = series.get(key, 0) + per_day.get(day, 0)
+    return list(series.items())
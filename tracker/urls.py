@@ -1,13 +1,28 @@
-from . import views
+from . import api, async_views, views
+from django.conf import settings
 from django.urls import path, include
 
-urlpatterns = [
-    path('', views.home, name='home'),
-    path('stats/', views.stats, name='stats'),
-    path('leaderboard/', views.leaderboard, name='leaderboard'),
-    path('resources/', views.resources, name='resources'),
-    path('accounts/', include('django.contrib.auth.urls')),
-    path("track-user/", views.track_user, name="track_user"),
-    path("track/<str:share_code>/", views.track_user_detail, name="track_user_detail"),
-    path("friends/", views.friends_list, name="friends_list"),
-]
+
+def tracker_patterns(pages):
+    """The app's URLs, with the read-heavy pages from `pages`: tracker.views or tracker.async_views."""
+    return [
+        path('', views.home, name='home'),
+        path('stats/', pages.stats, name='stats'),
+        path('api/stats/summary/', api.summary, name='api_stats_summary'),
+        path('api/stats/platforms/', api.platforms, name='api_stats_platforms'),
+        path('api/stats/trend/', api.trend, name='api_stats_trend'),
+        path('import/', views.import_usage, name='import_usage'),
+        path('export/', views.export_usage, name='export_usage'),
+        path('export/all/', views.export_all_usage, name='export_all_usage'),
+        path('perf/', views.perf_report, name='perf_report'),
+        path('leaderboard/', pages.leaderboard, name='leaderboard'),
+        path('resources/', views.resources, name='resources'),
+        path('accounts/', include('django.contrib.auth.urls')),
+        path("track-user/", views.track_user, name="track_user"),
+        path("track/<str:share_code>/", pages.track_user_detail, name="track_user_detail"),
+        path("track/<str:share_code>/history/", pages.track_user_history, name="track_user_history"),
+        path("friends/", pages.friends_list, name="friends_list"),
+    ]
+
+
+urlpatterns = tracker_patterns(async_views if settings.TRACKER_ASYNC_VIEWS else views)
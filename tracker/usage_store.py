@@ -0,0 +1,573 @@
+"""
+Usage storage backends.
+
+Views never open usage_data.csv or query TimeEntry directly; they call
+get_usage_store(), which returns the backend named in
+settings.USAGE_STORE_BACKEND. Every backend speaks the same four columns
+the original CSV used: Code, Date, Platform, Minutes.
+
+Rows are checked against the usage schema (see USAGE_SCHEMA_VERSION) once,
+on write, so reads trust the stored types instead of coercing every row.
+Files written before a store recorded its version are refused on read
+until `manage.py validate_usage` has normalised them, quarantining the rows
+that cannot be kept.
+"""
+import csv
+import json
+import os
+import re
+import tempfile
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import date
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single-process dev server only
+    fcntl = None
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .perf import record_store_io
+from .share_codes import normalize_code
+from .signals import usage_recorded
+
+USAGE_COLUMNS = ["Code", "Date", "Platform", "Minutes"]
+
+# Version of the rules every stored row meets: a share code matching
+# CODE_PATTERN, an ISO date, a platform name and whole minutes in
+# [0, MAX_MINUTES]; CSV files also have USAGE_COLUMNS in that order.
+USAGE_SCHEMA_VERSION = 1
+CODE_PATTERN = re.compile(r"[0-9A-Z]{1,12}")  # what UserProfile.share_code holds, normalised
+MAX_MINUTES = 2**31 - 1  # PositiveIntegerField's range on every database
+MERGE_MARKERS = ("<<<<<<<", "=======", ">>>>>>>")
+
+# Quarantine CSV columns: where the row was, why it was set aside, and its values
+QUARANTINE_COLUMNS = ["Source", "Reason"] + USAGE_COLUMNS
+
+# One usage row. `date` is an ISO "YYYY-MM-DD" string for every backend.
+UsageRecord = namedtuple("UsageRecord", ["code", "date", "platform", "minutes"])
+
+# One row of a user's history. History is ordered newest first by (date, id);
+# `id` is the TimeEntry id or, for the CSV backend, the line number.
+HistoryRow = namedtuple("HistoryRow", ["id", "date", "platform", "minutes"])
+
+# What UsageStore.validate() did: rows left as they were, rows normalised, rows quarantined
+ValidationResult = namedtuple("ValidationResult", ["kept", "fixed", "quarantined"])
+
+# Store locations already seen at USAGE_SCHEMA_VERSION; a store's version only moves forward
+_current_schema = set()
+
+
+class UsageSchemaError(Exception):
+    """The store holds rows written before USAGE_SCHEMA_VERSION."""
+
+
+@contextmanager
+def file_lock(lock_path):
+    """Hold an exclusive flock on `lock_path`, serializing writers across processes."""
+    with open(lock_path, "a") as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+@contextmanager
+def replaced(path, mode="w"):
+    """
+    Yield a file whose contents replace `path`: it is written next to it,
+    fsynced and swapped in with os.replace, so a crash leaves either the
+    old or the new file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, **({} if "b" in mode else {"newline": ""})) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(directory, os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def read_schema_version(path):
+    """The schema version recorded in `path`, or None if there is none."""
+    try:
+        with open(path) as f:
+            return json.load(f).get("version")
+    except FileNotFoundError:
+        return None
+
+
+def write_schema_version(path):
+    """Record USAGE_SCHEMA_VERSION in `path`."""
+    with replaced(path) as f:
+        json.dump({"version": USAGE_SCHEMA_VERSION}, f)
+
+
+def clean_row(row, platforms=None):
+    """
+    (UsageRecord, None) for a {column: value} row that meets the usage schema
+    once normalised, else (None, reason). Values may be strings as read from
+    a file or already typed. With `platforms`, the platform must be one of them.
+    """
+    first = next((value for value in row.values() if isinstance(value, str) and value.strip()), "")
+    if first.startswith(MERGE_MARKERS):
+        return None, "merge conflict marker"
+    code = normalize_code(row.get("Code"))
+    if not code:
+        return None, "missing share code"
+    if not CODE_PATTERN.fullmatch(code):
+        return None, "invalid share code"
+    try:
+        day = date.fromisoformat(str(row.get("Date") or "").strip()).isoformat()
+    except ValueError:
+        return None, "invalid date"
+    platform = str(row.get("Platform") or "").strip()
+    if not platform:
+        return None, "missing platform"
+    if platforms is not None and platform not in platforms:
+        return None, "unknown platform"
+    minutes, reason = clean_minutes(row.get("Minutes"))
+    if reason:
+        return None, reason
+    return UsageRecord(code, day, platform, minutes), None
+
+
+def clean_minutes(value):
+    """(int minutes, None) if `value` is whole minutes in [0, MAX_MINUTES], else (None, reason)."""
+    try:
+        minutes = float(value)
+    except (TypeError, ValueError):
+        return None, "invalid minutes"
+    if not minutes.is_integer():  # also false for nan and inf
+        return None, "invalid minutes"
+    if minutes < 0:
+        return None, "negative minutes"
+    if minutes > MAX_MINUTES:
+        return None, "minutes out of range"
+    return int(minutes), None
+
+
+def check_records(records, platforms=None):
+    """`records` in their stored form; raises ValueError for one that cannot meet the schema."""
+    checked = []
+    for record in records:
+        clean, reason = clean_row(dict(zip(USAGE_COLUMNS, record)), platforms)
+        if clean is None:
+            raise ValueError(f"Cannot store {tuple(record)!r}: {reason}")
+        checked.append(clean)
+    return checked
+
+
+def quarantine_writer(f):
+    """A quarantine(source, reason, values) callable writing QUARANTINE_COLUMNS rows to the open file `f`."""
+    writer = csv.writer(f, lineterminator="\n")
+    writer.writerow(QUARANTINE_COLUMNS)
+
+    def quarantine(source, reason, values):
+        writer.writerow([source, reason, *values])
+
+    return quarantine
+
+
+def history_cursor(row):
+    """Opaque keyset cursor pointing just past `row`."""
+    return f"{row.date}.{row.id}"
+
+
+def parse_history_cursor(cursor):
+    """(date string, id) from history_cursor(); raises ValueError if malformed."""
+    day, _, row_id = cursor.partition(".")
+    return date.fromisoformat(day).isoformat(), int(row_id)
+
+
+class UsageStore:
+    """Base class for usage backends."""
+
+    def add_entry(self, user, share_code, entry_date, platform, minutes):
+        """Store one entry, send usage_recorded and return the entry as a UsageRecord."""
+        raise NotImplementedError
+
+    def add_entries(self, user, records):
+        """Store a batch of the user's UsageRecords and send usage_recorded once for all of them."""
+        raise NotImplementedError
+
+    def entries(self, share_code=None, start=None, end=None):
+        """
+        Yield UsageRecords, optionally only the ones for `share_code` and
+        dated within [`start`, `end`] (dates, either end open when None).
+        """
+        raise NotImplementedError
+
+    def user_entries(self, user, share_code):
+        """
+        Yield one user's UsageRecords, oldest first. Like history(), backends
+        that store each entry's user select by `user`, so entries made under
+        an earlier share code are included; file backends select by `share_code`.
+        """
+        return self.entries(share_code)
+
+    def history(self, user, share_code, before=None, limit=50):
+        """
+        Up to `limit` HistoryRows for one user, newest first, starting after
+        the (date, id) key `before` from parse_history_cursor().
+        """
+        raise NotImplementedError
+
+    def dataframe(self, share_code=None):
+        """Return entries as a DataFrame with USAGE_COLUMNS. Imports pandas on first use."""
+        import pandas as pd
+
+        return pd.DataFrame.from_records(list(self.entries(share_code)), columns=USAGE_COLUMNS)
+
+    def daily_totals(self):
+        """
+        {(user_id, date, platform): minutes} over every entry. Entries only
+        carry a share code, so they go to the user holding that code now;
+        backends that store each entry's user override this.
+        """
+        from .models import UserProfile
+
+        users_by_code = dict(UserProfile.objects.values_list("share_code", "user_id"))
+        totals = {}
+        for record in self.entries():
+            user_id = users_by_code.get(record.code)
+            if user_id is None:
+                continue
+            key = (user_id, date.fromisoformat(record.date), record.platform)
+            totals[key] = totals.get(key, 0) + record.minutes
+        return totals
+
+    def schema_version(self):
+        """The USAGE_SCHEMA_VERSION every stored row is known to meet, or None if never validated."""
+        return USAGE_SCHEMA_VERSION
+
+    def check_schema(self):
+        """Raise UsageSchemaError unless the store is at USAGE_SCHEMA_VERSION; reads call this first."""
+        key = (type(self), getattr(self, "path", None))
+        if key in _current_schema:
+            return
+        version = self.schema_version()
+        if version != USAGE_SCHEMA_VERSION:
+            raise UsageSchemaError(
+                f"{self.path} holds usage at schema version {version}, not {USAGE_SCHEMA_VERSION}; "
+                "run `manage.py validate_usage`."
+            )
+        _current_schema.add(key)
+
+    def validate(self, quarantine, dry_run=False):
+        """
+        Bring every stored row to USAGE_SCHEMA_VERSION: normalise the ones
+        clean_row() accepts, hand the rest to quarantine(source, reason,
+        values) and drop them, then record the version. With `dry_run`
+        nothing is changed. Returns a ValidationResult.
+        """
+        raise NotImplementedError
+
+
+class DatabaseUsageStore(UsageStore):
+    """
+    Keeps entries in the TimeEntry table. Column types are the database's
+    job, so the store is always at the current schema version; validate()
+    still catches codes, platforms and minutes the constraints allow.
+    Platforms are limited to models.Platform, like TimeEntry.platform's choices.
+    """
+
+    def add_entry(self, user, share_code, entry_date, platform, minutes):
+        from .models import Platform, TimeEntry
+
+        if not isinstance(entry_date, str):
+            entry_date = entry_date.isoformat()
+        [record] = check_records([UsageRecord(share_code, entry_date, platform, minutes)], Platform.values)
+        TimeEntry.objects.create(
+            user=user,
+            share_code=record.code,
+            date=date.fromisoformat(record.date),
+            platform=record.platform,
+            minutes=record.minutes,
+        )
+        usage_recorded.send(sender=self.__class__, user=user, records=[record])
+        return record
+
+    def add_entries(self, user, records):
+        from .models import Platform, TimeEntry
+
+        records = check_records(records, Platform.values)
+        TimeEntry.objects.bulk_create(
+            [
+                TimeEntry(
+                    user=user,
+                    share_code=record.code,
+                    date=date.fromisoformat(record.date),
+                    platform=record.platform,
+                    minutes=record.minutes,
+                )
+                for record in records
+            ],
+            batch_size=1000,
+        )
+        usage_recorded.send(sender=self.__class__, user=user, records=records)
+
+    def entries(self, share_code=None, start=None, end=None):
+        from .models import TimeEntry
+
+        qs = TimeEntry.objects.order_by("date", "id")
+        if share_code is not None:
+            qs = qs.filter(share_code=share_code)
+        if start is not None:
+            qs = qs.filter(date__gte=start)
+        if end is not None:
+            qs = qs.filter(date__lte=end)
+        return self._records(qs)
+
+    def user_entries(self, user, share_code):
+        from .models import TimeEntry
+
+        # entry_user_date_idx serves both the filter and the order
+        return self._records(TimeEntry.objects.filter(user=user).order_by("date", "id"))
+
+    def _records(self, qs):
+        # Server-side cursor where the database has one, fixed-size fetches otherwise; never the whole table
+        rows = qs.values_list("share_code", "date", "platform", "minutes").iterator(chunk_size=2000)
+        for code, entry_date, platform, minutes in rows:
+            yield UsageRecord(code, entry_date.isoformat(), platform, minutes)
+
+    def history(self, user, share_code, before=None, limit=50):
+        from django.db.models import Q
+        from .models import TimeEntry
+
+        # Walks entry_user_date_idx backwards from the cursor, so cost depends on `limit`, not history length
+        qs = TimeEntry.objects.filter(user=user).order_by("-date", "-id")
+        if before is not None:
+            before_date, before_id = before
+            qs = qs.filter(Q(date__lt=before_date) | Q(date=before_date, id__lt=before_id))
+        return [
+            HistoryRow(entry_id, entry_date.isoformat(), platform, minutes)
+            for entry_id, entry_date, platform, minutes in qs.values_list("id", "date", "platform", "minutes")[:limit]
+        ]
+
+    def daily_totals(self):
+        # Grouped by TimeEntry.user, so entries made under an old share code still count
+        from django.db.models import Sum
+        from .models import TimeEntry
+
+        rows = TimeEntry.objects.values_list("user_id", "date", "platform").annotate(Sum("minutes")).order_by()
+        return {(user_id, day, platform): minutes for user_id, day, platform, minutes in rows}
+
+    def validate(self, quarantine, dry_run=False):
+        from django.db import transaction
+        from .models import Platform, TimeEntry
+
+        kept, fixes, bad_ids = 0, [], []
+        rows = TimeEntry.objects.order_by("id").values_list("id", "share_code", "date", "platform", "minutes")
+        for entry_id, *values in rows.iterator(chunk_size=2000):
+            record, reason = clean_row(dict(zip(USAGE_COLUMNS, values)), Platform.values)
+            if record is None:
+                quarantine(f"entry {entry_id}", reason, values)
+                bad_ids.append(entry_id)
+            elif (record.code, record.platform) != (values[0], values[2]):
+                fixes.append(TimeEntry(id=entry_id, share_code=record.code, platform=record.platform))
+            else:
+                kept += 1
+        if not dry_run:
+            with transaction.atomic():
+                TimeEntry.objects.bulk_update(fixes, ["share_code", "platform"], batch_size=1000)
+                for start in range(0, len(bad_ids), 1000):
+                    TimeEntry.objects.filter(id__in=bad_ids[start:start + 1000]).delete()
+        return ValidationResult(kept, len(fixes), len(bad_ids))
+
+
+class CsvUsageStore(UsageStore):
+    """
+    Keeps entries in the legacy usage_data.csv file.
+
+    Writes append lines under an exclusive flock on a sibling ".lock" file,
+    so every process writing the same path is serialized. The lock lives in
+    its own file because compact() replaces the data file, and a lock held
+    on the old inode would no longer protect the new one. The schema
+    version lives in a sibling ".schema" file, written with a new file or
+    by validate().
+    """
+
+    def __init__(self, path=None):
+        self.path = path or settings.USAGE_CSV_PATH
+        self.lock_path = self.path + ".lock"
+        self.schema_path = self.path + ".schema"
+
+    def locked(self):
+        """Hold the writer lock for `self.path`."""
+        return file_lock(self.lock_path)
+
+    def _header(self):
+        # Column order of the existing file; writes a header first if the file is new.
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path, newline="") as f:
+                header = next(csv.reader(f), None)
+            if header:
+                return header
+        with open(self.path, "w", newline="") as f:
+            csv.writer(f, lineterminator="\n").writerow(USAGE_COLUMNS)
+            f.flush()
+            os.fsync(f.fileno())
+        write_schema_version(self.schema_path)
+        return USAGE_COLUMNS
+
+    def append(self, records):
+        """Append UsageRecords as CSV lines, fsync before releasing the lock and return them as stored."""
+        records = check_records(records)
+        with self.locked():
+            header = self._header()
+            with open(self.path, "rb") as f:
+                # A file saved without a trailing newline would glue our first row onto its last one
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) not in (b"\n", b"\r")
+            with open(self.path, "a", newline="") as f:
+                start = f.tell()
+                if needs_newline:
+                    f.write("\n")
+                writer = csv.writer(f, lineterminator="\n")
+                for record in records:
+                    row = {"Code": record.code, "Date": record.date, "Platform": record.platform, "Minutes": record.minutes}
+                    writer.writerow([row.get(column, "") for column in header])
+                f.flush()
+                os.fsync(f.fileno())
+                record_store_io(f.tell() - start)
+        return records
+
+    def add_entry(self, user, share_code, entry_date, platform, minutes):
+        if not isinstance(entry_date, str):
+            entry_date = entry_date.isoformat()
+        [record] = self.append([UsageRecord(share_code, entry_date, platform, minutes)])
+        usage_recorded.send(sender=self.__class__, user=user, records=[record])
+        return record
+
+    def add_entries(self, user, records):
+        records = self.append(records)
+        usage_recorded.send(sender=self.__class__, user=user, records=records)
+
+    def compact(self):
+        """
+        Rewrite the file with the canonical column order, normalised share
+        codes and no blank lines, swapping it in with replaced(). Returns
+        the number of rows kept.
+        """
+        with self.locked():
+            if not os.path.exists(self.path):
+                return 0
+            kept = 0
+            with open(self.path, newline="") as src, replaced(self.path) as dst:
+                writer = csv.writer(dst, lineterminator="\n")
+                writer.writerow(USAGE_COLUMNS)
+                for row in csv.DictReader(src):
+                    values = [(row.get(column) or "").strip() for column in USAGE_COLUMNS]
+                    if not any(values):
+                        continue
+                    values[0] = normalize_code(values[0])
+                    writer.writerow(values)
+                    kept += 1
+            return kept
+
+    def schema_version(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return USAGE_SCHEMA_VERSION
+        return read_schema_version(self.schema_path)
+
+    def validate(self, quarantine, dry_run=False):
+        kept = fixed = quarantined = 0
+        with self.locked():
+            if not os.path.exists(self.path):
+                return ValidationResult(0, 0, 0)
+            output = open(os.devnull, "w", newline="") if dry_run else replaced(self.path)
+            with open(self.path, newline="") as src, output as dst:
+                writer = csv.writer(dst, lineterminator="\n")
+                writer.writerow(USAGE_COLUMNS)
+                reader = csv.DictReader(src)
+                for row in reader:
+                    values = [row.get(column) or "" for column in USAGE_COLUMNS]
+                    if not any(value.strip() for value in values):
+                        continue
+                    record, reason = clean_row(row)
+                    if record is None:
+                        quarantine(f"line {reader.line_num}", reason, values)
+                        quarantined += 1
+                        continue
+                    stored = [record.code, record.date, record.platform, str(record.minutes)]
+                    if stored == values:
+                        kept += 1
+                    else:
+                        fixed += 1
+                    writer.writerow(stored)
+            if not dry_run:
+                write_schema_version(self.schema_path)
+        return ValidationResult(kept, fixed, quarantined)
+
+    # Reads below rely on the schema: USAGE_COLUMNS order and whole minutes on every line
+
+    def entries(self, share_code=None, start=None, end=None):
+        self.check_schema()
+        if not os.path.exists(self.path):
+            return
+        # ISO dates order as strings, so rows are never parsed to compare
+        first = start.isoformat() if start else ""
+        last = end.isoformat() if end else "9999-12-31"
+        with open(self.path, newline="") as f:
+            try:
+                rows = csv.reader(f)
+                next(rows, None)
+                for code, day, platform, minutes in rows:
+                    if share_code is not None and code != share_code:
+                        continue
+                    if not first <= day <= last:
+                        continue
+                    yield UsageRecord(code, day, platform, int(minutes))
+            finally:
+                record_store_io(f.buffer.tell())
+
+    def history(self, user, share_code, before=None, limit=50):
+        # A CSV has no index, so this reads the whole file; the database backend is the one to use at scale
+        self.check_schema()
+        rows = []
+        if os.path.exists(self.path):
+            with open(self.path, newline="") as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                for code, day, platform, minutes in reader:
+                    if code == share_code:
+                        rows.append(HistoryRow(reader.line_num, day, platform, int(minutes)))
+                record_store_io(f.buffer.tell())
+        rows.sort(key=lambda r: (r.date, r.id), reverse=True)
+        if before is not None:
+            rows = [r for r in rows if (r.date, r.id) < before]
+        return rows[:limit]
+
+    def dataframe(self, share_code=None):
+        import pandas as pd
+
+        self.check_schema()
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return pd.DataFrame(columns=USAGE_COLUMNS)
+        df = pd.read_csv(self.path, dtype={"Code": str, "Date": str, "Platform": str, "Minutes": "int64"}, keep_default_na=False)
+        record_store_io(os.path.getsize(self.path))
+        if share_code is not None:
+            df = df[df["Code"] == share_code]
+        return df
+
+
+def get_usage_store():
+    """Return an instance of the configured usage backend."""
+    return import_string(settings.USAGE_STORE_BACKEND)()
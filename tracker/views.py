@@ -1,56 +1,39 @@
-import os
-import pandas as pd
-from datetime import date, datetime, timedelta
-from django.conf import settings
+import io
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
-from django.contrib.auth.models import User
-from .models import UserProfile, TimeEntry
+from django.conf import settings
+from django.core.cache import cache
+from .aggregates import most_used_platform
+from .models import UserProfile, LeaderboardTotal, Platform, PlatformTotal
 from django.shortcuts import render, get_object_or_404
 from django.urls import reverse
 from .petLogic import *
+from .pet_state import save_pet_state
+from .rollups import RESOURCES_CACHE_KEY
+from .share_codes import get_share_codes, normalize_code
+from .snapshot import get_usage_snapshot, usage_summaries
+from .stats_cache import cached_fragment, counters as stats_cache_counters
+from .timeseries import RANGES, local_today
+from .usage_store import get_usage_store, history_cursor, parse_history_cursor
+from . import exporter, importer, perf, tasks
+from . import leaderboard as leaderboard_index
 # Double checked imports
-CSV_PATH = os.path.join(settings.BASE_DIR, 'tracker', 'usage_data.csv')
 
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 
 
 # --- Helper: Calculate dopamine pet status ---
 def get_pet_stats(request):
     """Unified logic for dopamine pet display and progress calculation."""
-    focus_platform = request.session.get("focus_platform", None)
-    points = request.session.get("points", 0)
-    pet_type = request.session.get("pet_type", 1)
-    daily_avg = 0
-
-    # Ensure CSV exists with correct columns
-    if not os.path.exists(CSV_PATH):
-        pd.DataFrame(columns=['Code', 'Date', 'Platform', 'Minutes']).to_csv(CSV_PATH, index=False)
-
-    df = pd.read_csv(CSV_PATH)
-    if "Code" not in df.columns:
-        df["Code"] = ""  # default empty
-        df.to_csv(CSV_PATH, index=False)
-    # Get current user's share code
-    profile = UserProfile.objects.get(user=request.user)
-    share_code = profile.share_code
-
-    # Filter CSV to only this user's entries
-    df = df[df["Code"] == share_code]
-
-    if not df.empty and "Platform" in df.columns and focus_platform:
-        df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-
-        today = pd.to_datetime(date.today(), errors="coerce")
-        yesterday = pd.to_datetime(date.today() - timedelta(days=1), errors="coerce")
-        one_week_ago = datetime.now() - timedelta(days=7)
-        recent = df[df["Date"] >= one_week_ago]
-        focus_df = recent[recent["Platform"] == focus_platform]
-
-        if not focus_df.empty:
-            yesterday_total = focus_df[focus_df["Date"] == yesterday]["Minutes"].sum()
-            today_total = focus_df[focus_df["Date"] == today]["Minutes"].sum()
-            daily_avg = focus_df.groupby("Date")["Minutes"].sum().mean()
+    snapshot = get_usage_snapshot(request)
+    state = snapshot.pet_state
+    focus_platform = state.focus_platform
+    points = state.points
+    pet_type = state.pet_type
 
+    # Focus platform over the last 7 days
+    daily_avg = snapshot.focus_average()
 
     # Evolution logic
     pet_image, evolution_stage, progress = return_pet_info(pet_type, points)
@@ -65,23 +48,35 @@ def get_pet_stats(request):
     }
 
 
+def pet_mood(daily_avg):
+    """Mood shown for another user's pet, from their daily average."""
+    if daily_avg < 60 and daily_avg > 0:
+        return "Happy"
+    elif daily_avg < 120 and daily_avg > 0:
+        return "Neutral"
+    elif daily_avg == 0:
+        return "No Data"
+    return "Stressed"
+
+
 @login_required(login_url='/accounts/login/')
 def home(request):
     """Home page — same pet state as stats."""
     message = None
     focus_message = None
-
-    # Ensure CSV exists
-    if not os.path.exists(CSV_PATH):
-        pd.DataFrame(columns=['Code', 'Date', 'Platform', 'Minutes']).to_csv(CSV_PATH, index=False)
+    snapshot = get_usage_snapshot(request)
 
     if request.method == "POST":
 
         # ----- SET FOCUS -----
         if 'set_focus' in request.POST:
             focus_platform = request.POST.get("focus_platform")
-            if focus_platform:
-                request.session["focus_platform"] = focus_platform
+            if focus_platform and focus_platform not in Platform.values:
+                focus_message = "Unknown platform."
+            elif focus_platform:
+                state = snapshot.pet_state
+                state.focus_platform = focus_platform
+                save_pet_state(request.user, state, ["focus_platform"])
                 focus_message = f"Focus platform set to {focus_platform}!"
             else:
                 focus_message = "No focus platform selected."
@@ -93,198 +88,196 @@ def home(request):
             date_input = request.POST.get("date")
 
             if not date_input:
-                date_input =  date.today().isoformat()
-
-            if platform and minutes:
-                df = pd.read_csv(CSV_PATH)
-                if "Code" not in df.columns:
-                    df["Code"] = ""  # default empty
-                    df.to_csv(CSV_PATH, index=False)
+                date_input =  local_today().isoformat()
 
+            if platform and platform not in Platform.values:
+                message = "Unknown platform."
+            elif platform and minutes:
                 # Get current user's share code
-                profile = UserProfile.objects.get(user=request.user)
-                share_code = profile.share_code
-
-                new_row = {
-                    "Code": share_code,
-                    "Date": date_input,
-                    "Platform": platform,
-                    "Minutes": int(minutes)
-                }
-
-                df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-                df.to_csv(CSV_PATH, index=False)
-
-                message = f"Added {minutes} minutes for {platform}!"
-                # -------------------------------------------
-                # REWARD LOGIC — ONLY RUNS WHEN CSV UPDATED
-                DAILY_LIMIT = 15
-                points = request.session.get("points", 0)
-
-                # Calculate today's total usage (all platforms or only focus platform)
-                today_total = df[
-                    (df["Code"] == share_code) &
-                    (df["Date"] == date_input)
-                ]["Minutes"].sum()
-
-                # Calculate yesterday's total
-                yesterday_str = (date.fromisoformat(date_input) - timedelta(days=1)).isoformat()
-                yesterday_total = df[
-                    (df["Code"] == share_code) &
-                    (df["Date"] == yesterday_str)
-                ]["Minutes"].sum()
-
-                # --- Condition 1: Daily limit rule
-                if today_total <= DAILY_LIMIT:
-                    points += 1
-
-                # --- Condition 2: Improvement rule
-                if today_total < yesterday_total:
-                    points += 1
-
-                # Save updated points
-                request.session["points"] = points
-                request.session.modified = True
-                # -------------------------------------------
+                share_code = get_share_codes(request).own_code
+
+                try:
+                    # The store checks the entry against the usage schema (whole, non-negative minutes, ISO date)
+                    get_usage_store().add_entry(request.user, share_code, date_input, platform, minutes)
+                except ValueError:
+                    message = "Invalid entry."
+                else:
+                    # REWARD LOGIC — points are replayed from the whole history, so retroactive
+                    # entries count too; queued, see tracker.tasks
+                    tasks.enqueue("pet_points", request.user.pk)
+                    snapshot.usage_changed()
+
+                    message = f"Added {minutes} minutes for {platform}!"
         elif 'set_pet' in request.POST:
-            pet_type = int(request.POST.get("pet_type"))
-            request.session["pet_type"] = pet_type
-            request.session.modified = True
-            message = f"Pet type set to {pet_type}!"
+            pet_type = request.POST.get("pet_type", "")
+            if not pet_type.isdigit() or int(pet_type) not in PETS:
+                message = "Unknown pet type."
+            else:
+                state = snapshot.pet_state
+                state.pet_type = int(pet_type)
+                save_pet_state(request.user, state, ["pet_type"])
+                message = f"Pet type set to {pet_type}!"
 
     pet_stats = get_pet_stats(request)
-    print(pet_stats)
-    return render(request, "tracker/home.html", {**pet_stats, "message": message, "focus_message": focus_message})
+    return render(request, "tracker/home.html", {
+        **pet_stats,
+        "message": message,
+        "focus_message": focus_message,
+        "platforms": Platform.values,
+    })
 
 
 @login_required(login_url='/accounts/login/')
 def stats(request):
     """Stats page — displays usage summaries and dopamine pet info."""
+    return render(request, "tracker/stats.html", stats_page_context(request))
+
+
+def stats_page_context(request):
+    # Rebuilt only after the user's data changes; see tracker.stats_cache
+    context = cached_fragment("stats", request.user.pk, lambda: stats_context(request))
+    return {**context, "trend_ranges": RANGES}
+
+
+def stats_context(request):
+    """Pet info and summary cards for stats.html; the charts load from tracker.api."""
     pet_stats = get_pet_stats(request)
 
-    # --- Load usage data for summary cards ---
-    total_minutes, most_used, avg_daily = 0, "N/A", 0
+    # --- Summary cards from the current user's DailyUsage rollup ---
+    snapshot = get_usage_snapshot(request)
+    summary = snapshot.summary
 
-    if os.path.exists(CSV_PATH):
-        df = pd.read_csv(CSV_PATH)
+    context = {
+        **pet_stats,
+        "total_minutes": summary["total_minutes"],
+        "most_used": summary["most_used"],
+        "avg_daily": summary["avg_daily"],
+    }
+    return context
 
-        # Filter to current user's data
-        profile = UserProfile.objects.get(user=request.user)
-        share_code = profile.share_code
-        df = df[df["Code"] == share_code]
 
-        if not df.empty:
-            df["Minutes"] = pd.to_numeric(df["Minutes"], errors="coerce").fillna(0)
+# ---------- BULK IMPORT ----------
+@login_required(login_url='/accounts/login/')
+def import_usage(request):
+    """Upload a CSV or JSON Lines screen-time export; rows are streamed from the upload in batches."""
+    result = None
+    error = None
 
-            total_minutes = int(df["Minutes"].sum())
-            avg_daily = round(df.groupby("Date")["Minutes"].sum().mean(), 2)
+    if request.method == "POST":
+        upload = request.FILES.get("file")
+        if upload is None:
+            error = "Please choose a file."
+        else:
+            stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+            try:
+                result = importer.import_usage(stream, importer.format_for(upload.name), user=request.user)
+            except UnicodeDecodeError:
+                error = "The file is not UTF-8 text."
 
-            if "Platform" in df.columns:
-                most_used = df.groupby("Platform")["Minutes"].sum().idxmax()
+    return render(request, "tracker/import_usage.html", {"result": result, "error": error})
 
-        # ----- CHART DATA -----
-    platform_labels = []
-    platform_values = []
-    weekly_labels = []
-    weekly_values = []
 
-    if not df.empty:
+# ---------- EXPORT ----------
+def export_response(request, records, filename):
+    """Stream `records` in the ?format= (csv, json, parquet) requested, gzipped with ?gzip=1."""
+    fmt = request.GET.get("format", "csv")
+    if fmt == "parquet" and not exporter.parquet_available():
+        return HttpResponseBadRequest("Parquet export needs pyarrow, which is not installed on this server.")
+    if fmt not in exporter.formats():
+        return HttpResponseBadRequest(f"Unknown export format. Choose one of: {', '.join(exporter.formats())}.")
+    gzip = request.GET.get("gzip") == "1"
 
-        # --- Time Spent per Platform Data ---
-        platform_group = df.groupby("Platform")["Minutes"].sum()
-        platform_labels = list(platform_group.index)
-        platform_values = [float(v) for v in platform_group.values]
+    filename = f"{filename}.{fmt}" + (".gz" if gzip else "")
+    response = StreamingHttpResponse(
+        exporter.export_stream(records, fmt, gzip=gzip),
+        content_type="application/gzip" if gzip else exporter.CONTENT_TYPES[fmt],
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
 
-        # --- Weekly Trend (last 7 days) ---
-        df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-        week_ago = datetime.now() - timedelta(days=7)
-        week_df = df[df["Date"] >= week_ago]
 
-        if not week_df.empty:
-            daily_totals = week_df.groupby(df["Date"].dt.date)["Minutes"].sum()
-            weekly_labels = [str(d) for d in daily_totals.index]
-            weekly_values = [float(v) for v in daily_totals.values]
+@login_required(login_url='/accounts/login/')
+def export_usage(request):
+    """Download the current user's own entries."""
+    share_code = get_usage_snapshot(request).profile.share_code
+    records = get_usage_store().user_entries(request.user, share_code)
+    return export_response(request, records, f"usage-{share_code}")
 
-    context = {
-        **pet_stats,
-        "total_minutes": total_minutes,
-        "most_used": most_used,
-        "avg_daily": avg_daily,
-        "platform_labels": platform_labels,
-        "platform_values": platform_values,
-        "weekly_labels": weekly_labels,
-        "weekly_values": weekly_values,
-    }
 
-    return render(request, "tracker/stats.html", context)
+@staff_member_required
+def export_all_usage(request):
+    """Download every user's entries (staff only)."""
+    return export_response(request, get_usage_store().entries(), f"usage-all-{local_today().isoformat()}")
+
+
+# ---------- PERFORMANCE REPORT ----------
+@staff_member_required
+def perf_report(request):
+    """Rolling request timings per URL name from tracker.middleware, plus stats cache counters."""
+    return JsonResponse({"views": perf.REGISTRY.summary(), "stats_cache": stats_cache_counters()})
 
 
 # ---------- LEADERBOARD PAGE ----------
 @login_required(login_url='/accounts/login/')
 def leaderboard(request):
-    import os
-    import pandas as pd
-    from django.conf import settings
-
-    csv_path = CSV_PATH
+    window = leaderboard_window(request)
+    return render(request, 'tracker/leaderboard.html', leaderboard_context(window, get_share_codes(request)))
 
-    try:
-        # Try reading CSV safely
-        if os.path.getsize(csv_path) == 0:
-            raise pd.errors.EmptyDataError("CSV is empty")
 
-        df = pd.read_csv(csv_path)
+def leaderboard_window(request):
+    window = request.GET.get('window', 'all')
+    if window not in leaderboard_index.WINDOWS:
+        window = 'all'
+    return window
 
-        if df.empty:
-            leaderboard = []
-
-        else:
-            # Leaderboard: rank users by total minutes
-            leaderboard_data = (
-                df.groupby('Code', as_index=False)['Minutes']
-                .sum()
-                .sort_values('Minutes', ascending=True)
-                .reset_index(drop=True)
-            )
 
-            leaderboard_data['Rank'] = leaderboard_data.index + 1
-            leaderboard = leaderboard_data.to_dict(orient='records')
+def leaderboard_context(window, share_codes):
+    # Leaderboard: rank users by total minutes, lowest first
+    leaderboard = leaderboard_index.top(window, limit=25)
+    my_rank = leaderboard_index.rank_of(window, share_codes.own_code)
 
-    except (FileNotFoundError, pd.errors.EmptyDataError):
-        leaderboard = []
+    # Usernames for every row from one lookup; codes no longer in use show as-is
+    owners = share_codes.resolve([row["Code"] for row in leaderboard])
+    for row in leaderboard:
+        owner = owners.get(row["Code"])
+        row["Username"] = owner.username if owner else None
 
-    return render(request, 'tracker/leaderboard.html', {'leaderboard': leaderboard})
+    return {
+        'leaderboard': leaderboard,
+        'window': window,
+        'windows': LeaderboardTotal.WINDOW_CHOICES,
+        'my_rank': my_rank[0] if my_rank else None,
+        'my_minutes': my_rank[1] if my_rank else 0,
+    }
 
 
 # ---------- RESOURCES PAGE ----------
 @login_required(login_url='/accounts/login/')
 def resources(request):
+    # Same for every user; cached until the next usage write changes PlatformTotal
+    context = cache.get_or_set(RESOURCES_CACHE_KEY, resources_context, settings.STATS_CACHE_TIMEOUT)
+    return render(request, "tracker/resources.html", context)
+
+
+def resources_context():
+    """most_used and all_equal over every user's minutes, from one row per platform."""
     most_used = "N/A"
     platform_minutes = {}
     all_equal = False
 
-    if os.path.exists(CSV_PATH):
-        df = pd.read_csv(CSV_PATH)
-        if not df.empty and "Minutes" in df.columns:
-            if "Platform" in df.columns and not df["Platform"].empty:
-                most_used = df.groupby("Platform")["Minutes"].sum().idxmax()
-                platform_minutes = (
-                    df.groupby("Platform")["Minutes"]
-                    .sum()
-                    .sort_values(ascending=False)
-                    .to_dict()
-                )
-
-                non_other_vals = [v for k, v in platform_minutes.items() if str(k).strip().lower() != "other"]
-                all_equal = len(non_other_vals) >= 2 and len(set(non_other_vals)) == 1
+    totals = list(PlatformTotal.objects.filter(minutes__gt=0).values_list("platform", "minutes").order_by("platform"))
+    if totals:
+        most_used = most_used_platform(totals)
+        platform_minutes = dict(totals)
 
-    context = {
+        non_other_vals = [v for k, v in platform_minutes.items() if str(k).strip().lower() != "other"]
+        all_equal = len(non_other_vals) >= 2 and len(set(non_other_vals)) == 1
+
+    return {
         "most_used": most_used,
         "all_equal": all_equal,
     }
 
-    return render(request, "tracker/resources.html", context)
-
 
 def track_user(request):
     """
@@ -295,7 +288,7 @@ def track_user(request):
     context = {}
     # show current user's friends
     user_profile = get_object_or_404(UserProfile, user=request.user)
-    context["friends"] = user_profile.friends.all()
+    context["friends"] = user_profile.friends.select_related("user")
 
     # Handle add-friend POST
     if request.method == "POST" and "friend_code" in request.POST:
@@ -303,7 +296,7 @@ def track_user(request):
         if not raw_code:
             context["error"] = "Please enter a code."
         else:
-            code = raw_code.upper()
+            code = normalize_code(raw_code)
             # prevent adding yourself
             if code == user_profile.share_code:
                 context["error"] = "You cannot add yourself as a friend."
@@ -316,110 +309,91 @@ def track_user(request):
                     # target_profile.friends.add(user_profile)
                     context["message"] = f"Added {target_profile.user.username} as a friend."
                     # refresh friends list
-                    context["friends"] = user_profile.friends.all()
+                    context["friends"] = user_profile.friends.select_related("user")
                 except UserProfile.DoesNotExist:
                     context["error"] = "No account found with that code."
 
     # Handle code search (redirect to detail)
     share_code = request.GET.get("code", "").strip()
     if share_code:
-        return redirect("track_user_detail", share_code=share_code.upper())
+        return redirect("track_user_detail", share_code=normalize_code(share_code))
 
     return render(request, "tracker/track_user.html", context)
 def track_user_detail(request, share_code):
 
-    share_code = share_code.strip().upper()
-    profile = get_object_or_404(UserProfile, share_code=share_code)
-    target_user = profile.user
-
-    # Ensure CSV exists; if not, return an empty result consistent with stats()
-    if not os.path.exists(CSV_PATH):
-        entries = []
-        total_minutes = 0
-        daily_avg = 0
-        pet_mood = "N/A"
-        most_used = "N/A"
-        return render(request, "tracker/track_user_detail.html", {
-            "target_user": target_user,
-            "entries": entries,
-            "total_minutes": total_minutes,
-            "daily_avg": daily_avg,
-            "pet_mood": pet_mood,
-            "most_used": most_used,
-        })
-
-
-    df = pd.read_csv(CSV_PATH)
-
-
-    if "Code" not in df.columns:
-        df["Code"] = ""
-
-    df_user = df[df["Code"].astype(str).str.upper() == share_code]
-
-    if not df_user.empty:
-        if "Minutes" in df_user.columns:
-            df_user["Minutes"] = pd.to_numeric(df_user["Minutes"], errors="coerce").fillna(0).astype(int)
-        else:
-            df_user["Minutes"] = 0
-        if "Date" in df_user.columns:
-            df_user["Date"] = pd.to_datetime(df_user["Date"], errors="coerce").dt.date
-        else:
+    profile = get_object_or_404(UserProfile.objects.select_related("user"), share_code=normalize_code(share_code))
+    return render(request, "tracker/track_user_detail.html", track_user_detail_context(profile))
 
-            df_user["Date"] = pd.to_datetime("today").date()
 
-        # total minutes (match stats)
-        total_minutes = int(df_user["Minutes"].sum())
-
-        try:
-            daily_avg = round(df_user.groupby("Date")["Minutes"].sum().mean(), 2)
-        except Exception:
-            daily_avg = 0
-
-
-        if "Platform" in df_user.columns and not df_user["Platform"].isnull().all():
+def track_user_detail_context(profile):
+    target_user = profile.user
 
-            try:
-                most_used = df_user.groupby("Platform")["Minutes"].sum().idxmax()
-            except Exception:
-                most_used = "N/A"
-        else:
-            most_used = "N/A"
-
-        entries = [
-            {
-                "date": row["Date"].isoformat() if hasattr(row["Date"], "isoformat") else str(row["Date"]),
-                "platform": (row["Platform"] if "Platform" in row and pd.notna(row["Platform"]) else "N/A"),
-                "minutes": int(row["Minutes"])
-            }
-            for _, row in df_user.sort_values("Date", ascending=False).iterrows()
-        ]
-
-    else:
-        entries = []
-        total_minutes = 0
-        daily_avg = 0
-        most_used = "N/A"
+    # Summary (match stats), grouped in the database rather than loaded row by row
+    summary = usage_summaries([target_user.pk])[target_user.pk]
+    total_minutes = summary["total_minutes"]
+    daily_avg = summary["avg_daily"]
+    most_used = summary["most_used"]
 
-    if daily_avg < 60 and daily_avg > 0:
-        pet_mood = "Happy"
-    elif daily_avg < 120 and daily_avg > 0:
-        pet_mood = "Neutral"
-    elif daily_avg == 0:
-        pet_mood = "No Data"
-    else:
-        pet_mood = "Stressed"
+    # First page of history; the rest is fetched from track_user_history as the user scrolls
+    entries, next_cursor = history_page(target_user, profile.share_code)
 
-    context = {
+    return {
         "target_user": target_user,
         "entries": entries,
         "total_minutes": total_minutes,
         "daily_avg": daily_avg,
-        "pet_mood": pet_mood,
+        "pet_mood": pet_mood(daily_avg),
         "most_used": most_used,
+        "next_cursor": next_cursor,
     }
 
-    return render(request, "tracker/track_user_detail.html", context)
 
+HISTORY_PAGE_SIZE = 50
+
+
+def history_page(user, share_code, cursor=None):
+    """One page of a user's history as template/JSON rows, plus the cursor for the next page (or None)."""
+    before = parse_history_cursor(cursor) if cursor else None
+    rows = get_usage_store().history(user, share_code, before=before, limit=HISTORY_PAGE_SIZE + 1)
+    next_cursor = history_cursor(rows[HISTORY_PAGE_SIZE - 1]) if len(rows) > HISTORY_PAGE_SIZE else None
+    entries = [
+        {"date": row.date, "platform": row.platform or "N/A", "minutes": row.minutes}
+        for row in rows[:HISTORY_PAGE_SIZE]
+    ]
+    return entries, next_cursor
+
+
+def track_user_history(request, share_code):
+    """JSON page of a user's history after ?before=<cursor>, for infinite scroll on the detail page."""
+    profile = get_object_or_404(UserProfile.objects.select_related("user"), share_code=normalize_code(share_code))
+    try:
+        entries, next_cursor = history_page(profile.user, profile.share_code, request.GET.get("before"))
+    except ValueError:
+        return JsonResponse({"error": "Invalid cursor."}, status=400)
+    return JsonResponse({"entries": entries, "next": next_cursor})
+
+
+@login_required(login_url='/accounts/login/')
 def friends_list(request):
-    return render(request, "tracker/friends_list.html")
+    """Friends dashboard — every friend's summary from two grouped queries, however many friends."""
+    profile = get_usage_snapshot(request).profile
+    friends = list(profile.friends.select_related("user").order_by("user__username"))
+    return render(request, "tracker/friends_list.html", friends_context(friends))
+
+
+def friends_context(friends):
+    """Dashboard cards for already loaded friend profiles (with their users)."""
+    summaries = usage_summaries([friend.user_id for friend in friends])
+
+    rows = []
+    for friend in friends:
+        summary = summaries[friend.user_id]
+        rows.append({
+            "username": friend.user.username,
+            "share_code": friend.share_code,
+            "total_minutes": summary["total_minutes"],
+            "daily_avg": summary["avg_daily"],
+            "most_used": summary["most_used"],
+            "pet_mood": pet_mood(summary["avg_daily"]),
+        })
+    return {"friends": rows}